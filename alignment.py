@@ -0,0 +1,222 @@
+"""
+Podicals - Timestamp Alignment
+Links quotes in a generated summary back to the moment they were said, so
+the website can deep-link them with youtube_url&t=.
+
+Caption segments are stored with their start times. TimestampIndex maps a
+character offset in the joined transcript to a segment by binary search on
+cumulative offsets. QuoteMatcher finds where a passage was said by looking
+up its word shingles and voting on where they line up, so an episode costs
+one pass to index and each quote only touches the shingles it contains.
+
+    python alignment.py --summaries ./summaries --transcripts ./transcripts
+"""
+
+import re
+import json
+import argparse
+from bisect import bisect_right
+from itertools import accumulate
+from collections import Counter, defaultdict
+
+
+WORD_RE = re.compile(r"[^\W_]+(?:'[^\W_]+)*")
+
+# Dropped before shingling so small wording changes still line up
+STOPWORDS = frozenset("""
+a an and are as at be but by do for from had has have he her his i if in is it its
+just know like me my of oh on or our really so that the their them then there they
+this to uh um was we were what when which who will with yeah you your
+""".split())
+
+# Content words per shingle
+SHINGLE_WORDS = 2
+# Shingles this common (filler phrases) say nothing about position
+MAX_POSTINGS = 64
+# Width in words of the diagonal bands votes are grouped into, so a
+# paraphrase with words added or dropped still counts as one alignment
+BAND_WORDS = 12
+MIN_VOTES = 2
+# Share of a passage's shingles that must line up
+MIN_QUOTE_SCORE = 0.5
+MIN_PARAPHRASE_SCORE = 0.3
+
+QUOTE_RE = re.compile(r'["“]([^"”\n]{12,400})["”]')
+SENTENCE_RE = re.compile(r'(?<=[.!?])\s+')
+# Sentences that report what someone said are worth linking even unquoted
+ATTRIBUTION_RE = re.compile(
+    r"\b(?:says|said|argues|argued|explains|explained|jokes|joked|admits|admitted|recalls|recalled|"
+    r"puts it|put it|claims|claimed|describes|described|insists|insisted|quipped|warns|warned)\b",
+    re.IGNORECASE,
+)
+
+
+def content_words(text):
+    """[(word, offset)] for the non-stopwords in text."""
+    words = []
+    for match in WORD_RE.finditer(text):
+        word = match.group().lower()
+        if word not in STOPWORDS:
+            words.append((word, match.start()))
+    return words
+
+
+def _shingles(words):
+    return [tuple(w for w, _ in words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)]
+
+
+class TimestampIndex:
+    """Character offset in ' '.join(segment texts) -> segment start time."""
+
+    def __init__(self, segments):
+        self.starts = [segment['start'] for segment in segments]
+        # Segments are joined with single spaces, as in the stored transcript
+        self.offsets = list(accumulate((len(segment['text']) + 1 for segment in segments[:-1]), initial=0))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def segment_at(self, offset):
+        return max(0, bisect_right(self.offsets, offset) - 1)
+
+    def time_at(self, offset):
+        return self.starts[self.segment_at(offset)] if self.starts else None
+
+
+class QuoteMatcher:
+    """Shingle index over one transcript for locating quoted or paraphrased passages."""
+
+    def __init__(self, transcript):
+        self.words = content_words(transcript)
+        self.postings = defaultdict(list)
+        for position, shingle in enumerate(_shingles(self.words)):
+            self.postings[shingle].append(position)
+
+    def match(self, passage):
+        """Best (offset, score) for a passage in the transcript, or None."""
+        shingles = _shingles(content_words(passage))
+        if len(shingles) < MIN_VOTES:
+            return None
+
+        votes = Counter()
+        first = {}
+        for j, shingle in enumerate(shingles):
+            positions = self.postings.get(shingle)
+            if not positions or len(positions) > MAX_POSTINGS:
+                continue
+            # One vote per band per shingle, however often it repeats there
+            for position in positions:
+                band = (position - j) // BAND_WORDS
+                if first.get(band, (None, None))[1] != j:
+                    votes[band] += 1
+                    start = min(first[band][0], position) if band in first else position
+                    first[band] = (start, j)
+        if not votes:
+            return None
+
+        # Neighbouring bands together, since an alignment can straddle two
+        band = max(votes, key=lambda b: (votes[b] + votes.get(b + 1, 0), -b))
+        count = votes[band] + votes.get(band + 1, 0)
+        if count < MIN_VOTES:
+            return None
+        start = min(first[b][0] for b in (band, band + 1) if b in first)
+        return self.words[start][1], min(1.0, count / len(shingles))
+
+
+def extract_passages(summary):
+    """[(text, kind)] to align: quoted text and blockquotes, then attributed paraphrases."""
+    passages = []
+    seen = set()
+
+    def add(text, kind):
+        text = ' '.join(text.strip(' *_>"“”').split())
+        if len(text.split()) >= 4 and text.lower() not in seen:
+            seen.add(text.lower())
+            passages.append((text, kind))
+
+    for line in (summary or '').splitlines():
+        line = line.strip()
+        if line.startswith('#'):
+            continue
+        if line.startswith('>'):
+            add(line.lstrip('> '), 'quote')
+            continue
+        for quote in QUOTE_RE.findall(line):
+            add(quote, 'quote')
+        for sentence in SENTENCE_RE.split(re.sub(r'[*_`]+', '', line)):
+            if ATTRIBUTION_RE.search(sentence) and not QUOTE_RE.search(sentence):
+                add(sentence, 'paraphrase')
+    return passages
+
+
+def align_summary(summary, segments):
+    """
+    Timestamps for the quotes and paraphrases in a summary:
+    [{'text', 'kind', 'start', 'score'}] in summary order, with start in
+    whole seconds. Empty when there are no segments to align against.
+    """
+    if not segments:
+        return []
+    index = TimestampIndex(segments)
+    matcher = QuoteMatcher(' '.join(segment['text'] for segment in segments))
+
+    moments = []
+    for text, kind in extract_passages(summary):
+        found = matcher.match(text)
+        if found is None:
+            continue
+        offset, score = found
+        if score < (MIN_QUOTE_SCORE if kind == 'quote' else MIN_PARAPHRASE_SCORE):
+            continue
+        moments.append({
+            'text': text,
+            'kind': kind,
+            'start': int(index.time_at(offset)),
+            'score': round(score, 2),
+        })
+    return moments
+
+
+def timestamp_url(youtube_url, seconds):
+    if not youtube_url:
+        return None
+    return f"{youtube_url}{'&' if '?' in youtube_url else '?'}t={seconds}s"
+
+
+def backfill_summaries(summaries_dir, store, force=False):
+    """Add quote_timestamps to saved summaries that don't have them. Returns the number updated."""
+    from exporter import iter_summary_files
+
+    updated = 0
+    for path, _ in iter_summary_files(summaries_dir):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if not isinstance(data, dict) or not data.get('success'):
+            continue
+        if 'quote_timestamps' in data and not force:
+            continue
+        episode = store.get(data.get('video_id')) if data.get('video_id') in store else None
+        if episode is None:
+            continue
+
+        data['quote_timestamps'] = align_summary(data.get('summary'), episode.get('segments'))
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        updated += 1
+    return updated
+
+
+if __name__ == "__main__":
+    from transcript_store import TranscriptStore
+
+    parser = argparse.ArgumentParser(description="Link summary quotes to transcript timestamps")
+    parser.add_argument('--summaries', default='./summaries')
+    parser.add_argument('--transcripts', default='./transcripts')
+    parser.add_argument('--force', action='store_true', help="Re-align summaries that already have timestamps")
+    args = parser.parse_args()
+
+    count = backfill_summaries(args.summaries, TranscriptStore(args.transcripts), force=args.force)
+    print(f"Added quote timestamps to {count} summaries")
@@ -0,0 +1,489 @@
+"""
+Podicals - Benchmarks
+Offline benchmarks for the pipeline's hot paths: scrape_all against
+fake_youtube.py, summarize_all against fake_anthropic.py, export_for_website
+and is_podcast_episode over synthetic corpora, and the startup time of the
+light cli.py commands. Nothing touches the network.
+
+Results are written as JSON (one file per commit) so runs can be compared:
+
+    python benchmark.py                              # 500-episode corpus
+    python benchmark.py --sizes 500,10000,100000
+    python benchmark.py --only export --compare .cache/bench/results/1a2b3c4.json
+
+Corpora are generated deterministically and cached under --corpus-dir, so
+every commit is measured on the same data.
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import platform
+import argparse
+import statistics
+import subprocess
+import contextlib
+from datetime import datetime
+
+# The Anthropic SDK wants a key even when pointed at fake_anthropic.py
+os.environ.setdefault('ANTHROPIC_API_KEY', 'benchmark')
+
+from dedup import DuplicateIndex
+from fake_anthropic import FakeAnthropicServer
+from fake_youtube import FakeYouTube, WORDS, TITLE_WORDS
+from transcript_store import TranscriptStore
+
+
+RESULTS_VERSION = 1
+CORPUS_VERSION = 1
+DEFAULT_SIZES = [500]
+STAGES = ('startup', 'is_podcast_episode', 'scrape', 'summarize', 'export')
+
+# Caption lines are drawn from a fixed pool so 100k episodes generate quickly
+SEGMENT_POOL_SIZE = 20000
+SEGMENTS_PER_EPISODE = 250
+
+PODCASTS = [(f"Podcast {i:02d}", genre) for i, genre in enumerate(
+    ['business', 'technology', 'science', 'comedy', 'sports', 'news', 'history', 'culture'] * 6
+)]
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def latency_stats(values):
+    """p50/p95/max of a list of seconds."""
+    return {
+        'p50_seconds': round(statistics.median(values), 4) if values else None,
+        'p95_seconds': round(percentile(values, 0.95), 4) if values else None,
+        'max_seconds': round(max(values), 4) if values else None,
+    }
+
+
+def git_commit():
+    repo = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=repo, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                    capture_output=True, text=True, cwd=repo).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+@contextlib.contextmanager
+def quiet(enabled=True):
+    """Swallow the stages' progress output while timing them."""
+    if not enabled:
+        yield
+        return
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def fake_summary_text(rng, title):
+    sections = '\n\n'.join(
+        f"## {' '.join(rng.choice(TITLE_WORDS) for _ in range(3))}\n\n"
+        + ' '.join(rng.choice(WORDS) for _ in range(60))
+        for _ in range(6)
+    )
+    return f"# {title}\n\n{' '.join(rng.choice(WORDS) for _ in range(50))}\n\n{sections}\n\n## Bottom line\n\nWorth it."
+
+
+def build_corpus(root, episodes, seed=0):
+    """
+    Synthetic archive of `episodes` transcripts (in a TranscriptStore) and
+    matching summaries, reused if it was already built with the same settings.
+    """
+    marker = os.path.join(root, 'corpus.json')
+    settings = {'version': CORPUS_VERSION, 'episodes': episodes, 'seed': seed}
+    if os.path.exists(marker):
+        with open(marker, 'r', encoding='utf-8') as f:
+            if json.load(f) == settings:
+                return root
+    shutil.rmtree(root, ignore_errors=True)
+
+    rng = random.Random(seed)
+    pool = [' '.join(rng.choice(WORDS) for _ in range(rng.randint(6, 12))) for _ in range(SEGMENT_POOL_SIZE)]
+    store = TranscriptStore(os.path.join(root, 'transcripts'))
+    summaries_dir = os.path.join(root, 'summaries')
+
+    started = time.monotonic()
+    for i in range(episodes):
+        podcast, genre = PODCASTS[i % len(PODCASTS)]
+        video_id = f"bench{i:06d}"
+        title = f"{' '.join(rng.choice(TITLE_WORDS) for _ in range(5))} #{i}"
+        upload_date = f"{2020 + i % 5}{1 + i % 12:02d}{1 + i % 28:02d}"
+        texts = rng.sample(pool, SEGMENTS_PER_EPISODE)
+        segments = [{'text': text, 'start': 4.0 * n, 'duration': 4.0} for n, text in enumerate(texts)]
+        episode = {
+            'podcast_name': podcast,
+            'genre': genre,
+            'video_id': video_id,
+            'title': title,
+            'duration_seconds': 1800 + i % 5400,
+            'upload_date': upload_date,
+            'view_count': rng.randint(1000, 2000000),
+            'transcript': ' '.join(texts),
+            'segments': segments,
+            'is_auto_generated': True,
+            'youtube_url': f"https://youtube.com/watch?v={video_id}",
+        }
+        store.put(episode)
+
+        summary = {
+            'success': True,
+            'summary': fake_summary_text(rng, title),
+            'podcast_name': podcast,
+            'episode_title': title,
+            'video_id': video_id,
+            'youtube_url': episode['youtube_url'],
+            'upload_date': upload_date,
+            'duration_seconds': episode['duration_seconds'],
+            'genre': genre,
+            'view_count': episode['view_count'],
+            'summarized_at': datetime(2025, 1, 1).isoformat(),
+        }
+        summary_dir = os.path.join(summaries_dir, genre, podcast)
+        os.makedirs(summary_dir, exist_ok=True)
+        with open(os.path.join(summary_dir, f"{upload_date}_{video_id}.json"), 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+
+        if (i + 1) % 10000 == 0:
+            print(f"  corpus: {i + 1}/{episodes} episodes ({time.monotonic() - started:.0f}s)")
+
+    # Steady state: the one-off duplicate check of an existing archive isn't what we measure
+    DuplicateIndex(store.root).sync(store)
+
+    with open(marker, 'w', encoding='utf-8') as f:
+        json.dump(settings, f)
+    return root
+
+
+def bench_startup(workdir, runs=5):
+    """
+    Wall time of cli.py commands that shouldn't load yt-dlp or the Anthropic
+    SDK, run in an empty directory without ANTHROPIC_API_KEY. The export
+    commands really export (nothing), from a fresh directory each run.
+    """
+    from cli import STARTUP_BUDGET_SECONDS
+
+    cli = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cli.py')
+    cwd = os.path.join(workdir, 'startup')
+    shutil.rmtree(cwd, ignore_errors=True)
+    os.makedirs(cwd)
+    env = {k: v for k, v in os.environ.items() if k not in ('ANTHROPIC_API_KEY', 'PODICALS_QUEUE_DB')}
+
+    commands = {
+        'python': [sys.executable, '-c', 'pass'],
+        'help': [sys.executable, cli, '--help'],
+        'export_help': [sys.executable, cli, 'export', '--help'],
+        'status': [sys.executable, cli, 'status'],
+        'export': [sys.executable, cli, 'export'],
+        'export_fast': [sys.executable, cli, 'export', '--no-related', '--no-search'],
+    }
+    results = {}
+    for name, command in commands.items():
+        times = []
+        for _ in range(runs):
+            shutil.rmtree(os.path.join(cwd, 'data'), ignore_errors=True)
+            started = time.perf_counter()
+            subprocess.run(command, cwd=cwd, env=env, check=True, stdout=subprocess.DEVNULL)
+            times.append(time.perf_counter() - started)
+        results[name] = {'median_seconds': round(statistics.median(times), 4)}
+        if name != 'python':
+            results[name]['within_budget'] = results[name]['median_seconds'] <= STARTUP_BUDGET_SECONDS
+    results['budget_seconds'] = STARTUP_BUDGET_SECONDS
+    return results
+
+
+def bench_is_podcast_episode(calls=200000, seed=0):
+    from scraper import PodcastScraper
+
+    youtube = FakeYouTube(seed=seed)
+    videos = [youtube.video_info(f"bench-{i:04d}") for i in range(2000)]
+    samples = [(v['title'], v['duration']) for v in videos]
+    check = PodcastScraper.is_podcast_episode
+
+    started = time.perf_counter()
+    accepted = 0
+    for i in range(calls):
+        title, duration = samples[i % len(samples)]
+        accepted += check(None, title, duration)
+    elapsed = time.perf_counter() - started
+    return {
+        'calls': calls,
+        'seconds': round(elapsed, 4),
+        'calls_per_second': round(calls / elapsed),
+        'accepted_ratio': round(accepted / calls, 3),
+    }
+
+
+def bench_scrape(workdir, target, latency, throttle_rate, error_rate, setup_latency=0.0, seed=0, verbose=False):
+    from scraper import PodcastScraper
+
+    output_dir = os.path.join(workdir, 'scrape')
+    shutil.rmtree(output_dir, ignore_errors=True)
+    youtube = FakeYouTube(latency=latency, throttle_rate=throttle_rate, error_rate=error_rate,
+                          transcript_words=2000, setup_latency=setup_latency, seed=seed)
+    arrivals = []
+    scraper = PodcastScraper(
+        output_dir,
+        cache_mode='off',
+        # The limiter's pacing is policy, not work; take it out of the measurement
+        host_rates={'youtube': 10000, 'transcripts': 10000},
+        ydl_class=youtube.YoutubeDL,
+        transcript_api_class=youtube.YouTubeTranscriptApi,
+        on_episode=lambda episode: arrivals.append(time.monotonic()),
+    )
+    for host in ('youtube', 'transcripts'):
+        scraper.rate_limiter.bucket(host).backoff_seconds = 0.05
+
+    started = time.monotonic()
+    with quiet(not verbose):
+        stats = scraper.scrape_all(target_total=target)
+    elapsed = time.monotonic() - started
+
+    gaps = [b - a for a, b in zip([started] + arrivals, arrivals)]
+    return {
+        'target': target,
+        'episodes': stats['total'],
+        'seconds': round(elapsed, 3),
+        'episodes_per_second': round(stats['total'] / elapsed, 2) if elapsed else None,
+        'requests': dict(youtube.calls),
+        'requests_per_episode': round(sum(youtube.calls.values()) / max(1, stats['total']), 2),
+        'client_setups': dict(youtube.setups),
+        'clients': stats['clients'],
+        'episode_gap': latency_stats(gaps),
+        'throttled': sum(host['throttled'] for host in stats['rate_limits'].values()),
+    }
+
+
+def bench_summarize(corpus, workdir, limit, latency, error_rate, concurrency, verbose=False):
+    from summarizer import PodicalsSummarizer
+
+    server = FakeAnthropicServer(latency=latency, error_rate=error_rate, retry_after=0).start()
+    results = {}
+    try:
+        for mode in ('sequential', 'async'):
+            output_dir = os.path.join(workdir, f"summaries-{mode}")
+            shutil.rmtree(output_dir, ignore_errors=True)
+            summarizer = PodicalsSummarizer(os.path.join(corpus, 'transcripts'), output_dir,
+                                            base_url=server.base_url)
+
+            # Picking the pending episodes reads the whole store index
+            started = time.monotonic()
+            with quiet(not verbose):
+                pending = summarizer._pending_entries(None)
+            scan = time.monotonic() - started
+
+            started = time.monotonic()
+            with quiet(not verbose):
+                if mode == 'async':
+                    summaries = summarizer.summarize_all_async(limit, concurrency=concurrency)
+                else:
+                    summaries = summarizer.summarize_all(limit)
+            elapsed = time.monotonic() - started
+
+            done = sum(1 for r in summaries if r['success'])
+            results[mode] = {
+                'episodes': done,
+                'failed': len(summaries) - done,
+                'pending': len(pending),
+                'pending_scan_seconds': round(scan, 3),
+                'seconds': round(elapsed, 3),
+                'episodes_per_second': round(done / elapsed, 2) if elapsed else None,
+                'latency': latency_stats([r['latency_seconds'] for r in summaries if r.get('latency_seconds')]),
+            }
+    finally:
+        server.stop()
+    results['api_requests'] = server.requests
+    return results
+
+
+def bench_export(corpus, workdir, changed_ratio=0.01, verbose=False):
+    from exporter import iter_summary_files
+    from exporter import export_for_website
+
+    # Exports write into the summaries tree's state dir, so work on a copy
+    summaries_dir = os.path.join(workdir, 'export-summaries')
+    shutil.rmtree(summaries_dir, ignore_errors=True)
+    shutil.copytree(os.path.join(corpus, 'summaries'), summaries_dir)
+    output_file = os.path.join(workdir, 'export', 'episodes.json')
+    site_dir = os.path.join(workdir, 'export', 'site')
+    shutil.rmtree(os.path.dirname(output_file), ignore_errors=True)
+
+    def run(**kwargs):
+        started = time.monotonic()
+        with quiet(not verbose):
+            stats = export_for_website(summaries_dir, output_file, site_dir=site_dir, **kwargs)
+        return time.monotonic() - started, stats
+
+    full_seconds, full = run(full=True)
+    noop_seconds, _ = run()
+
+    paths = sorted(path for path, _ in iter_summary_files(summaries_dir))
+    changed = paths[::max(1, int(1 / changed_ratio))] if paths else []
+    for path in changed:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        data['summary'] += '\n\nUpdated.'
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+    incremental_seconds, incremental = run(changed=changed)
+
+    episodes = full['episodes']
+    return {
+        'episodes': episodes,
+        'full_seconds': round(full_seconds, 3),
+        'full_episodes_per_second': round(episodes / full_seconds, 1) if full_seconds else None,
+        'noop_seconds': round(noop_seconds, 3),
+        'incremental_changed': len(changed),
+        'incremental_seconds': round(incremental_seconds, 3),
+        'incremental_files_written': incremental.get('site_files_written'),
+        'output_bytes': os.path.getsize(output_file),
+    }
+
+
+def flatten(results, prefix=''):
+    """{'export.500.full_seconds': 1.2, ...} for the numeric results."""
+    metrics = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            metrics.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            metrics[name] = value
+    return metrics
+
+
+def compare(current, baseline_path):
+    """Print timing and throughput changes against an earlier results file."""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline.get('commit')} ({baseline.get('started_at')}):")
+    for name, value in sorted(current['metrics'].items()):
+        old = baseline.get('metrics', {}).get(name)
+        lower_is_better = name.endswith('seconds')
+        if old in (None, 0) or not (lower_is_better or name.endswith('_per_second')):
+            continue
+        change = (value - old) / old
+        better = change < 0 if lower_is_better else change > 0
+        flag = '' if abs(change) < 0.05 else (' better' if better else ' WORSE')
+        print(f"  {name:60s} {old:>12,.3f} -> {value:>12,.3f} ({change:+.1%}){flag}")
+
+
+def run(args):
+    commit, dirty = git_commit()
+    report = {
+        'version': RESULTS_VERSION,
+        'commit': commit,
+        'dirty': dirty,
+        'started_at': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'config': {k: v for k, v in vars(args).items() if k not in ('compare', 'output')},
+        'results': {},
+    }
+    results = report['results']
+    stages = args.only or STAGES
+    workdir = os.path.join(args.corpus_dir, 'work')
+    os.makedirs(workdir, exist_ok=True)
+
+    print(f"\n{'='*60}")
+    print(f"PODICALS BENCHMARKS")
+    print(f"{'='*60}")
+    print(f"Commit: {commit or 'unknown'}{' (dirty)' if dirty else ''}")
+    print(f"Stages: {', '.join(stages)}; corpus sizes: {', '.join(map(str, args.sizes))}")
+    print(f"{'='*60}\n")
+
+    if 'startup' in stages:
+        results['startup'] = bench_startup(workdir)
+        startup = results['startup']
+        print(f"startup (budget {startup['budget_seconds']}s): " + ', '.join(
+            f"{name} {timing['median_seconds']}s{'' if timing.get('within_budget', True) else ' OVER BUDGET'}"
+            for name, timing in startup.items() if isinstance(timing, dict)
+        ))
+
+    if 'is_podcast_episode' in stages:
+        results['is_podcast_episode'] = bench_is_podcast_episode(seed=args.seed)
+        print(f"is_podcast_episode: {results['is_podcast_episode']['calls_per_second']:,} calls/s")
+
+    if 'scrape' in stages:
+        results['scrape'] = bench_scrape(workdir, args.scrape_target, args.youtube_latency,
+                                         args.throttle_rate, args.error_rate, args.youtube_setup, seed=args.seed,
+                                         verbose=args.verbose)
+        scrape = results['scrape']
+        print(f"scrape_all: {scrape['episodes']} episodes in {scrape['seconds']:.1f}s "
+              f"({scrape['episodes_per_second']}/s, {scrape['requests_per_episode']} requests/episode, "
+              f"{sum(scrape['client_setups'].values())} client setups)")
+
+    for size in args.sizes:
+        if not ({'summarize', 'export'} & set(stages)):
+            break
+        print(f"\nCorpus: {size:,} episodes")
+        corpus = build_corpus(os.path.join(args.corpus_dir, f"corpus-{size}"), size, seed=args.seed)
+
+        if 'summarize' in stages:
+            summarize = bench_summarize(corpus, workdir, min(size, args.summarize_limit), args.api_latency,
+                                        args.api_error_rate, args.concurrency, verbose=args.verbose)
+            results.setdefault('summarize', {})[str(size)] = summarize
+            for mode in ('sequential', 'async'):
+                print(f"  summarize_all ({mode}): {summarize[mode]['episodes_per_second']}/s, "
+                      f"p95 {summarize[mode]['latency']['p95_seconds']}s, "
+                      f"pending scan {summarize[mode]['pending_scan_seconds']}s")
+
+        if 'export' in stages:
+            export = bench_export(corpus, workdir, verbose=args.verbose)
+            results.setdefault('export', {})[str(size)] = export
+            print(f"  export_for_website: full {export['full_seconds']}s, no-op {export['noop_seconds']}s, "
+                  f"{export['incremental_changed']} changed {export['incremental_seconds']}s")
+
+    report['metrics'] = flatten(results)
+
+    output = args.output or os.path.join(args.corpus_dir, 'results', f"{commit or 'unknown'}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\n{'='*60}")
+    print(f"Results saved to: {output}")
+    if args.compare:
+        compare(report, args.compare)
+    print(f"{'='*60}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmarks for scrape, summarize and export")
+    parser.add_argument('--sizes', type=lambda s: [int(n) for n in s.split(',')], default=DEFAULT_SIZES,
+                        help="Corpus sizes, e.g. 500,10000,100000")
+    parser.add_argument('--only', action='append', choices=STAGES, help="Run only these stages")
+    parser.add_argument('--corpus-dir', default='./.cache/bench')
+    parser.add_argument('--output', default=None, help="Results file (default: <corpus-dir>/results/<commit>.json)")
+    parser.add_argument('--compare', default=None, help="Earlier results file to compare against")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--scrape-target', type=int, default=200)
+    parser.add_argument('--youtube-latency', type=float, default=0.02, help="Seconds per fake YouTube call")
+    parser.add_argument('--youtube-setup', type=float, default=0.05,
+                        help="Seconds to construct a fake YouTube client (extractor setup, TLS handshake)")
+    parser.add_argument('--throttle-rate', type=float, default=0.01, help="Fraction of 429s from fake YouTube")
+    parser.add_argument('--error-rate', type=float, default=0.01, help="Fraction of other fake YouTube errors")
+    parser.add_argument('--summarize-limit', type=int, default=100, help="Episodes summarized per corpus")
+    parser.add_argument('--api-latency', type=float, default=0.05, help="Seconds per fake Anthropic message")
+    parser.add_argument('--api-error-rate', type=float, default=0.02, help="Fraction of 429s from fake Anthropic")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--verbose', action='store_true', help="Show the stages' own output")
+    args = parser.parse_args()
+
+    run(args)
@@ -0,0 +1,181 @@
+"""
+Podicals - Token Budget
+Keeps a summarization run inside a spending limit. Every pending transcript
+gets a preflight token estimate from the store index (no decompression),
+episodes are taken in priority order (views, discounted by age), and each
+one is admitted only if its estimate still fits what's left of the budget,
+on the configured model or, failing that, on a cheaper one. Whatever
+doesn't fit stays pending for the next run.
+
+Estimates are reserved while a request is in flight and replaced by the
+response's actual usage when it finishes, so concurrent runs can't
+overshoot on optimism alone.
+
+    budget = TokenBudget(max_cost_usd=5.00, model=DEFAULT_MODEL, downgrade_model=DOWNGRADE_MODEL)
+    model = budget.admit(estimate)          # None: doesn't fit (yet); budget.defer(estimate) to give up
+    budget.settle(estimate, model, usage)   # after the response (usage None if it failed)
+"""
+
+import math
+import threading
+from datetime import datetime
+
+
+# USD per million (input, output) tokens
+MODEL_PRICES = {
+    'claude-opus-4-20250514': (15.00, 75.00),
+    'claude-sonnet-4-20250514': (3.00, 15.00),
+    'claude-3-7-sonnet-20250219': (3.00, 15.00),
+    'claude-3-5-haiku-20241022': (0.80, 4.00),
+}
+# Unknown models are priced like the most expensive known one
+FALLBACK_PRICES = max(MODEL_PRICES.values())
+# Message Batches are billed at half price
+BATCH_DISCOUNT = 0.5
+
+# Cheaper model used once the configured one no longer fits the budget
+DOWNGRADE_MODEL = 'claude-3-5-haiku-20241022'
+
+# Reservations are padded, as estimates are rough (~4 characters per token)
+ESTIMATE_MARGIN = 1.15
+
+# An episode's priority halves for every this many days since upload
+RECENCY_HALF_LIFE_DAYS = 90
+
+
+def model_prices(model):
+    return MODEL_PRICES.get(model, FALLBACK_PRICES)
+
+
+def usage_cost(usage, model, batch=False):
+    """USD cost of a usage dict ({'input_tokens', 'output_tokens'})."""
+    input_price, output_price = model_prices(model)
+    cost = ((usage.get('input_tokens') or 0) * input_price + (usage.get('output_tokens') or 0) * output_price) / 1e6
+    return cost * BATCH_DISCOUNT if batch else cost
+
+
+def episode_priority(entry, now=None):
+    """
+    Higher first: log-scaled view count, halved every RECENCY_HALF_LIFE_DAYS
+    since upload. Episodes without a view count rank as if they had 1,000.
+    """
+    now = now or datetime.now()
+    views = entry.get('view_count')
+    score = math.log10(1 + (views if views is not None else 1000))
+    try:
+        age_days = max(0, (now - datetime.strptime(entry.get('upload_date') or '', '%Y%m%d')).days)
+    except ValueError:
+        age_days = RECENCY_HALF_LIFE_DAYS
+    return score * 0.5 ** (age_days / RECENCY_HALF_LIFE_DAYS)
+
+
+class TokenBudget:
+    """
+    Run-level budget in USD and/or total tokens (either may be None for no
+    limit). Thread-safe. Without any limit every episode is admitted on
+    `model`, and the budget only keeps the accounts for the report.
+    """
+
+    def __init__(self, max_cost_usd=None, max_tokens=None, model=None, downgrade_model=DOWNGRADE_MODEL, batch=False):
+        self.max_cost_usd = max_cost_usd
+        self.max_tokens = max_tokens
+        self.model = model
+        # No point downgrading to the same or a pricier model
+        if downgrade_model and model_prices(downgrade_model) >= model_prices(model):
+            downgrade_model = None
+        self.downgrade_model = downgrade_model
+        self.batch = batch
+        self.spent_cost = 0.0
+        self.spent = {'input_tokens': 0, 'output_tokens': 0}
+        self.estimated = {'input_tokens': 0, 'output_tokens': 0}
+        self.reserved_cost = 0.0
+        self.reserved_tokens = 0
+        self.admitted = 0
+        self.downgraded = 0
+        self.deferred = 0
+        self.deferred_estimate = {'input_tokens': 0, 'output_tokens': 0}
+        self._lock = threading.Lock()
+
+    @property
+    def limited(self):
+        return self.max_cost_usd is not None or self.max_tokens is not None
+
+    def _reservation(self, estimate, model):
+        tokens = (estimate['input_tokens'] + estimate['output_tokens']) * ESTIMATE_MARGIN
+        return usage_cost(estimate, model, self.batch) * ESTIMATE_MARGIN, tokens
+
+    def _fits(self, cost, tokens):
+        if self.max_cost_usd is not None and self.spent_cost + self.reserved_cost + cost > self.max_cost_usd:
+            return False
+        spent_tokens = self.spent['input_tokens'] + self.spent['output_tokens']
+        if self.max_tokens is not None and spent_tokens + self.reserved_tokens + tokens > self.max_tokens:
+            return False
+        return True
+
+    def admit(self, estimate, allow_downgrade=True):
+        """
+        Reserve room for an episode's estimated usage. Returns the model to
+        summarize it with, or None if it doesn't fit on any model.
+        """
+        with self._lock:
+            models = [self.model]
+            if self.downgrade_model and allow_downgrade:
+                models.append(self.downgrade_model)
+            for model in models:
+                cost, tokens = self._reservation(estimate, model)
+                if self._fits(cost, tokens):
+                    self.reserved_cost += cost
+                    self.reserved_tokens += tokens
+                    self.admitted += 1
+                    if model != self.model:
+                        self.downgraded += 1
+                    return model
+            return None
+
+    def defer(self, estimate):
+        """Count an episode left for a later run."""
+        with self._lock:
+            self.deferred += 1
+            for key in self.deferred_estimate:
+                self.deferred_estimate[key] += estimate[key]
+
+    def settle(self, estimate, model, usage=None):
+        """Swap an admitted episode's reservation for its actual usage (None if the request failed)."""
+        with self._lock:
+            cost, tokens = self._reservation(estimate, model)
+            self.reserved_cost = max(0.0, self.reserved_cost - cost)
+            self.reserved_tokens = max(0, self.reserved_tokens - tokens)
+            if usage:
+                self.spent_cost += usage_cost(usage, model, self.batch)
+                for key in self.spent:
+                    self.spent[key] += usage.get(key) or 0
+                    self.estimated[key] += estimate[key]
+
+    def report_lines(self, elapsed, summaries):
+        """Cost and throughput lines for the end-of-run report."""
+        spent_tokens = self.spent['input_tokens'] + self.spent['output_tokens']
+        lines = [
+            f"Tokens: {self.spent['input_tokens']:,} in, {self.spent['output_tokens']:,} out, "
+            f"${self.spent_cost:.2f}" + (" (batch pricing)" if self.batch else ''),
+        ]
+        if summaries:
+            lines.append(f"Per summary: {spent_tokens / summaries:,.0f} tokens, ${self.spent_cost / summaries:.4f}")
+        estimated = self.estimated['input_tokens'] + self.estimated['output_tokens']
+        if estimated:
+            lines.append(f"Preflight estimate: {estimated:,} tokens (actual {100 * (spent_tokens - estimated) / estimated:+.1f}%)")
+        if elapsed and summaries:
+            lines.append(f"Throughput: {60 * summaries / elapsed:.1f} summaries/min, "
+                         f"{self.spent['output_tokens'] / elapsed:,.0f} output tokens/s")
+        if self.limited:
+            limits = []
+            if self.max_cost_usd is not None:
+                limits.append(f"${self.spent_cost:.2f} of ${self.max_cost_usd:.2f}")
+            if self.max_tokens is not None:
+                limits.append(f"{spent_tokens:,} of {self.max_tokens:,} tokens")
+            lines.append(f"Budget: {', '.join(limits)} spent")
+        if self.downgraded:
+            lines.append(f"Downgraded: {self.downgraded} episodes summarized with {self.downgrade_model}")
+        if self.deferred:
+            deferred = self.deferred_estimate['input_tokens'] + self.deferred_estimate['output_tokens']
+            lines.append(f"Deferred: {self.deferred} episodes (~{deferred:,} tokens) left for a later run")
+        return lines
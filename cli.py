@@ -0,0 +1,214 @@
+"""
+Podicals - Command Line
+One entry point for every stage. Each subcommand imports only what it
+needs, so `export` and `status` start without loading yt-dlp or the
+Anthropic SDK (and without needing ANTHROPIC_API_KEY).
+
+    python cli.py scrape --target 500
+    python cli.py summarize --async
+    python cli.py export
+    python cli.py status
+
+Startup is checked against STARTUP_BUDGET_SECONDS by
+`python benchmark.py --only startup`, which also times a real `export` on
+an empty tree (with and without --no-related --no-search).
+"""
+
+import os
+import sys
+import json
+import argparse
+
+
+# Wall-clock budget for `export --help`, `status` and `export` on an empty tree
+STARTUP_BUDGET_SECONDS = 0.5
+
+DEFAULT_TRANSCRIPTS_DIR = './transcripts'
+DEFAULT_SUMMARIES_DIR = './summaries'
+DEFAULT_OUTPUT_FILE = './data/episodes.json'
+DEFAULT_SITE_DIR = './data/site'
+
+
+def _work_queue(path):
+    if not path:
+        return None
+    from work_queue import WorkQueue
+    return WorkQueue(path)
+
+
+def cmd_scrape(args):
+    from scraper import PodcastScraper
+
+    scraper = PodcastScraper(
+        output_dir=args.transcripts,
+        channel_workers=args.channel_workers,
+        episode_workers=args.episode_workers,
+        cache_mode=args.cache_mode,
+        work_queue=_work_queue(args.queue),
+    )
+    stats = scraper.scrape_all(episodes_per_show=args.episodes_per_show, target_total=args.target,
+                               request_budget=args.request_budget)
+
+    print("\nEpisodes by genre:")
+    for genre, count in stats['by_genre'].items():
+        print(f"  {genre}: {count}")
+
+
+def cmd_summarize(args):
+    from budget import DOWNGRADE_MODEL
+    from summarizer import CHUNK_CHARS, PodicalsSummarizer
+
+    work_queue = _work_queue(args.queue)
+    summarizer = PodicalsSummarizer(
+        transcripts_dir=args.transcripts,
+        output_dir=args.summaries,
+        long_mode=not args.truncate_long,
+        chunk_chars=args.chunk_chars or CHUNK_CHARS,
+        compact=not args.no_compact,
+        count_tokens=args.count_tokens,
+        work_queue=work_queue,
+        budget_usd=args.budget_usd,
+        budget_tokens=args.budget_tokens,
+        downgrade_model=None if args.no_downgrade else DOWNGRADE_MODEL,
+    )
+    if args.batch:
+        summarizer.summarize_all_batch(args.limit, wait=not args.no_wait, poll_interval=args.poll_interval)
+    elif args.use_async:
+        summarizer.summarize_all_async(args.limit, args.concurrency, args.max_concurrency)
+    else:
+        summarizer.summarize_all(args.limit)
+
+    if not args.no_export:
+        from exporter import export_for_website
+        export_for_website(args.summaries, site_dir=DEFAULT_SITE_DIR, work_queue=work_queue,
+                           transcripts_dir=args.transcripts)
+
+
+def cmd_export(args):
+    from exporter import DEFAULT_PAGE_SIZE, export_for_website
+
+    export_for_website(
+        args.summaries, args.output,
+        full=args.full,
+        site_dir=None if args.no_site else args.site,
+        page_size=args.page_size or DEFAULT_PAGE_SIZE,
+        work_queue=_work_queue(args.queue),
+        transcripts_dir=args.transcripts,
+        search=not args.no_search,
+        related=not args.no_related,
+    )
+
+
+def _read_json(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def cmd_status(args):
+    """Counts from the files each stage leaves behind; reads no transcripts or summaries."""
+    from transcript_store import TranscriptStore
+    from summary_cache import SummaryCache
+
+    print(f"\n{'='*60}")
+    print(f"PODICALS STATUS")
+    print(f"{'='*60}")
+
+    print(f"Transcripts: {len(TranscriptStore(args.transcripts))} in {args.transcripts}")
+    scrape_stats = _read_json(os.path.join(args.transcripts, 'scrape_stats.json'))
+    if scrape_stats:
+        print(f"  Last scrape: {scrape_stats.get('total', 0)} episodes, finished {scrape_stats.get('completed_at')}")
+
+    print(f"Summaries: {len(SummaryCache(args.summaries))} in {args.summaries}")
+    batches = (_read_json(os.path.join(args.summaries, 'batches.json')) or {}).get('batches', {})
+    open_batches = [batch_id for batch_id, batch in batches.items() if not batch.get('collected')]
+    if open_batches:
+        print(f"  Open batches: {len(open_batches)}")
+
+    manifest = _read_json(os.path.join(args.site, 'manifest.json'))
+    if manifest:
+        print(f"Exported: {manifest.get('total_count')} episodes, generated {manifest.get('generated_at')}")
+    elif os.path.exists(args.output):
+        print(f"Exported: {args.output} (no site manifest)")
+    else:
+        print("Exported: nothing yet")
+
+    if args.queue and os.path.exists(args.queue):
+        queue = _work_queue(args.queue)
+        print(f"Queue episodes: {json.dumps(queue.status_counts())}")
+        for stage, counts in sorted(queue.task_counts().items()):
+            print(f"Queue tasks ({stage}): {json.dumps(counts)}")
+    print(f"{'='*60}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='podicals', description="Podicals: scrape, summarize and export podcasts")
+    parser.add_argument('--transcripts', default=DEFAULT_TRANSCRIPTS_DIR)
+    parser.add_argument('--summaries', default=DEFAULT_SUMMARIES_DIR)
+    parser.add_argument('--queue', metavar='DB', default=os.environ.get('PODICALS_QUEUE_DB'),
+                        help="Shared SQLite work queue (see work_queue.py)")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    scrape = sub.add_parser('scrape', help="Scrape transcripts from YouTube")
+    scrape.add_argument('--target', type=int, default=500, help="Episodes to save this run")
+    scrape.add_argument('--episodes-per-show', type=int, default=10, help="Most episodes from one show")
+    scrape.add_argument('--request-budget', type=int, default=None, help="Cap on expected YouTube requests")
+    scrape.add_argument('--channel-workers', type=int, default=4)
+    scrape.add_argument('--episode-workers', type=int, default=4)
+    scrape.add_argument('--cache-mode', default=os.environ.get('PODICALS_CACHE_MODE', 'readwrite'),
+                        choices=['off', 'readwrite', 'record', 'replay'])
+    scrape.set_defaults(func=cmd_scrape)
+
+    summarize = sub.add_parser('summarize', help="Summarize transcripts that need it")
+    summarize.add_argument('--limit', type=int, default=None)
+    summarize.add_argument('--async', dest='use_async', action='store_true',
+                           help="Run many requests concurrently with an adaptive window")
+    summarize.add_argument('--concurrency', type=int, default=8, help="Starting async window")
+    summarize.add_argument('--max-concurrency', type=int, default=32)
+    summarize.add_argument('--batch', action='store_true',
+                           help="Submit pending transcripts as Message Batches (resumable)")
+    summarize.add_argument('--no-wait', action='store_true',
+                           help="With --batch, submit and exit instead of polling until done")
+    summarize.add_argument('--poll-interval', type=int, default=60)
+    summarize.add_argument('--truncate-long', action='store_true',
+                           help="Truncate long transcripts instead of map-reduce chunking")
+    summarize.add_argument('--chunk-chars', type=int, default=None, help="Chunk size for long transcripts")
+    summarize.add_argument('--no-compact', action='store_true',
+                           help="Send transcripts verbatim (skip caption/ad compaction)")
+    summarize.add_argument('--count-tokens', action='store_true',
+                           help="Measure compaction with the token-counting API instead of an estimate")
+    summarize.add_argument('--budget-usd', type=float, default=None, help="Stop spending after this many dollars")
+    summarize.add_argument('--budget-tokens', type=int, default=None, help="Stop after this many input+output tokens")
+    summarize.add_argument('--no-downgrade', action='store_true',
+                           help="When over budget, defer episodes instead of using a cheaper model")
+    summarize.add_argument('--no-export', action='store_true', help="Don't export for the website afterwards")
+    summarize.set_defaults(func=cmd_summarize)
+
+    export = sub.add_parser('export', help="Export summaries for the website")
+    export.add_argument('--output', default=DEFAULT_OUTPUT_FILE)
+    export.add_argument('--site', default=DEFAULT_SITE_DIR, help="Directory for the sharded static export")
+    export.add_argument('--no-site', action='store_true', help="Only write the single episodes.json")
+    export.add_argument('--page-size', type=int, default=None, help="Episodes per genre/podcast page")
+    export.add_argument('--full', action='store_true', help="Discard export state and re-read every summary")
+    export.add_argument('--no-search', action='store_true', help="Skip the full-text search index")
+    export.add_argument('--no-related', action='store_true',
+                        help="Skip related episodes (and the numpy/scipy import)")
+    export.set_defaults(func=cmd_export)
+
+    status = sub.add_parser('status', help="Show what each stage has produced")
+    status.add_argument('--output', default=DEFAULT_OUTPUT_FILE)
+    status.add_argument('--site', default=DEFAULT_SITE_DIR)
+    status.set_defaults(func=cmd_status)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""
+Podicals - Client Pool
+Long-lived YouTube clients shared between scraper workers. Building a
+YoutubeDL or a transcript API client per video repeats extractor setup and
+opens a fresh HTTPS connection every time; pooled clients keep both.
+
+A client is checked out by one worker at a time (neither yt-dlp nor a
+requests session is thread-safe) and handed back afterwards, so the pool
+only ever grows to the number of workers calling at once. A client whose
+call raised is closed instead of handed back: its connection may be broken,
+or its session throttled or blocked.
+
+    pool = ClientPool(lambda key: YoutubeDL(dict(key)), close=lambda ydl: ydl.close(), name='youtube')
+    with pool.client(tuple(sorted(opts.items()))) as ydl:
+        ydl.extract_info(url, download=False)
+"""
+
+import time
+import threading
+from contextlib import contextmanager
+
+
+class ClientPool:
+    """
+    Free list of clients keyed by their options. `factory(key)` builds a
+    client and `close(client)` releases one; `metrics` (a metrics.Metrics)
+    gets checkout counts and setup time labelled with the pool's `name`.
+    """
+
+    def __init__(self, factory, close=None, metrics=None, name='client'):
+        self.factory = factory
+        self.close_client = close
+        self.metrics = metrics
+        self.name = name
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+        self.setup_seconds = 0.0
+        self._free = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def client(self, key=None):
+        """Check out a client for `key`, building one only if none is free."""
+        with self._lock:
+            free = self._free.get(key)
+            client = free.pop() if free else None
+            reused = client is not None
+            if reused:
+                self.reused += 1
+
+        if not reused:
+            started = time.monotonic()
+            client = self.factory(key)
+            setup = time.monotonic() - started
+            with self._lock:
+                self.created += 1
+                self.setup_seconds += setup
+            if self.metrics:
+                self.metrics.observe('client_setup_seconds', setup, pool=self.name)
+        if self.metrics:
+            self.metrics.inc('client_checkouts_total', pool=self.name, outcome='reused' if reused else 'created')
+
+        try:
+            yield client
+        except BaseException:
+            with self._lock:
+                self.discarded += 1
+            if self.metrics:
+                self.metrics.inc('client_discards_total', pool=self.name)
+            self._close(client)
+            raise
+        else:
+            with self._lock:
+                self._free.setdefault(key, []).append(client)
+
+    def _close(self, client):
+        if self.close_client:
+            try:
+                self.close_client(client)
+            except Exception:
+                pass
+
+    def close(self):
+        """Close the idle clients. The pool stays usable and builds new ones as needed."""
+        with self._lock:
+            clients = [client for free in self._free.values() for client in free]
+            self._free = {}
+        for client in clients:
+            self._close(client)
+
+    def stats(self):
+        checkouts = self.created + self.reused
+        return {
+            'created': self.created,
+            'reused': self.reused,
+            'discarded': self.discarded,
+            'reuse_rate': round(self.reused / checkouts, 3) if checkouts else None,
+            'avg_setup_seconds': round(self.setup_seconds / self.created, 4) if self.created else None,
+            'setup_seconds': round(self.setup_seconds, 3),
+        }
@@ -0,0 +1,185 @@
+"""
+Podicals - Transcript Compaction
+Strips what the summary doesn't need before a transcript is sent to Claude:
+rolling caption overlap, non-speech tags like [Music], filler words and
+sponsor reads. Auto-generated captions typically shrink by 10-25%.
+
+    python compaction.py <video_id> [--transcripts ./transcripts]
+"""
+
+import re
+import argparse
+
+
+# Bump when the rules change so cached summaries built from the old
+# compaction are regenerated
+COMPACTION_VERSION = 1
+
+# Caption overlap shorter than this is left alone (people do repeat themselves)
+MIN_OVERLAP_WORDS = 3
+
+NON_SPEECH_RE = re.compile(
+    r'\[\s*(?:music|applause|laughter|laughs|cheering|inaudible|silence|'
+    r'background noise|noise|crosstalk|foreign|__)\s*\]|[♪♫]+',
+    re.IGNORECASE,
+)
+
+FILLER_RE = re.compile(r'\b(?:um+|uh+|uhm+|erm+|hmm+|mm+)\b[,.]?\s*', re.IGNORECASE)
+
+# Phrases that (almost) only appear in ad reads
+AD_MARKERS = (
+    'brought to you by',
+    'sponsored by',
+    'our sponsor',
+    'this episode is supported by',
+    'promo code',
+    'use code',
+    'discount code',
+    'free trial',
+    'percent off',
+    '% off',
+    'dot com slash',
+    '.com/',
+    'first month free',
+    'link in the description',
+)
+
+# Sponsor detection works on windows of consecutive segments
+AD_WINDOW_SEGMENTS = 10
+# A window needs this many marker hits to count as an ad read
+AD_MIN_MARKERS = 2
+# Never cut more than this many windows in a row
+AD_MAX_WINDOWS = 12
+
+
+def estimate_tokens(text):
+    """Rough local token count (~4 characters per token for English)."""
+    return max(1, len(text) // 4) if text else 0
+
+
+def _strip_overlap(previous_words, words):
+    """Drop the longest prefix of words that repeats the end of the previous segment."""
+    limit = min(len(previous_words), len(words))
+    for size in range(limit, MIN_OVERLAP_WORDS - 1, -1):
+        if [w.lower() for w in previous_words[-size:]] == [w.lower() for w in words[:size]]:
+            return words[size:]
+    return words
+
+
+def _ad_windows(texts):
+    """Indexes of segments that fall in detected sponsor reads."""
+    windows = [texts[i:i + AD_WINDOW_SEGMENTS] for i in range(0, len(texts), AD_WINDOW_SEGMENTS)]
+    scores = [
+        sum(' '.join(window).lower().count(marker) for marker in AD_MARKERS)
+        for window in windows
+    ]
+
+    flagged = set()
+    run = 0
+    for i, score in enumerate(scores):
+        # Strong windows, plus weaker neighbours that continue the same read
+        neighbour = (i - 1 in flagged) or (i + 1 < len(scores) and scores[i + 1] >= AD_MIN_MARKERS)
+        if score >= AD_MIN_MARKERS or (score and neighbour):
+            run += 1
+            if run <= AD_MAX_WINDOWS:
+                flagged.add(i)
+        else:
+            run = 0
+
+    return {
+        index
+        for i in flagged
+        for index in range(i * AD_WINDOW_SEGMENTS, min(len(texts), (i + 1) * AD_WINDOW_SEGMENTS))
+    }
+
+
+def compact_segments(segments, auto_generated=True):
+    """
+    Compact caption segments. Returns (segments, removed) where the new
+    segments keep their timing, and removed counts characters dropped
+    by each rule. Overlap and filler removal only apply to auto captions.
+    """
+    removed = {'overlap': 0, 'tags': 0, 'filler': 0, 'ads': 0}
+
+    texts = []
+    previous_words = []
+    for segment in segments:
+        text = segment['text']
+
+        stripped = NON_SPEECH_RE.sub(' ', text)
+        removed['tags'] += len(text) - len(stripped)
+        text = stripped
+
+        if auto_generated:
+            words = text.split()
+            kept = _strip_overlap(previous_words, words)
+            removed['overlap'] += len(' '.join(words)) - len(' '.join(kept))
+            previous_words = words if words else previous_words
+            text = ' '.join(kept)
+
+            stripped = FILLER_RE.sub('', text)
+            removed['filler'] += len(text) - len(stripped)
+            text = stripped
+
+        texts.append(' '.join(text.split()))
+
+    ads = _ad_windows(texts)
+
+    compacted = []
+    for i, (segment, text) in enumerate(zip(segments, texts)):
+        if i in ads:
+            removed['ads'] += len(text)
+            continue
+        if text:
+            compacted.append({**segment, 'text': text})
+
+    return compacted, removed
+
+
+def compact_episode(episode):
+    """
+    Compacted copy of an episode dict plus stats. Works from segments when
+    present (so transcript and segments stay consistent), otherwise from
+    the transcript split into sentences.
+    """
+    transcript = episode.get('transcript') or ''
+    segments = episode.get('segments')
+    if not segments:
+        segments = [{'text': sentence} for sentence in re.split(r'(?<=[.!?])\s+', transcript) if sentence]
+
+    compacted, removed = compact_segments(segments, episode.get('is_auto_generated') is not False)
+    text = ' '.join(segment['text'] for segment in compacted)
+
+    result = dict(episode)
+    result['transcript'] = text
+    if episode.get('segments'):
+        result['segments'] = compacted
+
+    stats = {
+        'version': COMPACTION_VERSION,
+        'chars_before': len(transcript),
+        'chars_after': len(text),
+        'removed_chars': removed,
+    }
+    return result, stats
+
+
+if __name__ == "__main__":
+    from transcript_store import TranscriptStore
+
+    parser = argparse.ArgumentParser(description="Show what compaction removes from one episode")
+    parser.add_argument('video_id')
+    parser.add_argument('--transcripts', default='./transcripts')
+    args = parser.parse_args()
+
+    episode = TranscriptStore(args.transcripts).get(args.video_id)
+    if episode is None:
+        raise SystemExit(f"{args.video_id} is not in the transcript store")
+
+    compacted, stats = compact_episode(episode)
+    before = estimate_tokens(episode['transcript'])
+    after = estimate_tokens(compacted['transcript'])
+    print(f"{episode.get('title')}")
+    print(f"  ~{before:,} -> ~{after:,} tokens ({100 * (before - after) / max(1, before):.1f}% smaller)")
+    for rule, chars in stats['removed_chars'].items():
+        print(f"  {rule}: {chars:,} chars")
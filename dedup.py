@@ -0,0 +1,270 @@
+"""
+Podicals - Duplicate Detection
+Catches the same episode showing up more than once: a channel listed under
+two genres, or a show re-uploading an episode (full video plus a copy on a
+secondary channel). Duplicates are linked to one canonical episode so they
+aren't stored or summarized twice.
+
+Transcripts are compared with MinHash over word shingles, and candidate
+pairs are found with LSH banding, so checking a new transcript costs a few
+dict lookups instead of a comparison against the whole archive.
+
+    python dedup.py --transcripts ./transcripts
+"""
+
+import os
+import re
+import json
+import zlib
+import argparse
+import threading
+from collections import defaultdict
+
+from file_lock import locked
+
+
+DEDUP_FILENAME = 'minhash.jsonl'
+
+# Words per shingle
+SHINGLE_WORDS = 5
+# One-permutation MinHash: each shingle hash lands in one of NUM_BUCKETS
+# buckets and each bucket keeps its minimum
+NUM_BUCKETS = 64
+# 32 bands of 2 rows: pairs at the threshold almost always share a band
+LSH_BANDS = 32
+LSH_ROWS = NUM_BUCKETS // LSH_BANDS
+EMPTY = 0xFFFFFFFF
+# Estimated Jaccard similarity at which two transcripts are the same episode.
+# Separate auto-captioning of the same audio differs here and there, while
+# unrelated episodes share almost no 5-word shingles.
+DUPLICATE_THRESHOLD = 0.6
+# Shorter transcripts don't have enough shingles for a reliable signature
+MIN_SHINGLES = 200
+
+WORD_RE = re.compile(r"[^\W_]+")
+
+
+def normalize_handle(handle):
+    return (handle or '').strip().lstrip('@').lower()
+
+
+def plan_channels(podcasts_by_genre):
+    """
+    Flatten the podcast list, keeping the first listing of each YouTube
+    channel. Returns (plan, duplicates) where plan is [(genre, podcast)]
+    and duplicates describes each listing that was dropped.
+    """
+    plan = []
+    seen = {}
+    duplicates = []
+    for genre, podcasts in podcasts_by_genre.items():
+        for podcast in podcasts:
+            handle = normalize_handle(podcast['youtube_channel'])
+            if handle in seen:
+                first_genre, first = seen[handle]
+                duplicates.append({
+                    'name': podcast['name'],
+                    'genre': genre,
+                    'youtube_channel': podcast['youtube_channel'],
+                    'duplicate_of': first['name'],
+                    'duplicate_of_genre': first_genre,
+                })
+                continue
+            seen[handle] = (genre, podcast)
+            plan.append((genre, podcast))
+    return plan, duplicates
+
+
+def minhash_signature(text):
+    """MinHash signature (NUM_BUCKETS ints) of a transcript, or None if it's too short."""
+    words = WORD_RE.findall((text or '').lower())
+    shingles = set(map(' '.join, zip(*(words[i:] for i in range(SHINGLE_WORDS)))))
+    if len(shingles) < MIN_SHINGLES:
+        return None
+
+    signature = [EMPTY] * NUM_BUCKETS
+    for h in map(zlib.crc32, map(str.encode, shingles)):
+        bucket = h % NUM_BUCKETS
+        value = h // NUM_BUCKETS
+        if value < signature[bucket]:
+            signature[bucket] = value
+    return signature
+
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of two signatures."""
+    pairs = [(x, y) for x, y in zip(a, b) if x != EMPTY or y != EMPTY]
+    if not pairs:
+        return 0.0
+    return sum(1 for x, y in pairs if x == y) / len(pairs)
+
+
+def _bands(signature):
+    return [(band, tuple(signature[band * LSH_ROWS:(band + 1) * LSH_ROWS])) for band in range(LSH_BANDS)]
+
+
+class DuplicateIndex:
+    """
+    Thread-safe LSH index of canonical transcripts, persisted as an
+    append-only log of signatures next to the transcript store.
+
+        index = DuplicateIndex('./transcripts')
+        canonical = index.add(video_id, transcript)   # None if it's new
+
+    find() only looks up, so a caller can register an episode with add()
+    once it has actually been stored. add() appends under a file lock after
+    reading what other processes appended, so processes sharing the log
+    agree on which episode is canonical.
+    """
+
+    def __init__(self, root="./transcripts"):
+        self.path = os.path.join(root, DEDUP_FILENAME)
+        self.signatures = {}
+        # duplicate video_id -> {'duplicate_of', 'similarity'}
+        self.duplicates = {}
+        # Video IDs checked already (including ones too short to sign)
+        self.checked = set()
+        self.found = []
+        self._buckets = defaultdict(list)
+        self._lock = threading.Lock()
+        self._offset = 0
+        with self._lock:
+            self._refresh()
+
+    def _refresh(self):
+        """Read log lines appended since the last call (by this or another process). Caller holds _lock."""
+        try:
+            if os.path.getsize(self.path) <= self._offset:
+                return
+        except OSError:
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            tail = f.read()
+        # A line still being written has no newline yet; leave it for next time
+        complete = tail[:tail.rfind(b'\n') + 1]
+        self._offset += len(complete)
+        for line in complete.decode('utf-8').splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            self._remember(record)
+
+    def _remember(self, record):
+        video_id = record['video_id']
+        # The first record for an id decides; a later one can only come
+        # from a writer that hadn't seen it yet
+        if video_id in self.checked:
+            return
+        self.checked.add(video_id)
+        if record.get('duplicate_of'):
+            self.duplicates[video_id] = {
+                'duplicate_of': record['duplicate_of'],
+                'similarity': record.get('similarity'),
+            }
+        elif record.get('signature'):
+            signature = record['signature']
+            self.signatures[video_id] = signature
+            for key in _bands(signature):
+                self._buckets[key].append(video_id)
+
+    def __contains__(self, video_id):
+        return video_id in self.checked
+
+    def is_duplicate(self, video_id):
+        return video_id in self.duplicates
+
+    def canonical(self, video_id):
+        link = self.duplicates.get(video_id)
+        return link['duplicate_of'] if link else video_id
+
+    def _best_match(self, video_id, signature):
+        candidates = set()
+        for key in _bands(signature):
+            candidates.update(self._buckets.get(key, ()))
+        candidates.discard(video_id)
+
+        best, best_score = None, 0.0
+        for candidate in candidates:
+            score = similarity(signature, self.signatures[candidate])
+            if score > best_score:
+                best, best_score = candidate, score
+        return best, best_score
+
+    def find(self, video_id, transcript, signature=None):
+        """Canonical video_id a transcript duplicates, or None. Registers nothing."""
+        if signature is None:
+            signature = minhash_signature(transcript)
+        with self._lock:
+            self._refresh()
+            if video_id in self.checked:
+                return self.duplicates.get(video_id, {}).get('duplicate_of')
+            if signature is None:
+                return None
+            match, score = self._best_match(video_id, signature)
+            return match if match and score >= DUPLICATE_THRESHOLD else None
+
+    def add(self, video_id, transcript, signature=None):
+        """
+        Check a transcript against the canonical episodes. Returns the
+        canonical video_id if it's a duplicate, otherwise registers it as
+        canonical and returns None. `signature` skips recomputing one
+        already made for find().
+        """
+        if signature is None:
+            signature = minhash_signature(transcript)
+        with self._lock, locked(self.path):
+            self._refresh()
+            if video_id in self.checked:
+                return self.duplicates.get(video_id, {}).get('duplicate_of')
+
+            record = {'video_id': video_id}
+            if signature is not None:
+                match, score = self._best_match(video_id, signature)
+                if match and score >= DUPLICATE_THRESHOLD:
+                    record.update(duplicate_of=match, similarity=round(score, 3))
+                    self.found.append(record)
+                else:
+                    record['signature'] = signature
+
+            with open(self.path, 'ab') as f:
+                f.write((json.dumps(record, separators=(',', ':')) + '\n').encode('utf-8'))
+                # Nothing else was appended since _refresh, so this is read up to the end
+                self._offset = f.tell()
+            self._remember(record)
+            return record.get('duplicate_of')
+
+    def sync(self, store):
+        """Check stored transcripts not seen yet, oldest first (so the first upload stays canonical)."""
+        with self._lock:
+            self._refresh()
+        pending = [entry['video_id'] for entry in store.entries() if entry['video_id'] not in self.checked]
+        for video_id in pending:
+            episode = store.get(video_id, with_segments=False)
+            if episode is not None:
+                self.add(video_id, episode.get('transcript'))
+        return len(pending)
+
+
+if __name__ == "__main__":
+    from scraper import PODCASTS_BY_GENRE
+    from transcript_store import TranscriptStore
+
+    parser = argparse.ArgumentParser(description="Find duplicate channels and episodes")
+    parser.add_argument('--transcripts', default='./transcripts')
+    args = parser.parse_args()
+
+    _, channels = plan_channels(PODCASTS_BY_GENRE)
+    for channel in channels:
+        print(f"Channel {channel['youtube_channel']} is listed as both "
+              f"{channel['duplicate_of']} ({channel['duplicate_of_genre']}) and {channel['name']} ({channel['genre']})")
+
+    store = TranscriptStore(args.transcripts)
+    index = DuplicateIndex(args.transcripts)
+    checked = index.sync(store)
+    print(f"Checked {checked} new transcripts; {len(index.duplicates)} duplicates in total")
+    for video_id, link in sorted(index.duplicates.items()):
+        entry = store.index.get(video_id) or {}
+        print(f"  {video_id} ({entry.get('podcast_name')}: {(entry.get('title') or '')[:50]}) "
+              f"-> {link['duplicate_of']} ({link['similarity']:.0%} similar)")
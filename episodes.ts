@@ -1,6 +1,13 @@
 // Sample episode data for development
 // In production, this would be loaded from the JSON export
 
+// A heading in the summary; id matches the anchor in html
+export interface EpisodeSection {
+  id: string
+  title: string
+  level: number
+}
+
 export interface Episode {
   id: string
   podcast: string
@@ -11,6 +18,14 @@ export interface Episode {
   view_count?: number
   summary: string
   youtube_url: string
+  // Prerendered at export time (prerender.py), so pages never parse markdown.
+  // html is sanitized and leaves out the headline.
+  headline?: string | null
+  hook?: string
+  html?: string
+  sections?: EpisodeSection[]
+  word_count?: number
+  reading_minutes?: number
 }
 
 export const episodes: Episode[] = [
@@ -45,6 +60,18 @@ Inevitably, the topic of X (formerly Twitter) came up. Musk defended his approac
 ## Bottom Line
 
 This episode is essential listening for anyone interested in technology, space, or just the unique way Musk's mind works. At three hours, it's a commitment, but there's genuine substance here beyond the headlines. If you're short on time, the AI and Neuralink sections are the standouts.`,
+    headline: "Elon Musk Returns for a Marathon Conversation About Everything",
+    hook: "Joe Rogan welcomed Elon Musk back to the podcast this week for another sprawling three-hour conversation that touched on everything from artificial intelligence to the colonization of Mars—with plenty of detours along the way.",
+    html: "<p>Joe Rogan welcomed Elon Musk back to the podcast this week for another sprawling three-hour conversation that touched on everything from artificial intelligence to the colonization of Mars—with plenty of detours along the way.</p>\n<h2 id=\"the-big-picture-on-ai\">The Big Picture on AI</h2>\n<p>Musk didn't hold back on his concerns about artificial intelligence development. He argued that we're approaching a critical juncture where AI capabilities are advancing faster than our ability to understand or control them. \"We're essentially summoning a demon,\" he said, echoing warnings he's made before but with renewed urgency given recent developments in large language models.</p>\n<h2 id=\"spacex-and-the-mars-timeline\">SpaceX and the Mars Timeline</h2>\n<p>On the space front, Musk was characteristically optimistic. He suggested that SpaceX could have humans on Mars within the decade, describing the red planet as \"humanity's backup drive.\" Rogan pushed back on the timeline, pointing out that Musk's predictions have historically been... ambitious.</p>\n<h2 id=\"neuralink-updates\">Neuralink Updates</h2>\n<p>The conversation took a fascinating turn when discussing Neuralink's recent progress. Musk described watching patients with paralysis regain the ability to control devices with their thoughts as \"the most meaningful thing I've ever been part of.\"</p>\n<h2 id=\"the-social-media-question\">The Social Media Question</h2>\n<p>Inevitably, the topic of X (formerly Twitter) came up. Musk defended his approach to content moderation, arguing that free speech—even uncomfortable speech—is essential for a functioning democracy. Rogan nodded along but raised questions about where the lines should be drawn.</p>\n<h2 id=\"bottom-line\">Bottom Line</h2>\n<p>This episode is essential listening for anyone interested in technology, space, or just the unique way Musk's mind works. At three hours, it's a commitment, but there's genuine substance here beyond the headlines. If you're short on time, the AI and Neuralink sections are the standouts.</p>",
+    sections: [
+      { id: "the-big-picture-on-ai", title: "The Big Picture on AI", level: 2 },
+      { id: "spacex-and-the-mars-timeline", title: "SpaceX and the Mars Timeline", level: 2 },
+      { id: "neuralink-updates", title: "Neuralink Updates", level: 2 },
+      { id: "the-social-media-question", title: "The Social Media Question", level: 2 },
+      { id: "bottom-line", title: "Bottom Line", level: 2 }
+    ],
+    word_count: 288,
+    reading_minutes: 2,
     youtube_url: "https://youtube.com/watch?v=example1"
   },
   {
@@ -82,6 +109,19 @@ The last hour before bed should be low-light, low-stimulation. Huberman uses dim
 ## Bottom Line
 
 This is Huberman at his best: actionable, science-backed advice you can implement tonight. Even if you've heard some of this before, the depth of explanation helps it stick. Worth the two hours.`,
+    headline: "Huberman Delivers the Ultimate Sleep Protocol",
+    hook: "Andrew Huberman dedicated this week's episode to the science of sleep, and it might be his most practical episode yet. If you've been struggling with rest, this one's for you.",
+    html: "<p>Andrew Huberman dedicated this week's episode to the science of sleep, and it might be his most practical episode yet. If you've been struggling with rest, this one's for you.</p>\n<h2 id=\"the-morning-light-protocol\">The Morning Light Protocol</h2>\n<p>Huberman's number one recommendation: get sunlight in your eyes within 30-60 minutes of waking. Not through a window—actually outside. This sets your circadian rhythm and makes falling asleep later significantly easier. He spent a good twenty minutes on the science here, but the takeaway is simple.</p>\n<h2 id=\"the-temperature-connection\">The Temperature Connection</h2>\n<p>Your body needs to drop its core temperature to initiate sleep. Huberman recommends keeping your bedroom cold (around 65-67°F) and taking a warm shower before bed—counterintuitively, this helps your body cool down faster afterward.</p>\n<h2 id=\"caffeine-s-hidden-impact\">Caffeine's Hidden Impact</h2>\n<p>Even if you fall asleep fine after afternoon coffee, caffeine disrupts your sleep architecture. Huberman suggests a hard cutoff at 2 PM, noting that caffeine has a half-life of 5-6 hours, meaning half of that 3 PM latte is still in your system at 9 PM.</p>\n<h2 id=\"supplements-that-actually-work\">Supplements That Actually Work</h2>\n<p>Huberman walked through the evidence on magnesium (threonate specifically), theanine, and apigenin. He takes all three about 30-45 minutes before bed. He was notably skeptical of melatonin at typical doses, suggesting most supplements contain way more than the body naturally produces.</p>\n<h2 id=\"the-wind-down-routine\">The Wind-Down Routine</h2>\n<p>The last hour before bed should be low-light, low-stimulation. Huberman uses dim red lights and avoids screens, or uses blue-light blockers if he must. He emphasized that this isn't about being perfect—it's about being consistent.</p>\n<h2 id=\"bottom-line\">Bottom Line</h2>\n<p>This is Huberman at his best: actionable, science-backed advice you can implement tonight. Even if you've heard some of this before, the depth of explanation helps it stick. Worth the two hours.</p>",
+    sections: [
+      { id: "the-morning-light-protocol", title: "The Morning Light Protocol", level: 2 },
+      { id: "the-temperature-connection", title: "The Temperature Connection", level: 2 },
+      { id: "caffeine-s-hidden-impact", title: "Caffeine's Hidden Impact", level: 2 },
+      { id: "supplements-that-actually-work", title: "Supplements That Actually Work", level: 2 },
+      { id: "the-wind-down-routine", title: "The Wind-Down Routine", level: 2 },
+      { id: "bottom-line", title: "Bottom Line", level: 2 }
+    ],
+    word_count: 296,
+    reading_minutes: 2,
     youtube_url: "https://youtube.com/watch?v=example2"
   },
   {
@@ -119,6 +159,19 @@ A brief but interesting discussion about TikTok's uncertain future and what it m
 ## Bottom Line
 
 This is All-In at its best—smart people with different perspectives actually debating rather than just agreeing with each other. Essential listening if you're trying to understand where markets and tech are heading.`,
+    headline: "The Besties Debate Whether AI Is a Bubble",
+    hook: "This week's All-In brought the heat, with the four co-hosts taking surprisingly different positions on whether we're in an AI bubble and what the Fed's recent moves mean for the economy.",
+    html: "<p>This week's All-In brought the heat, with the four co-hosts taking surprisingly different positions on whether we're in an AI bubble and what the Fed's recent moves mean for the economy.</p>\n<h2 id=\"the-fed-s-surprise-pivot\">The Fed's Surprise Pivot</h2>\n<p>The episode opened with a deep dive into the Federal Reserve's latest signals. Chamath argued that the Fed is seeing something in the data that the market hasn't priced in yet—possibly early signs of a harder landing. Friedberg pushed back, suggesting the Fed is simply returning to normal after overcorrecting.</p>\n<h2 id=\"is-ai-a-bubble\">Is AI a Bubble?</h2>\n<p>This is where things got spicy. Sacks made the case that current AI valuations are \"absolutely insane\" and compared the moment to 1999. Chamath countered that AI is fundamentally different because the technology actually works and is generating real revenue. Jason tried to play moderator and mostly failed.</p>\n<h2 id=\"the-nvidia-question\">The Nvidia Question</h2>\n<p>All four agreed that Nvidia is the most important company in AI right now, but they disagreed wildly on valuation. The debate essentially came down to: is Nvidia a picks-and-shovels play in a gold rush, or is it building a moat that will last decades?</p>\n<h2 id=\"startup-market-update\">Startup Market Update</h2>\n<p>The besties shared some candid observations about the current fundraising environment. Down rounds are becoming more common, and several unicorns are facing \"come to Jesus\" moments about their valuations. Chamath revealed he's passed on several deals recently that would have been automatic yeses two years ago.</p>\n<h2 id=\"the-tiktok-situation\">The TikTok Situation</h2>\n<p>A brief but interesting discussion about TikTok's uncertain future and what it means for the creator economy. Sacks thinks a ban is coming; Friedberg thinks it'll be spun off to American investors.</p>\n<h2 id=\"bottom-line\">Bottom Line</h2>\n<p>This is All-In at its best—smart people with different perspectives actually debating rather than just agreeing with each other. Essential listening if you're trying to understand where markets and tech are heading.</p>",
+    sections: [
+      { id: "the-fed-s-surprise-pivot", title: "The Fed's Surprise Pivot", level: 2 },
+      { id: "is-ai-a-bubble", title: "Is AI a Bubble?", level: 2 },
+      { id: "the-nvidia-question", title: "The Nvidia Question", level: 2 },
+      { id: "startup-market-update", title: "Startup Market Update", level: 2 },
+      { id: "the-tiktok-situation", title: "The TikTok Situation", level: 2 },
+      { id: "bottom-line", title: "Bottom Line", level: 2 }
+    ],
+    word_count: 318,
+    reading_minutes: 2,
     youtube_url: "https://youtube.com/watch?v=example3"
   },
   {
@@ -156,6 +209,19 @@ The case remains open. Police recently announced they're reviewing new evidence,
 ## Bottom Line
 
 This one will stick with you. The hosts handle the material sensitively while not shying away from the darker possibilities. If you have any information about Sarah Chen, the tip line is included in the episode.`,
+    headline: "A Missing Persons Case That Will Haunt You",
+    hook: "Ashley and Brit tackle one of 2024's most perplexing disappearances this week, and it's a case that has more questions than answers.",
+    html: "<p>Ashley and Brit tackle one of 2024's most perplexing disappearances this week, and it's a case that has more questions than answers.</p>\n<h2 id=\"the-night-sarah-vanished\">The Night Sarah Vanished</h2>\n<p>Sarah Chen, a 28-year-old software engineer, left her San Francisco apartment on September 15th to meet a friend for dinner. She never arrived. Her phone pinged once near the Embarcadero, then went dark.</p>\n<h2 id=\"the-investigation\">The Investigation</h2>\n<p>Police initially treated this as a voluntary disappearance—Sarah was an adult, and there was no sign of foul play at her apartment. But her family knew something was wrong. Sarah was meticulous about communication; she wouldn't just vanish.</p>\n<h2 id=\"the-boyfriend-question\">The Boyfriend Question</h2>\n<p>Sarah's boyfriend of two years was quickly scrutinized, but his alibi checked out—he was at a work conference in Seattle with dozens of witnesses. Still, the hosts noted some inconsistencies in his initial statements to police that were never fully explained.</p>\n<h2 id=\"the-digital-trail\">The Digital Trail</h2>\n<p>This case is particularly interesting because of what wasn't found. Sarah's social media showed no signs of distress. Her bank accounts haven't been touched. Her passport was still in her apartment. Wherever she went—or was taken—she left her entire life behind.</p>\n<h2 id=\"where-it-stands\">Where It Stands</h2>\n<p>The case remains open. Police recently announced they're reviewing new evidence, but haven't said what it is. Sarah's family has set up a foundation and offers a $50,000 reward for information.</p>\n<h2 id=\"bottom-line\">Bottom Line</h2>\n<p>This one will stick with you. The hosts handle the material sensitively while not shying away from the darker possibilities. If you have any information about Sarah Chen, the tip line is included in the episode.</p>",
+    sections: [
+      { id: "the-night-sarah-vanished", title: "The Night Sarah Vanished", level: 2 },
+      { id: "the-investigation", title: "The Investigation", level: 2 },
+      { id: "the-boyfriend-question", title: "The Boyfriend Question", level: 2 },
+      { id: "the-digital-trail", title: "The Digital Trail", level: 2 },
+      { id: "where-it-stands", title: "Where It Stands", level: 2 },
+      { id: "bottom-line", title: "Bottom Line", level: 2 }
+    ],
+    word_count: 274,
+    reading_minutes: 2,
     youtube_url: "https://youtube.com/watch?v=example4"
   },
   {
@@ -193,6 +259,19 @@ The brothers offered some start/sit advice for fantasy playoffs, though Jason ad
 ## Bottom Line
 
 This is New Heights at its most fun—football analysis mixed with genuine family dynamics. Even if you're not a Chiefs or Eagles fan, the Kelce chemistry makes this an easy listen.`,
+    headline: "The Kelce Brothers Break Down Week 15",
+    hook: "Jason and Travis Kelce delivered another entertaining episode that somehow managed to cover everything from playoff implications to their mom's holiday baking schedule.",
+    html: "<p>Jason and Travis Kelce delivered another entertaining episode that somehow managed to cover everything from playoff implications to their mom's holiday baking schedule.</p>\n<h2 id=\"chiefs-keep-rolling\">Chiefs Keep Rolling</h2>\n<p>Travis was in good spirits after another Chiefs victory, though he admitted the team isn't playing its best football right now. \"We're finding ways to win, which is what matters in December,\" he said. Jason pushed him on whether the offense has become too predictable, leading to a surprisingly technical breakdown of route combinations.</p>\n<h2 id=\"eagles-locker-room-situation\">Eagles' Locker Room Situation</h2>\n<p>Jason addressed the elephant in the room: reports of tension in the Eagles locker room. Without naming names, he suggested that some players need to \"stop talking to reporters and start talking to each other.\" It was as close to criticism as Jason typically gets about his own team.</p>\n<h2 id=\"the-best-nfl-defenses-right-now\">The Best NFL Defenses Right Now</h2>\n<p>Both brothers agreed that Baltimore's defense is playing at an elite level, with Travis adding that the Ravens are the team he least wants to see in the playoffs. They also gave props to Cleveland's defense despite the team's struggles on offense.</p>\n<h2 id=\"mom-corner\">Mom Corner</h2>\n<p>Donna Kelce called in to discuss her holiday plans, including her famous Christmas cookies that both brothers have been begging her to make. She also revealed she's been getting recognized more often at the grocery store, which she handles with good humor.</p>\n<h2 id=\"fantasy-football-advice\">Fantasy Football Advice</h2>\n<p>The brothers offered some start/sit advice for fantasy playoffs, though Jason admitted he's \"completely checked out\" of his own fantasy league after getting eliminated.</p>\n<h2 id=\"bottom-line\">Bottom Line</h2>\n<p>This is New Heights at its most fun—football analysis mixed with genuine family dynamics. Even if you're not a Chiefs or Eagles fan, the Kelce chemistry makes this an easy listen.</p>",
+    sections: [
+      { id: "chiefs-keep-rolling", title: "Chiefs Keep Rolling", level: 2 },
+      { id: "eagles-locker-room-situation", title: "Eagles' Locker Room Situation", level: 2 },
+      { id: "the-best-nfl-defenses-right-now", title: "The Best NFL Defenses Right Now", level: 2 },
+      { id: "mom-corner", title: "Mom Corner", level: 2 },
+      { id: "fantasy-football-advice", title: "Fantasy Football Advice", level: 2 },
+      { id: "bottom-line", title: "Bottom Line", level: 2 }
+    ],
+    word_count: 299,
+    reading_minutes: 2,
     youtube_url: "https://youtube.com/watch?v=example5"
   },
   {
@@ -234,6 +313,20 @@ Both agreed that some form of AI regulation is needed but differed on what it sh
 ## Bottom Line
 
 At four hours, this is a serious commitment. But if you want to understand where AI is heading from one of the people steering it, this conversation is essential. The safety and AGI sections alone are worth your time.`,
+    headline: "Four Hours with the Man Building AGI",
+    hook: "Lex Fridman sat down with OpenAI CEO Sam Altman for an exhaustive conversation about artificial intelligence, the future of humanity, and everything in between.",
+    html: "<p>Lex Fridman sat down with OpenAI CEO Sam Altman for an exhaustive conversation about artificial intelligence, the future of humanity, and everything in between.</p>\n<h2 id=\"the-state-of-gpt\">The State of GPT</h2>\n<p>Altman was characteristically coy about GPT-5 specifics but confirmed that the next generation represents a \"significant leap\" beyond current capabilities. He suggested that the improvement isn't just about the model being smarter—it's about making AI more useful in everyday contexts.</p>\n<h2 id=\"the-safety-debate\">The Safety Debate</h2>\n<p>A significant portion of the conversation focused on AI safety. Altman defended OpenAI's iterative deployment approach, arguing that releasing capable systems to the public allows for real-world learning about risks and benefits. He acknowledged critics but suggested that keeping AI development in secret labs would be far more dangerous.</p>\n<h2 id=\"the-microsoft-partnership\">The Microsoft Partnership</h2>\n<p>Lex pushed Altman on OpenAI's relationship with Microsoft and whether it compromises the organization's mission. Altman insisted the partnership has been \"net positive for humanity\" by providing the compute resources needed to advance the research.</p>\n<h2 id=\"agi-timeline\">AGI Timeline</h2>\n<p>When pressed on when we might achieve artificial general intelligence, Altman declined to give a specific year but suggested it could happen \"much sooner than most people think.\" He defined AGI not as superhuman intelligence but as AI that can do most cognitive tasks that humans can do.</p>\n<h2 id=\"personal-reflections\">Personal Reflections</h2>\n<p>The conversation took a philosophical turn when discussing Altman's personal life and motivations. He spoke candidly about the weight of responsibility he feels and the criticism he's faced. It was a rare vulnerable moment from someone usually laser-focused on the technical.</p>\n<h2 id=\"regulation-and-governance\">Regulation and Governance</h2>\n<p>Both agreed that some form of AI regulation is needed but differed on what it should look like. Altman advocated for international coordination, while Lex expressed concerns about regulatory capture.</p>\n<h2 id=\"bottom-line\">Bottom Line</h2>\n<p>At four hours, this is a serious commitment. But if you want to understand where AI is heading from one of the people steering it, this conversation is essential. The safety and AGI sections alone are worth your time.</p>",
+    sections: [
+      { id: "the-state-of-gpt", title: "The State of GPT", level: 2 },
+      { id: "the-safety-debate", title: "The Safety Debate", level: 2 },
+      { id: "the-microsoft-partnership", title: "The Microsoft Partnership", level: 2 },
+      { id: "agi-timeline", title: "AGI Timeline", level: 2 },
+      { id: "personal-reflections", title: "Personal Reflections", level: 2 },
+      { id: "regulation-and-governance", title: "Regulation and Governance", level: 2 },
+      { id: "bottom-line", title: "Bottom Line", level: 2 }
+    ],
+    word_count: 340,
+    reading_minutes: 2,
     youtube_url: "https://youtube.com/watch?v=example6"
   }
 ]
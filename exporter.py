@@ -0,0 +1,755 @@
+"""
+Podicals - Website Export
+Incremental export of summaries to data/episodes.json. A manifest of summary
+files (mtime, size, content hash) means each run only reads summaries that
+changed. Export records are kept pre-serialized in an append-only log, and
+episodes.json is streamed from that log, so memory stays flat however large
+the archive gets.
+
+State lives next to the output file:
+    <output dir>/.export/index.jsonl     one line per summary file (later lines win)
+    <output dir>/.export/records*.jsonl  serialized export records, back to back
+
+With a site_dir the export is also written as static shards the website can
+load piecemeal, each named by its content hash so a CDN can cache it forever:
+    <site>/manifest.json                          entry point (short cache)
+    <site>/episodes/<id>.<hash>.json              one full summary, with its prerendered HTML
+    <site>/listing/page-NNNN.<hash>.json          listing entries, all episodes
+    <site>/genre/<genre>/page-NNNN.<hash>.json    listing entries per genre
+    <site>/podcast/<slug>/page-NNNN.<hash>.json   listing entries per podcast
+    <site>/search/                                client-side search shards
+    <site>/related/<xx>.<hash>.json               related episode ids, by first id character
+
+The export also keeps the full-text search index (search_index.py) in step
+with the summaries, and optionally with the transcript store, and updates
+the related-episodes index (related.py) for the episodes that changed.
+Summaries are prerendered to HTML as they are exported (prerender.py), so
+records carry html, headline, hook, sections and reading time.
+
+    python exporter.py            # incremental
+    python exporter.py --full     # rebuild state from scratch
+    python exporter.py --site ./data/site --page-size 24
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import argparse
+import threading
+from datetime import datetime
+
+from alignment import timestamp_url
+from prerender import PRERENDER_VERSION, Prerenderer
+from search_index import SearchIndex, sync_transcripts
+from transcript_store import TranscriptStore
+
+
+STATE_DIRNAME = '.export'
+INDEX_FILENAME = 'index.jsonl'
+RECORDS_FILENAME = 'records.jsonl'
+
+# Rewrite the logs once superseded lines outnumber live ones
+COMPACT_RATIO = 2.0
+
+SEARCH_DIRNAME = 'search'
+RELATED_DIRNAME = 'related'
+PRERENDER_DIRNAME = 'prerender'
+# Changed summaries are prerendered and written in batches of this many
+RENDER_BATCH = 512
+SITE_MANIFEST_FILENAME = 'manifest.json'
+# Shards on disk and those the last manifest referenced, for cleanup
+SITE_FILES_FILENAME = 'site_files.json'
+DEFAULT_PAGE_SIZE = 24
+DEFAULT_LISTING_PAGE_SIZE = 500
+EXCERPT_CHARS = 200
+# Fields of an export record kept in the listing
+LISTING_FIELDS = ('id', 'title', 'headline', 'podcast', 'genre', 'date', 'duration_seconds', 'reading_minutes',
+                  'excerpt')
+
+
+def export_record(data):
+    """Website record for a summary dict, or None if it isn't a successful summary."""
+    if not isinstance(data, dict) or not data.get('success'):
+        return None
+
+    # Parse upload date for sorting
+    upload_date = data.get('upload_date', '')
+    if upload_date:
+        formatted_date = f"{upload_date[:4]}-{upload_date[4:6]}-{upload_date[6:8]}"
+    else:
+        formatted_date = ''
+
+    return {
+        'id': data.get('video_id'),
+        'podcast': data.get('podcast_name'),
+        'title': data.get('episode_title'),
+        'genre': data.get('genre'),
+        'date': formatted_date,
+        'duration_seconds': data.get('duration_seconds'),
+        'view_count': data.get('view_count'),
+        'summary': data.get('summary'),
+        'youtube_url': data.get('youtube_url'),
+        'timestamps': [
+            {
+                'text': moment['text'],
+                'kind': moment.get('kind', 'quote'),
+                'start': moment['start'],
+                'url': timestamp_url(data.get('youtube_url'), moment['start']),
+            }
+            for moment in data.get('quote_timestamps') or []
+        ],
+    }
+
+
+def make_excerpt(summary, limit=EXCERPT_CHARS):
+    """First prose of a markdown summary (headline skipped), cut at a word boundary."""
+    lines = [line.strip() for line in (summary or '').splitlines()]
+    text = ' '.join(line for line in lines if line and not line.startswith('#'))
+    text = re.sub(r'[*_`>]+', '', text)
+    text = ' '.join(text.split())
+    if len(text) <= limit:
+        return text
+    return text[:limit].rsplit(' ', 1)[0].rstrip(',.;:') + '…'
+
+
+def slugify(name):
+    return re.sub(r'[^a-z0-9]+', '-', (name or '').lower()).strip('-') or 'unknown'
+
+
+def _content_path(prefix, payload):
+    """Hashed file name for a shard. Returns (relative path, sha256)."""
+    digest = hashlib.sha256(payload).hexdigest()
+    return f"{prefix}.{digest[:12]}.json", digest
+
+
+def iter_summary_files(summaries_dir):
+    """Yield (path, stat) for summary JSON files, skipping hidden directories."""
+    stack = [summaries_dir]
+    while stack:
+        try:
+            entries = list(os.scandir(stack.pop()))
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            if entry.name.startswith('.'):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                stack.append(entry.path)
+            elif entry.name.endswith('.json'):
+                yield entry.path, entry.stat()
+
+
+class IncrementalExporter:
+    """
+    Keeps the export state in memory between calls, so a long-running
+    process (pipeline.py) only pays for what changed:
+
+        exporter = IncrementalExporter('./summaries', './data/episodes.json')
+        exporter.export()                       # scan for changes
+        exporter.export(changed=[summary_path]) # just these files
+    """
+
+    def __init__(self, summaries_dir="./summaries", output_file="./data/episodes.json",
+                 site_dir=None, page_size=DEFAULT_PAGE_SIZE, listing_page_size=DEFAULT_LISTING_PAGE_SIZE,
+                 search=True, transcripts_dir=None, related=True, related_transcripts_dir=None):
+        self.summaries_dir = summaries_dir
+        self.output_file = output_file
+        self.site_dir = site_dir
+        self.page_size = max(1, page_size)
+        self.listing_page_size = max(1, listing_page_size)
+        self.state_dir = os.path.join(os.path.dirname(output_file) or '.', STATE_DIRNAME)
+        self.index_path = os.path.join(self.state_dir, INDEX_FILENAME)
+        self.records_path = os.path.join(self.state_dir, RECORDS_FILENAME)
+        # summary path -> {mtime_ns, size, sha256, offset, length, id, date, genre, podcast}
+        self.files = {}
+        self._index_lines = 0
+        self._lock = threading.Lock()
+        self._site_files = None
+        self._load()
+
+        # Search indexes live with the rest of the export state; transcripts
+        # are only indexed when a transcripts_dir is given
+        search_dir = os.path.join(self.state_dir, SEARCH_DIRNAME)
+        self.search_index = SearchIndex(os.path.join(search_dir, 'summaries')) if search else None
+        self.transcripts_dir = transcripts_dir
+        self.transcript_index = (
+            SearchIndex(os.path.join(search_dir, 'transcripts')) if search and transcripts_dir else None
+        )
+        self._search_changed = True
+
+        # numpy/scipy are only loaded once there are episodes to relate (see
+        # _load_related); transcript text is added to the vectors when a store is given
+        self.related = related
+        self.related_dir = os.path.join(self.state_dir, RELATED_DIRNAME)
+        self.related_index = None
+        self.related_transcripts_dir = related_transcripts_dir
+        self.prerenderer = Prerenderer(os.path.join(self.state_dir, PRERENDER_DIRNAME))
+
+    def _load(self):
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A crash mid-write can leave a torn last line
+                    continue
+                self._index_lines += 1
+                if 'records' in entry:
+                    # Header written by _compact naming the live records file
+                    self.records_path = os.path.join(self.state_dir, entry['records'])
+                elif entry.get('deleted'):
+                    self.files.pop(entry['path'], None)
+                else:
+                    self.files[entry['path']] = entry
+
+        records_size = os.path.getsize(self.records_path) if os.path.exists(self.records_path) else 0
+        self.files = {
+            path: entry for path, entry in self.files.items()
+            if entry.get('offset') is None or entry['offset'] + entry['length'] <= records_size
+        }
+
+    def reset(self):
+        """Forget all state; the next export re-reads every summary."""
+        for path in (self.index_path, self.records_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self.records_path = os.path.join(self.state_dir, RECORDS_FILENAME)
+        self.files = {}
+        self._index_lines = 0
+
+    def close(self):
+        """Release the search indexes' mapped segment files. Call when done exporting."""
+        for index in (self.search_index, self.transcript_index):
+            if index is not None:
+                index.close()
+
+    def _append_index(self, entries):
+        with open(self.index_path, 'a', encoding='utf-8') as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self._index_lines += len(entries)
+
+    def _refresh(self, path, stat):
+        """
+        Check one summary file. Returns 'added', 'updated', 'unchanged',
+        'skipped' or None (untouched), the index entry to log, and for
+        added/updated files the export record still to be written.
+        """
+        previous = self.files.get(path)
+        if previous and previous['mtime_ns'] == stat.st_mtime_ns and previous['size'] == stat.st_size:
+            return None, None, None
+
+        with open(path, 'rb') as f:
+            raw = f.read()
+        digest = hashlib.sha256(raw).hexdigest()
+        entry = {'path': path, 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'sha256': digest}
+
+        if previous and previous['sha256'] == digest:
+            # Touched but identical; keep the existing record
+            entry.update({k: v for k, v in previous.items() if k not in entry})
+            self.files[path] = entry
+            return 'unchanged', entry, None
+
+        try:
+            record = export_record(json.loads(raw))
+        except ValueError:
+            record = None
+
+        if record is None:
+            # Not a summary (e.g. batches.json) or a failed one; remembered so it isn't re-read
+            entry.update({'offset': None, 'length': 0})
+            self.files[path] = entry
+            return 'skipped', entry, None
+
+        return ('updated' if previous else 'added'), entry, record
+
+    def _write_records(self, pending, records):
+        """Prerender a batch of new records and append them to the records log."""
+        rendered = self.prerenderer.render_many([record.get('summary') for _, record in pending])
+        for (entry, record), fields in zip(pending, rendered):
+            record.update(fields)
+            line = json.dumps(record, ensure_ascii=False).encode('utf-8')
+            entry.update({
+                'offset': records.tell(),
+                'length': len(line),
+            })
+            entry.update(self._listing_fields(record, line))
+            entry['prerendered'] = PRERENDER_VERSION
+            records.write(line + b'\n')
+            self.files[entry['path']] = entry
+
+    def _rerender_stale(self, records, log):
+        """
+        Prerender records exported before prerendering existed, or by an
+        older renderer, without re-reading their summary files.
+        """
+        stale = [
+            entry for entry in self.files.values()
+            if entry.get('offset') is not None and entry.get('prerendered') != PRERENDER_VERSION
+        ]
+        with open(self.records_path, 'rb') as source:
+            for start in range(0, len(stale), RENDER_BATCH):
+                pending = []
+                for entry in stale[start:start + RENDER_BATCH]:
+                    source.seek(entry['offset'])
+                    pending.append((entry, json.loads(source.read(entry['length']))))
+                self._write_records(pending, records)
+        log.extend(stale)
+        return len(stale)
+
+    def export(self, changed=None):
+        """
+        Merge changed summaries and rewrite the output file.
+        With `changed` (summary paths), only those files are checked;
+        otherwise the summaries tree is scanned and deletions are picked up.
+        Returns run stats.
+        """
+        with self._lock:
+            started = time.monotonic()
+            os.makedirs(self.state_dir, exist_ok=True)
+            counts = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0, 'skipped': 0}
+            log = []
+
+            if changed is None:
+                candidates = iter_summary_files(self.summaries_dir)
+            else:
+                candidates = [(path, os.stat(path)) for path in changed if os.path.exists(path)]
+
+            seen = set()
+            pending = []
+            rendered, cached = self.prerenderer.rendered, self.prerenderer.hits
+            with open(self.records_path, 'ab') as records:
+                for path, stat in candidates:
+                    seen.add(path)
+                    outcome, entry, record = self._refresh(path, stat)
+                    if outcome:
+                        counts[outcome] += 1
+                        log.append(entry)
+                    if record is not None:
+                        pending.append((entry, record))
+                        if len(pending) >= RENDER_BATCH:
+                            self._write_records(pending, records)
+                            pending = []
+                if pending:
+                    self._write_records(pending, records)
+
+            if changed is None:
+                for path in [p for p in self.files if p not in seen]:
+                    del self.files[path]
+                    log.append({'path': path, 'deleted': True})
+                    counts['removed'] += 1
+
+            with open(self.records_path, 'ab') as records:
+                counts['rerendered'] = self._rerender_stale(records, log)
+            self.prerenderer.close()
+            counts['prerendered'] = self.prerenderer.rendered - rendered
+            counts['prerender_cached'] = self.prerenderer.hits - cached
+
+            # Records are flushed before the index lines that point at them
+            self._append_index(log)
+            if self._index_lines > COMPACT_RATIO * max(1, len(self.files)):
+                self._compact()
+
+            if self.search_index is not None:
+                counts['search_indexed'] = self._sync_search()
+                if self.transcript_index is not None:
+                    counts['transcripts_indexed'] = sync_transcripts(
+                        self.transcript_index, TranscriptStore(self.transcripts_dir),
+                    )
+            if self._load_related() is not None:
+                counts['related_updated'] = self._sync_related()
+
+            total = self._write_output()
+            counts['episodes'] = total
+            if self.site_dir:
+                counts['site_files_written'] = self._write_site()
+            counts['seconds'] = round(time.monotonic() - started, 3)
+            return counts
+
+    def _live_entries(self):
+        """Index entries with a record, newest episode first."""
+        live = [entry for entry in self.files.values() if entry.get('offset') is not None]
+        live.sort(key=lambda entry: (entry['date'], entry['id'] or ''), reverse=True)
+        return live
+
+    def exported_ids(self):
+        """Video IDs of the episodes in the current export."""
+        return [entry['id'] for entry in self.files.values() if entry.get('offset') is not None and entry['id']]
+
+    def _write_output(self):
+        """Stream episodes.json from the records log. Returns the episode count."""
+        os.makedirs(os.path.dirname(self.output_file) or '.', exist_ok=True)
+        live = self._live_entries()
+
+        # Also create genre and podcast indexes (ids only, so these stay small)
+        genres = {}
+        podcasts = {}
+        for entry in live:
+            genres.setdefault(entry['genre'], []).append(entry['id'])
+            podcast = podcasts.setdefault(entry['podcast'], {'genre': entry['genre'], 'episodes': []})
+            podcast['episodes'].append(entry['id'])
+
+        tmp_path = f"{self.output_file}.tmp"
+        with open(self.records_path, 'rb') as records, open(tmp_path, 'wb') as out:
+            out.write(b'{\n"episodes": [\n')
+            for i, entry in enumerate(live):
+                records.seek(entry['offset'])
+                if i:
+                    out.write(b',\n')
+                out.write(records.read(entry['length']))
+            out.write(b'\n],\n')
+            tail = {
+                'genres': genres,
+                'podcasts': podcasts,
+                'related': self.related_index.table() if self.related_index is not None else {},
+                'total_count': len(live),
+                'exported_at': datetime.now().isoformat(),
+            }
+            out.write(json.dumps(tail, ensure_ascii=False)[1:].encode('utf-8'))
+            out.write(b'\n')
+        os.replace(tmp_path, self.output_file)
+        return len(live)
+
+    def _sync_search(self):
+        """Index summaries added or changed since the search index was last updated."""
+        live = {entry['id']: entry for entry in self.files.values() if entry.get('offset') is not None}
+        removed = [video_id for video_id in self.search_index.live if video_id not in live]
+        stale = [
+            entry for video_id, entry in live.items()
+            if video_id not in self.search_index.live
+            or self.search_index.live[video_id][2] != entry.get('record_sha256')
+        ]
+
+        def docs():
+            with open(self.records_path, 'rb') as records:
+                for entry in stale:
+                    records.seek(entry['offset'])
+                    line = records.read(entry['length'])
+                    record = json.loads(line)
+                    if 'record_sha256' not in entry:
+                        entry.update(self._listing_fields(record, line))
+                    yield {
+                        'id': entry['id'],
+                        'sha': entry['record_sha256'],
+                        'title': record.get('title'),
+                        'podcast': record.get('podcast'),
+                        'text': record.get('summary'),
+                    }
+
+        indexed = self.search_index.update(docs(), removed)
+        if indexed or removed:
+            self._search_changed = True
+        return indexed
+
+    def _load_related(self):
+        """
+        The RelatedIndex, or None while related episodes are off or there is
+        nothing to relate yet, so exporting an empty tree doesn't import numpy/scipy.
+        """
+        if self.related_index is None and self.related:
+            has_records = any(entry.get('offset') is not None for entry in self.files.values())
+            if has_records or os.path.exists(self.related_dir):
+                from related import RelatedIndex
+                self.related_index = RelatedIndex(self.related_dir)
+        return self.related_index
+
+    def _sync_related(self):
+        """Update related-episode lists for summaries (or transcripts) added, changed or removed."""
+        live = {entry['id']: entry for entry in self.files.values() if entry.get('offset') is not None}
+        store = TranscriptStore(self.related_transcripts_dir) if self.related_transcripts_dir else None
+
+        def doc_sha(entry):
+            transcript = store.index.get(entry['id'], {}) if store else {}
+            return f"{entry.get('record_sha256')}:{transcript.get('transcript_sha256', '')}"
+
+        index = self.related_index
+        removed = [video_id for video_id in index.rows if video_id not in live]
+        stale = [
+            entry for video_id, entry in live.items()
+            if video_id not in index.rows or index.shas[index.rows[video_id]] != doc_sha(entry)
+        ]
+        if not stale and not removed:
+            return 0
+
+        docs = []
+        with open(self.records_path, 'rb') as records:
+            for entry in stale:
+                records.seek(entry['offset'])
+                line = records.read(entry['length'])
+                record = json.loads(line)
+                if 'record_sha256' not in entry:
+                    entry.update(self._listing_fields(record, line))
+                episode = store.get(entry['id'], with_segments=False) if store else None
+                docs.append({
+                    'id': entry['id'],
+                    'sha': doc_sha(entry),
+                    'title': record.get('title'),
+                    'summary': record.get('summary'),
+                    'transcript': episode.get('transcript') if episode else None,
+                })
+
+        updated = index.update(docs, removed)
+        index.save()
+        return updated
+
+    def _listing_fields(self, record, line):
+        """Index-entry fields for a record: what the listing and indexes need."""
+        return {
+            'id': record['id'],
+            'title': record.get('title'),
+            'date': record['date'] or '',
+            'genre': record['genre'] or 'unknown',
+            'podcast': record['podcast'] or 'unknown',
+            'duration_seconds': record.get('duration_seconds'),
+            'headline': record.get('headline'),
+            'reading_minutes': record.get('reading_minutes'),
+            'excerpt': make_excerpt(record.get('hook') or record.get('summary')),
+            'record_sha256': hashlib.sha256(line).hexdigest(),
+        }
+
+    def _load_site_files(self):
+        path = os.path.join(self.state_dir, SITE_FILES_FILENAME)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            return set(state['files']), set(state['referenced'])
+        return set(), set()
+
+    def _write_shard(self, rel_prefix, payload, written):
+        rel_path, digest = _content_path(rel_prefix, payload)
+        if rel_path not in self._site_files:
+            full_path = os.path.join(self.site_dir, rel_path)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            with open(full_path, 'wb') as f:
+                f.write(payload)
+            self._site_files.add(rel_path)
+            written[0] += 1
+        return rel_path, digest
+
+    def _write_pages(self, prefix, entries, page_size, extra, written):
+        """
+        Paginate listing entries. Pages are filled oldest first, so new
+        episodes only change the newest page and older pages keep their
+        hash (and CDN cache). Returns page descriptors, newest first.
+        """
+        pages = []
+        count = max(1, -(-len(entries) // page_size))
+        for n in range(count):
+            chunk = entries[n * page_size:(n + 1) * page_size]
+            body = dict(extra)
+            # No page count in the body, or adding a page would change every hash
+            body.update({'page': n + 1, 'episodes': chunk[::-1]})
+            payload = json.dumps(body, ensure_ascii=False, sort_keys=True).encode('utf-8')
+            path, digest = self._write_shard(f"{prefix}/page-{n + 1:04d}", payload, written)
+            pages.append({'path': path, 'sha256': digest, 'count': len(chunk)})
+        return pages[::-1]
+
+    def _write_site(self):
+        """Write per-episode files, listing/genre/podcast pages and the manifest. Returns files written."""
+        known_files, last_referenced = self._load_site_files()
+        if self._site_files is None:
+            # Shards on disk; anything here is skipped rather than rewritten
+            self._site_files = {
+                path for path in known_files
+                if os.path.exists(os.path.join(self.site_dir, path))
+            }
+        written = [0]
+        referenced = set()
+
+        listing = []
+        genres = {}
+        podcasts = {}
+        with open(self.records_path, 'rb') as records:
+            for entry in reversed(self._live_entries()):
+                records.seek(entry['offset'])
+                line = records.read(entry['length'])
+                if 'record_sha256' not in entry:
+                    # Indexed before the site export existed
+                    entry.update(self._listing_fields(json.loads(line), line))
+
+                episode_path, _ = self._write_shard(f"episodes/{entry['id']}", line, written)
+                referenced.add(episode_path)
+
+                item = {field: entry.get(field) for field in LISTING_FIELDS}
+                item['file'] = episode_path
+                listing.append(item)
+                genres.setdefault(entry['genre'], []).append(item)
+                podcasts.setdefault(entry['podcast'], []).append(item)
+
+        manifest = {
+            'version': 1,
+            'generated_at': datetime.now().isoformat(),
+            'total_count': len(listing),
+            'page_size': self.page_size,
+            'listing_page_size': self.listing_page_size,
+            'listing': {'total': len(listing), 'pages': self._write_pages(
+                'listing', listing, self.listing_page_size, {}, written)},
+            'genres': {},
+            'podcasts': {},
+        }
+        for genre, items in sorted(genres.items()):
+            manifest['genres'][genre] = {'total': len(items), 'pages': self._write_pages(
+                f"genre/{slugify(genre)}", items, self.page_size, {'genre': genre}, written)}
+        for podcast, items in sorted(podcasts.items()):
+            slug = slugify(podcast)
+            manifest['podcasts'][podcast] = {
+                'slug': slug,
+                'genre': items[0]['genre'],
+                'total': len(items),
+                'pages': self._write_pages(f"podcast/{slug}", items, self.page_size, {'podcast': podcast}, written),
+            }
+
+        for section in [manifest['listing']] + list(manifest['genres'].values()) + list(manifest['podcasts'].values()):
+            referenced.update(page['path'] for page in section['pages'])
+
+        if self.search_index is not None:
+            if self._search_changed or not os.path.exists(os.path.join(self.site_dir, SEARCH_DIRNAME)):
+                self.search_index.write_web_shards(self.site_dir, SEARCH_DIRNAME)
+                self._search_changed = False
+            manifest['search'] = f"{SEARCH_DIRNAME}/{SITE_MANIFEST_FILENAME}"
+
+        if self.related_index is not None:
+            # Sharded by the id's first character (hex-encoded, as ids are case-sensitive)
+            shards = {}
+            for video_id, related in self.related_index.table().items():
+                shards.setdefault(video_id[0], {})[video_id] = related
+            manifest['related'] = {'k': self.related_index.k, 'prefix_chars': 1, 'shards': {}}
+            for prefix, table in sorted(shards.items()):
+                payload = json.dumps(table, sort_keys=True, separators=(',', ':')).encode('utf-8')
+                path, _ = self._write_shard(f"{RELATED_DIRNAME}/{ord(prefix):02x}", payload, written)
+                manifest['related']['shards'][prefix] = path
+                referenced.add(path)
+
+        manifest_path = os.path.join(self.site_dir, SITE_MANIFEST_FILENAME)
+        with open(f"{manifest_path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(f"{manifest_path}.tmp", manifest_path)
+
+        # Clients holding the previous manifest can still fetch its shards;
+        # anything older is removed
+        keep = referenced | last_referenced
+        for path in self._site_files - keep:
+            try:
+                os.remove(os.path.join(self.site_dir, path))
+            except FileNotFoundError:
+                pass
+        self._site_files &= keep
+
+        with open(os.path.join(self.state_dir, SITE_FILES_FILENAME), 'w', encoding='utf-8') as f:
+            json.dump({'files': sorted(self._site_files), 'referenced': sorted(referenced)}, f)
+
+        return written[0]
+
+    def _compact(self):
+        """
+        Rewrite both logs with only live entries. Records go to a new file
+        that the new index names in its header, so swapping the index in is
+        a single atomic step.
+        """
+        records_name = f"records-{time.time_ns()}.jsonl"
+        records_path = os.path.join(self.state_dir, records_name)
+        files = {}
+        with open(self.records_path, 'rb') as src, open(records_path, 'wb') as dst:
+            for path, entry in self.files.items():
+                entry = dict(entry)
+                if entry.get('offset') is not None:
+                    src.seek(entry['offset'])
+                    line = src.read(entry['length'])
+                    entry['offset'] = dst.tell()
+                    dst.write(line + b'\n')
+                files[path] = entry
+
+        index_tmp = f"{self.index_path}.tmp"
+        with open(index_tmp, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'records': records_name}) + '\n')
+            for entry in files.values():
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        os.replace(index_tmp, self.index_path)
+
+        os.remove(self.records_path)
+        self.records_path = records_path
+        self.files = files
+        self._index_lines = len(files) + 1
+
+
+def export_for_website(summaries_dir="./summaries", output_file="./data/episodes.json", changed=None, full=False,
+                       site_dir=None, page_size=DEFAULT_PAGE_SIZE, work_queue=None, transcripts_dir=None,
+                       search=True, related=True):
+    """
+    Export all summaries into a single JSON file for website consumption,
+    plus sharded, content-hashed pages under site_dir when one is given.
+    Only summaries changed since the last export are read (see IncrementalExporter);
+    full=True rebuilds from scratch. Returns export stats.
+    With a work_queue, exported episodes are marked 'exported' in its catalog.
+    Related episodes are computed from summaries, plus transcripts when a
+    transcripts_dir (transcript store) is given. search=False / related=False
+    skip the search index and related episodes.
+    """
+    exporter = IncrementalExporter(summaries_dir, output_file, site_dir=site_dir, page_size=page_size,
+                                   search=search, related=related, related_transcripts_dir=transcripts_dir)
+    try:
+        if full:
+            exporter.reset()
+        stats = exporter.export(changed=changed)
+        if work_queue:
+            stats['marked_exported'] = work_queue.mark_exported(exporter.exported_ids())
+    finally:
+        exporter.close()
+
+    print(f"\n{'='*60}")
+    print(f"EXPORT COMPLETE")
+    print(f"{'='*60}")
+    print(f"Episodes: {stats['episodes']}")
+    print(f"Changed: {stats['added']} added, {stats['updated']} updated, {stats['removed']} removed")
+    if stats['prerendered'] or stats['prerender_cached']:
+        print(f"Prerendered: {stats['prerendered']} ({stats['prerender_cached']} from cache)")
+    if 'related_updated' in stats:
+        print(f"Related lists updated: {stats['related_updated']}")
+    print(f"Took: {stats['seconds']:.2f}s")
+    print(f"Output: {output_file}")
+    if site_dir:
+        print(f"Site shards: {site_dir} ({stats['site_files_written']} files written)")
+    print(f"{'='*60}")
+
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export summaries for the website")
+    parser.add_argument('--summaries', default='./summaries')
+    parser.add_argument('--output', default='./data/episodes.json')
+    parser.add_argument('--full', action='store_true', help="Discard export state and re-read every summary")
+    parser.add_argument('--site', default='./data/site', help="Directory for the sharded static export")
+    parser.add_argument('--no-site', action='store_true', help="Only write the single episodes.json")
+    parser.add_argument('--page-size', type=int, default=DEFAULT_PAGE_SIZE, help="Episodes per genre/podcast page")
+    parser.add_argument('--listing-page-size', type=int, default=DEFAULT_LISTING_PAGE_SIZE)
+    parser.add_argument('--no-search', action='store_true', help="Skip the full-text search index")
+    parser.add_argument('--index-transcripts', metavar='DIR', default=None,
+                        help="Also index transcripts from this transcript store")
+    parser.add_argument('--no-related', action='store_true', help="Skip the related-episodes index")
+    parser.add_argument('--related-transcripts', metavar='DIR', default=None,
+                        help="Include transcripts from this store when relating episodes")
+    args = parser.parse_args()
+
+    exporter = IncrementalExporter(
+        args.summaries, args.output,
+        site_dir=None if args.no_site else args.site,
+        page_size=args.page_size,
+        listing_page_size=args.listing_page_size,
+        search=not args.no_search,
+        transcripts_dir=args.index_transcripts,
+        related=not args.no_related,
+        related_transcripts_dir=args.related_transcripts,
+    )
+    try:
+        if args.full:
+            exporter.reset()
+        stats = exporter.export()
+    finally:
+        exporter.close()
+    print(f"Exported {stats['episodes']} episodes in {stats['seconds']:.2f}s "
+          f"({stats['added']} added, {stats['updated']} updated, {stats['removed']} removed)")
@@ -0,0 +1,268 @@
+"""
+Podicals - Fake Anthropic API
+Local stand-in for the Messages, token counting and Message Batches endpoints so the
+summarizer can be exercised without an API key or spend. Latency, rate
+limiting, overload errors and batch processing time are configurable.
+
+    python fake_anthropic.py --port 8765 --latency 2 --max-concurrent 8
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8765 ANTHROPIC_API_KEY=test python summarizer.py --async
+
+Or in-process:
+
+    server = FakeAnthropicServer(latency=0.1).start()
+    summarizer = PodicalsSummarizer(base_url=server.base_url)
+"""
+
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+from datetime import datetime, timezone, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def fake_summary(prompt):
+    """Deterministic article-shaped text derived from the prompt."""
+    title = 'Episode'
+    for line in prompt.splitlines():
+        if line.startswith('EPISODE TITLE:'):
+            title = line.split(':', 1)[1].strip() or title
+            break
+    return (
+        f"# {title}: The Highlights\n\n"
+        "A lively conversation that covered a lot of ground.\n\n"
+        "## The Big Idea\n\nThe hosts dug into the main topic of the episode.\n\n"
+        "## Bottom Line\n\nWorth a listen if the topic interests you."
+    )
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+class FakeAnthropicServer:
+    def __init__(self, host='127.0.0.1', port=0, latency=0.5, jitter=0.0,
+                 error_rate=0.0, overload_rate=0.0, max_concurrent=None, retry_after=1,
+                 batch_seconds=2.0, batch_error_rate=0.0):
+        self.latency = latency
+        self.batch_seconds = batch_seconds
+        self.batch_error_rate = batch_error_rate
+        self.batches = {}
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.overload_rate = overload_rate
+        self.max_concurrent = max_concurrent
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.requests = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def create_message(self, params):
+        """Build a Messages API response body for request params."""
+        prompt = ''.join(
+            block if isinstance(block, str) else block.get('text', '')
+            for message in params.get('messages', [])
+            for block in ([message['content']] if isinstance(message['content'], str) else message['content'])
+        )
+        text = fake_summary(prompt)
+        return {
+            'id': f"msg_{uuid.uuid4().hex[:24]}",
+            'type': 'message',
+            'role': 'assistant',
+            'model': params.get('model', 'fake-model'),
+            'content': [{'type': 'text', 'text': text}],
+            'stop_reason': 'end_turn',
+            'stop_sequence': None,
+            'usage': {
+                'input_tokens': estimate_tokens(prompt),
+                'output_tokens': min(params.get('max_tokens', 1024), estimate_tokens(text)),
+            },
+        }
+
+    def create_batch(self, requests):
+        batch_id = f"msgbatch_{uuid.uuid4().hex[:24]}"
+        results = []
+        for request in requests:
+            if random.random() < self.batch_error_rate:
+                result = {
+                    'type': 'errored',
+                    'error': {
+                        'type': 'error',
+                        'error': {'type': 'api_error', 'message': 'Simulated batch request failure'},
+                    },
+                }
+            else:
+                result = {'type': 'succeeded', 'message': self.create_message(request['params'])}
+            results.append({'custom_id': request['custom_id'], 'result': result})
+
+        with self._lock:
+            self.batches[batch_id] = {
+                'created_at': time.time(),
+                'ends_at': time.time() + self.batch_seconds,
+                'results': results,
+            }
+        return self.batch_status(batch_id)
+
+    def batch_status(self, batch_id):
+        with self._lock:
+            batch = self.batches.get(batch_id)
+        if batch is None:
+            return None
+
+        def iso(ts):
+            return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+
+        ended = time.time() >= batch['ends_at']
+        counts = {'processing': 0, 'succeeded': 0, 'errored': 0, 'canceled': 0, 'expired': 0}
+        for item in batch['results']:
+            if ended:
+                counts[item['result']['type']] += 1
+            else:
+                counts['processing'] += 1
+
+        return {
+            'id': batch_id,
+            'type': 'message_batch',
+            'processing_status': 'ended' if ended else 'in_progress',
+            'request_counts': counts,
+            'created_at': iso(batch['created_at']),
+            'expires_at': iso(batch['created_at'] + timedelta(days=1).total_seconds()),
+            'ended_at': iso(batch['ends_at']) if ended else None,
+            'archived_at': None,
+            'cancel_initiated_at': None,
+            'results_url': f"{self.base_url}/v1/messages/batches/{batch_id}/results" if ended else None,
+        }
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, body, headers=None):
+                payload = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.send_header('request-id', f"req_{uuid.uuid4().hex[:16]}")
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _error(self, status, error_type, message):
+                self._send(
+                    status,
+                    {'type': 'error', 'error': {'type': error_type, 'message': message}},
+                    {'retry-after': str(server.retry_after)},
+                )
+
+            def _read_json(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                return json.loads(self.rfile.read(length) or b'{}')
+
+            def do_GET(self):
+                parts = self.path.split('?')[0].strip('/').split('/')
+                if parts[:3] != ['v1', 'messages', 'batches'] or len(parts) < 4:
+                    return self._error(404, 'not_found_error', f"Unknown path {self.path}")
+
+                status = server.batch_status(parts[3])
+                if status is None:
+                    return self._error(404, 'not_found_error', f"No batch {parts[3]}")
+                if len(parts) == 4:
+                    return self._send(200, status)
+
+                if status['processing_status'] != 'ended':
+                    return self._error(400, 'invalid_request_error', 'Batch still processing')
+                with server._lock:
+                    results = server.batches[parts[3]]['results']
+                payload = ''.join(json.dumps(item) + '\n' for item in results).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/binary')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                path = self.path.split('?')[0]
+                params = self._read_json()
+                if path == '/v1/messages/batches':
+                    return self._send(200, server.create_batch(params.get('requests', [])))
+                if path == '/v1/messages/count_tokens':
+                    return self._send(200, {'input_tokens': estimate_tokens(json.dumps(params.get('messages', [])))})
+                if path != '/v1/messages':
+                    return self._error(404, 'not_found_error', f"Unknown path {path}")
+
+                with server._lock:
+                    server.requests += 1
+                    over_capacity = (
+                        server.max_concurrent is not None
+                        and server.in_flight >= server.max_concurrent
+                    )
+                    if not over_capacity:
+                        server.in_flight += 1
+                if over_capacity or random.random() < server.error_rate:
+                    with server._lock:
+                        server.rejected += 1
+                    if not over_capacity:
+                        with server._lock:
+                            server.in_flight -= 1
+                    return self._error(429, 'rate_limit_error', 'Rate limited')
+                try:
+                    if random.random() < server.overload_rate:
+                        return self._error(529, 'overloaded_error', 'Overloaded')
+                    time.sleep(max(0.0, server.latency + random.uniform(-server.jitter, server.jitter)))
+                    self._send(200, server.create_message(params))
+                finally:
+                    with server._lock:
+                        server.in_flight -= 1
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local fake of the Anthropic Messages API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.5, help="Seconds per message")
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of 429 responses")
+    parser.add_argument('--overload-rate', type=float, default=0.0, help="Fraction of 529 responses")
+    parser.add_argument('--max-concurrent', type=int, default=None, help="429 above this many in flight")
+    parser.add_argument('--batch-seconds', type=float, default=2.0, help="Time until a batch ends")
+    parser.add_argument('--batch-error-rate', type=float, default=0.0, help="Fraction of errored batch requests")
+    args = parser.parse_args()
+
+    server = FakeAnthropicServer(
+        args.host, args.port, args.latency, args.jitter,
+        args.error_rate, args.overload_rate, args.max_concurrent,
+        batch_seconds=args.batch_seconds, batch_error_rate=args.batch_error_rate,
+    )
+    print(f"Fake Anthropic API listening on {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,273 @@
+"""
+Podicals - Fake YouTube
+Local stand-ins for yt-dlp's YoutubeDL and YouTubeTranscriptApi so the
+scraper can run without the network. Channels, videos and captions are
+synthesized deterministically from their IDs; latency, throttling and
+errors are configurable. `setup_latency` is charged whenever a client is
+constructed, like yt-dlp's extractor setup or a fresh HTTPS handshake.
+
+    youtube = FakeYouTube(latency=0.05, throttle_rate=0.02)
+    scraper = PodcastScraper(ydl_class=youtube.YoutubeDL,
+                             transcript_api_class=youtube.YouTubeTranscriptApi)
+"""
+
+import html
+import time
+import zlib
+import random
+import threading
+from datetime import date, timedelta
+from urllib.parse import parse_qs, urlsplit
+
+
+WORDS = (
+    "people market company money think really going know podcast story time thing year work "
+    "show question idea world problem team build product growth data model research science "
+    "health sleep brain training music football game season player coach history war empire "
+    "politics election policy economy rates inflation startup founder investor fund risk "
+    "culture comedy movie book writer interview guest friend family school city country"
+).split()
+
+TITLE_WORDS = (
+    "Why How The Future Of Money Power Science Sleep Founders Markets Comedy Secret Truth "
+    "About Everything Nobody Tells You Inside Story Behind Rise Fall Great Debate"
+).split()
+
+# Share of uploads that are clips, shorts or trailers
+CLIP_RATE = 0.3
+# Share of captioned videos whose captions were uploaded rather than auto-generated
+MANUAL_CAPTION_RATE = 0.2
+
+TIMEDTEXT_URL = 'https://www.youtube.com/api/timedtext'
+
+
+def _rng(*parts):
+    return random.Random(zlib.crc32('/'.join(map(str, parts)).encode('utf-8')))
+
+
+class FakeSnippet:
+    def __init__(self, text, start, duration):
+        self.text = text
+        self.start = start
+        self.duration = duration
+
+
+class FakeYouTube:
+    """
+    Shared settings and call counters for the stand-ins. Use the
+    YoutubeDL and YouTubeTranscriptApi attributes where the real classes
+    would go.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, throttle_rate=0.0, error_rate=0.0,
+                 no_transcript_rate=0.1, videos_per_channel=60, transcript_words=9000, seed=0,
+                 setup_latency=0.0):
+        self.latency = latency
+        self.setup_latency = setup_latency
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.no_transcript_rate = no_transcript_rate
+        self.videos_per_channel = videos_per_channel
+        self.transcript_words = transcript_words
+        self.seed = seed
+        self.calls = {}
+        self.setups = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+        youtube = self
+
+        class YoutubeDL:
+            def __init__(self, opts=None):
+                youtube._setup('youtube')
+                self.opts = opts or {}
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def extract_info(self, url, download=False, process=True):
+                return youtube.extract_info(url)
+
+        class YouTubeTranscriptApi:
+            def __init__(self, proxy_config=None, http_client=None):
+                youtube._setup('transcripts')
+                self.http_client = http_client
+                if http_client is not None:
+                    # Caption track URLs from the video info are served over the client's session
+                    http_client.mount(TIMEDTEXT_URL, _timedtext_adapter(youtube))
+
+            def list(self, video_id):
+                return youtube.list_transcripts(video_id)
+
+            def fetch(self, video_id, languages=('en',), preserve_formatting=False):
+                return self.list(video_id).find_transcript(languages).fetch()
+
+        self.YoutubeDL = YoutubeDL
+        self.YouTubeTranscriptApi = YouTubeTranscriptApi
+
+    def _setup(self, kind):
+        """Count a client construction and sleep for its setup cost."""
+        with self._lock:
+            self.setups[kind] = self.setups.get(kind, 0) + 1
+        if self.setup_latency:
+            time.sleep(self.setup_latency)
+
+    def _call(self, kind):
+        """Count a call, sleep for its latency and maybe fail it."""
+        with self._lock:
+            self.calls[kind] = self.calls.get(kind, 0) + 1
+            roll = self._random.random()
+            delay = self.latency + self._random.uniform(0, self.jitter)
+        if delay:
+            time.sleep(delay)
+        if roll < self.throttle_rate:
+            raise Exception("HTTP Error 429: Too Many Requests")
+        if roll < self.throttle_rate + self.error_rate:
+            raise Exception("HTTP Error 503: Service Unavailable")
+
+    def video_ids(self, handle):
+        return [f"{handle.lstrip('@')}-{i:04d}" for i in range(self.videos_per_channel)]
+
+    def video_info(self, video_id):
+        rng = _rng(self.seed, video_id)
+        words = [rng.choice(TITLE_WORDS) for _ in range(rng.randint(3, 8))]
+        if rng.random() < CLIP_RATE:
+            words.append(rng.choice(['#shorts', 'Clip', 'Highlight', 'Trailer']))
+            duration = rng.randint(30, 900)
+        else:
+            duration = rng.randint(1800, 3 * 3600)
+        index = int(video_id.rsplit('-', 1)[1])
+        uploaded = date(2025, 1, 1) - timedelta(days=index * 3)
+        captions = self.captions(video_id)
+        tracks = {}
+        if captions:
+            kind = 'automatic_captions' if captions == 'asr' else 'subtitles'
+            tracks[kind] = {'en': [
+                {'ext': ext, 'url': f"{TIMEDTEXT_URL}?v={video_id}&lang=en&kind={captions}&fmt={ext}"}
+                for ext in ('json3', 'srv1', 'vtt')
+            ]}
+        return {
+            'id': video_id,
+            'title': ' '.join(words),
+            'description': f"Episode {video_id}",
+            'duration': duration,
+            'upload_date': uploaded.strftime('%Y%m%d'),
+            'view_count': rng.randint(1000, 2000000),
+            'channel': video_id.rsplit('-', 1)[0],
+            **tracks,
+        }
+
+    def captions(self, video_id):
+        """'manual', 'asr' (auto-generated) or None for a video without captions."""
+        rng = _rng(self.seed, video_id, 'availability')
+        if rng.random() < self.no_transcript_rate:
+            return None
+        return 'manual' if rng.random() < MANUAL_CAPTION_RATE else 'asr'
+
+    def extract_info(self, url, download=False):
+        if url.endswith('/videos'):
+            self._call('channel')
+            handle = url.rstrip('/').split('/')[-2]
+            infos = (self.video_info(video_id) for video_id in self.video_ids(handle))
+            return {'entries': (
+                {'id': info['id'], 'title': info['title'], 'url': f"https://www.youtube.com/watch?v={info['id']}",
+                 'duration': info['duration']}
+                for info in infos
+            )}
+        self._call('metadata')
+        return self.video_info(url.split('v=', 1)[1])
+
+    def segments(self, video_id):
+        """Synthetic caption snippets for a video."""
+        rng = _rng(self.seed, video_id, 'captions')
+        snippets = []
+        start = 0.0
+        remaining = self.transcript_words
+        while remaining > 0:
+            count = min(remaining, rng.randint(6, 12))
+            text = ' '.join(rng.choice(WORDS) for _ in range(count))
+            duration = round(count * 0.4, 2)
+            snippets.append(FakeSnippet(text, round(start, 2), duration))
+            start += duration
+            remaining -= count
+        return snippets
+
+    def list_transcripts(self, video_id):
+        self._call('transcript_list')
+        captions = self.captions(video_id)
+        if not captions:
+            raise Exception(f"Subtitles are disabled for this video: {video_id}")
+        return FakeTranscriptList(self, video_id, manual=captions == 'manual')
+
+    def timedtext(self, video_id):
+        """A video's captions as timedtext XML (what a caption track URL returns)."""
+        self._call('transcript_fetch')
+        lines = [
+            f'<text start="{s.start}" dur="{s.duration}">{html.escape(s.text)}</text>'
+            for s in self.segments(video_id)
+        ] if self.captions(video_id) else []
+        return '<?xml version="1.0" encoding="utf-8" ?><transcript>' + ''.join(lines) + '</transcript>'
+
+
+def _timedtext_adapter(youtube):
+    """requests transport adapter answering caption track URLs from the fake."""
+    import requests
+
+    class TimedtextAdapter(requests.adapters.BaseAdapter):
+        def send(self, request, **kwargs):
+            video_id = parse_qs(urlsplit(request.url).query)['v'][0]
+            response = requests.Response()
+            response.status_code = 200
+            response.encoding = 'utf-8'
+            response._content = youtube.timedtext(video_id).encode('utf-8')
+            response.url = request.url
+            response.request = request
+            return response
+
+        def close(self):
+            pass
+
+    return TimedtextAdapter()
+
+
+class FakeTranscriptList:
+    def __init__(self, youtube, video_id, manual):
+        self.youtube = youtube
+        self.video_id = video_id
+        self.manual = manual
+
+    def find_manually_created_transcript(self, languages):
+        if not self.manual:
+            raise Exception(f"No manually created transcript for {self.video_id}")
+        return FakeTranscript(self.youtube, self.video_id, is_generated=False)
+
+    def find_generated_transcript(self, languages):
+        return FakeTranscript(self.youtube, self.video_id, is_generated=True)
+
+    def find_transcript(self, languages):
+        return FakeTranscript(self.youtube, self.video_id, is_generated=not self.manual)
+
+
+class FakeTranscript:
+    def __init__(self, youtube, video_id, is_generated):
+        self.youtube = youtube
+        self.video_id = video_id
+        self.is_generated = is_generated
+
+    def fetch(self, preserve_formatting=False):
+        self.youtube._call('transcript_fetch')
+        return FakeFetchedTranscript(self.youtube.segments(self.video_id), self.video_id, self.is_generated)
+
+
+class FakeFetchedTranscript(list):
+    """Snippets plus the track's metadata, like the real FetchedTranscript."""
+
+    def __init__(self, snippets, video_id, is_generated):
+        super().__init__(snippets)
+        self.video_id = video_id
+        self.is_generated = is_generated
+        self.language_code = 'en'
@@ -0,0 +1,27 @@
+"""
+Podicals - File Lock
+Cross-process exclusive lock for side files (manifest, scheduler state,
+summary cache) that several queue workers may save at once. The lock is
+taken on a `<path>.lock` sidecar rather than the file itself, since saves
+swap the file out with os.replace and a lock on the old inode would be lost.
+
+    with locked(path):
+        data = read(path)       # merge with what other processes wrote
+        write(path, merged)
+"""
+
+import os
+import fcntl
+from contextlib import contextmanager
+
+
+@contextmanager
+def locked(path):
+    """Hold an exclusive lock for `path` until the block exits."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(f"{path}.lock", 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
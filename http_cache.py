@@ -0,0 +1,204 @@
+"""
+Podicals - Response Cache
+On-disk, content-addressed cache for YouTube listings, video metadata and
+transcripts. Lets a crashed or re-filtered run skip refetching, and can
+replay a recorded run fully offline (useful as a test fixture).
+
+Layout:
+    <cache_dir>/refs/ab/<request key>.json    -> which object answers a request
+    <cache_dir>/objects/cd/<content hash>.json.gz
+"""
+
+import os
+import json
+import gzip
+import time
+import hashlib
+import threading
+
+
+# Modes:
+#   off        - no caching, always fetch
+#   readwrite  - serve fresh entries, fetch and store misses (default)
+#   record     - always fetch and overwrite entries
+#   replay     - never touch the network; a miss raises CacheMiss
+CACHE_MODES = ('off', 'readwrite', 'record', 'replay')
+
+# Seconds before an entry is considered stale (ignored in replay mode)
+DEFAULT_TTLS = {
+    'channel': 6 * 3600,
+    'metadata': 7 * 86400,
+    'transcript': 30 * 86400,
+}
+
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+
+class CacheMiss(Exception):
+    """Raised in replay mode when a request was never recorded."""
+
+
+class ResponseCache:
+    def __init__(self, cache_dir="./.cache/http", mode="readwrite", ttls=None, max_bytes=DEFAULT_MAX_BYTES):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode {mode!r}, expected one of {CACHE_MODES}")
+        self.cache_dir = cache_dir
+        self.mode = mode
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._lock = threading.Lock()
+        self._total_bytes = None
+
+        if mode != 'off':
+            os.makedirs(os.path.join(cache_dir, 'refs'), exist_ok=True)
+            os.makedirs(os.path.join(cache_dir, 'objects'), exist_ok=True)
+
+    def get_or_fetch(self, kind, key_parts, fetch, should_store=None):
+        """
+        Return the cached response for (kind, key_parts), or call fetch().
+        `should_store(value)` decides whether a fetched value is cached
+        (defaults to anything that isn't None).
+        """
+        if self.mode == 'off':
+            return fetch()
+
+        key = self._request_key(kind, key_parts)
+
+        if self.mode in ('readwrite', 'replay'):
+            ttl = None if self.mode == 'replay' else self.ttls.get(kind)
+            found, value = self._read(key, ttl)
+            if found:
+                with self._lock:
+                    self.hits += 1
+                return value
+            if self.mode == 'replay':
+                raise CacheMiss(f"{kind} {key_parts!r} not recorded in {self.cache_dir}")
+
+        with self._lock:
+            self.misses += 1
+        value = fetch()
+        if (should_store or (lambda v: v is not None))(value):
+            self._write(key, kind, value)
+        return value
+
+    def stats(self):
+        with self._lock:
+            return {
+                'mode': self.mode,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evicted': self.evicted,
+            }
+
+    def _request_key(self, kind, key_parts):
+        raw = json.dumps([kind, *key_parts], sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _ref_path(self, key):
+        return os.path.join(self.cache_dir, 'refs', key[:2], f"{key}.json")
+
+    def _object_path(self, digest):
+        return os.path.join(self.cache_dir, 'objects', digest[:2], f"{digest}.json.gz")
+
+    def _read(self, key, ttl):
+        ref_path = self._ref_path(key)
+        try:
+            with open(ref_path, 'r', encoding='utf-8') as f:
+                ref = json.load(f)
+            if ttl is not None and time.time() - ref['stored_at'] > ttl:
+                return False, None
+            with gzip.open(self._object_path(ref['object']), 'rt', encoding='utf-8') as f:
+                value = json.load(f)
+        except (OSError, ValueError, KeyError):
+            return False, None
+
+        # Ref mtime doubles as last-used time for eviction
+        try:
+            os.utime(ref_path)
+        except OSError:
+            pass
+        return True, value
+
+    def _write(self, key, kind, value):
+        body = json.dumps(value, sort_keys=True, ensure_ascii=False).encode('utf-8')
+        digest = hashlib.sha256(body).hexdigest()
+        object_path = self._object_path(digest)
+        added = 0
+
+        if not os.path.exists(object_path):
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            tmp_path = f"{object_path}.{threading.get_ident()}.tmp"
+            with gzip.open(tmp_path, 'wb') as f:
+                f.write(body)
+            os.replace(tmp_path, object_path)
+            added = os.path.getsize(object_path)
+
+        ref_path = self._ref_path(key)
+        os.makedirs(os.path.dirname(ref_path), exist_ok=True)
+        tmp_path = f"{ref_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'kind': kind, 'object': digest, 'stored_at': time.time()}, f)
+        os.replace(tmp_path, ref_path)
+
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_object_bytes()
+            else:
+                self._total_bytes += added
+            over_budget = self._total_bytes > self.max_bytes
+        if over_budget:
+            self.evict()
+
+    def _scan_object_bytes(self):
+        total = 0
+        for root, _, files in os.walk(os.path.join(self.cache_dir, 'objects')):
+            for name in files:
+                total += os.path.getsize(os.path.join(root, name))
+        return total
+
+    def evict(self, target_ratio=0.9):
+        """Drop least-recently-used entries until the cache is under budget."""
+        with self._lock:
+            refs = []
+            for root, _, files in os.walk(os.path.join(self.cache_dir, 'refs')):
+                for name in files:
+                    path = os.path.join(root, name)
+                    try:
+                        with open(path, 'r', encoding='utf-8') as f:
+                            digest = json.load(f)['object']
+                        refs.append((os.path.getmtime(path), path, digest))
+                    except (OSError, ValueError, KeyError):
+                        continue
+            refs.sort()
+
+            sizes = {}
+            for root, _, files in os.walk(os.path.join(self.cache_dir, 'objects')):
+                for name in files:
+                    if name.endswith('.json.gz'):
+                        sizes[name[:-len('.json.gz')]] = os.path.getsize(os.path.join(root, name))
+
+            live = {}
+            for _, _, digest in refs:
+                live[digest] = live.get(digest, 0) + 1
+            total = sum(sizes.values())
+            target = self.max_bytes * target_ratio
+
+            for _, path, digest in refs:
+                if total <= target:
+                    break
+                os.remove(path)
+                self.evicted += 1
+                live[digest] -= 1
+                if live[digest] == 0 and digest in sizes:
+                    os.remove(self._object_path(digest))
+                    total -= sizes.pop(digest)
+
+            # Objects nobody points at any more (e.g. overwritten in record mode)
+            for digest in [d for d in sizes if not live.get(d)]:
+                os.remove(self._object_path(digest))
+                total -= sizes.pop(digest)
+
+            self._total_bytes = total
@@ -0,0 +1,133 @@
+"""
+Podicals - Seen-Video Manifest
+Persistent record of every video the scraper has already saved or rejected,
+so weekly runs only spend network calls on new uploads.
+"""
+
+import os
+import json
+import threading
+from datetime import datetime, timedelta
+
+from file_lock import locked
+
+
+# Rejections that may resolve themselves later are retried after this:
+# YouTube often adds auto-generated captions a few hours after upload, and
+# a video judged only from the channel listing (title and duration) gets
+# judged again, in case the listing was off or the filter has changed.
+TRANSIENT_REJECTIONS = {'no_transcript', 'not_episode_listing'}
+RETRY_TRANSIENT_AFTER_DAYS = 7
+
+
+class SeenManifest:
+    """
+    Thread-safe set of scraped and rejected video IDs backed by a JSON file.
+    """
+
+    def __init__(self, path, retry_after_days=RETRY_TRANSIENT_AFTER_DAYS):
+        self.path = path
+        self.retry_after = timedelta(days=retry_after_days)
+        self.scraped = {}
+        self.rejected = {}
+        self.skipped = 0
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._dirty = False
+
+        data = self._read()
+        self.scraped = data.get('scraped', {})
+        self.rejected = data.get('rejected', {})
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _merge(self, data):
+        """Take in what other processes saved. Scraped is final; the newest rejection wins."""
+        for video_id, record in data.get('scraped', {}).items():
+            self.scraped.setdefault(video_id, record)
+        for video_id, record in data.get('rejected', {}).items():
+            current = self.rejected.get(video_id)
+            if not current or record['at'] > current['at']:
+                self.rejected[video_id] = record
+        for video_id in [v for v in self.rejected if v in self.scraped]:
+            del self.rejected[video_id]
+
+    def is_known(self, video_id):
+        """True if the video was scraped, or rejected and not due for a retry."""
+        with self._lock:
+            if video_id in self.scraped:
+                return True
+            rejection = self.rejected.get(video_id)
+            if not rejection:
+                return False
+            if rejection['reason'] not in TRANSIENT_REJECTIONS:
+                return True
+            rejected_at = datetime.fromisoformat(rejection['at'])
+            return datetime.now() - rejected_at < self.retry_after
+
+    def filter_new(self, videos):
+        """Drop already-known videos from a channel listing, counting the skips."""
+        new = [v for v in videos if v.get('id') and not self.is_known(v['id'])]
+        with self._lock:
+            self.skipped += len(videos) - len(new)
+        return new
+
+    def mark_scraped(self, video_id, podcast_name):
+        with self._lock:
+            self.scraped[video_id] = {
+                'podcast': podcast_name,
+                'at': datetime.now().isoformat(),
+            }
+            self.rejected.pop(video_id, None)
+            self._dirty = True
+
+    def mark_rejected(self, video_id, reason):
+        with self._lock:
+            self.rejected[video_id] = {
+                'reason': reason,
+                'at': datetime.now().isoformat(),
+            }
+            self._dirty = True
+
+    def save(self):
+        """
+        Atomically write the manifest if anything changed, merged with what
+        other processes sharing it have saved since it was loaded.
+        """
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                self._dirty = False
+
+            with locked(self.path):
+                on_disk = self._read()
+                with self._lock:
+                    self._merge(on_disk)
+                    data = {
+                        'scraped': dict(self.scraped),
+                        'rejected': dict(self.rejected),
+                        'updated_at': datetime.now().isoformat(),
+                    }
+
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, indent=2, sort_keys=True)
+                os.replace(tmp_path, self.path)
+
+    def bootstrap(self, entries):
+        """
+        Seed the manifest from episodes saved before it existed
+        (transcript store index entries). Returns the number of videos added.
+        """
+        added = 0
+        for entry in entries:
+            video_id = entry.get('video_id')
+            if video_id and video_id not in self.scraped:
+                self.mark_scraped(video_id, entry.get('podcast_name'))
+                added += 1
+        return added
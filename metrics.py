@@ -0,0 +1,217 @@
+"""
+Podicals - Metrics
+Counters, latency histograms and structured JSON logs for the scraper and
+summarizer, so a slow run can be broken down into channel listing,
+metadata, transcripts, rate-limit sleeps and API time.
+
+Metrics are kept in memory and dumped at the end of a run in the
+Prometheus textfile format (for node_exporter's textfile collector).
+Events go to a JSON-lines log as they happen.
+
+    metrics = Metrics(log_path='./transcripts/logs/scrape.jsonl', stage='scrape')
+    with metrics.timer('request_seconds', call='metadata'):
+        ...
+    metrics.inc('bytes_written_total', 1234, kind='transcript')
+    metrics.write_prometheus('./transcripts/scrape_metrics.prom')
+"""
+
+import os
+import re
+import json
+import time
+import random
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime
+
+from rate_limiter import is_throttle_error
+
+
+NAMESPACE = 'podicals'
+
+# Seconds; covers fast cache-like calls up to long API requests
+HISTOGRAM_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+# Raw samples kept per series for percentiles (reservoir sampled beyond this)
+MAX_SAMPLES = 5000
+
+HTTP_STATUS_RE = re.compile(r'HTTP Error (\d{3})')
+
+
+def error_type(error):
+    """Short label for an exception: throttled, http_<status>, or the class name."""
+    if is_throttle_error(error):
+        return 'throttled'
+    status = getattr(error, 'status_code', None)
+    if status is None:
+        match = HTTP_STATUS_RE.search(str(error))
+        status = match.group(1) if match else None
+    if status is not None:
+        return f"http_{status}"
+    return type(error).__name__
+
+
+class _Histogram:
+    def __init__(self):
+        self.buckets = [0] * len(HISTOGRAM_BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.samples = []
+
+    def observe(self, value, rng):
+        index = bisect_left(HISTOGRAM_BUCKETS, value)
+        if index < len(self.buckets):
+            self.buckets[index] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        if len(self.samples) < MAX_SAMPLES:
+            self.samples.append(value)
+        else:
+            slot = rng.randrange(self.count)
+            if slot < MAX_SAMPLES:
+                self.samples[slot] = value
+
+    def summary(self):
+        samples = sorted(self.samples)
+
+        def quantile(q):
+            return round(samples[min(len(samples) - 1, int(len(samples) * q))], 4) if samples else None
+
+        return {
+            'count': self.count,
+            'total_seconds': round(self.sum, 3),
+            'mean_seconds': round(self.sum / self.count, 4) if self.count else None,
+            'p50_seconds': quantile(0.5),
+            'p95_seconds': quantile(0.95),
+            'max_seconds': round(self.max, 4),
+        }
+
+
+class Metrics:
+    """
+    Thread-safe metrics registry for one run. `labels` are added to every
+    series and log line (e.g. stage='scrape').
+    """
+
+    def __init__(self, log_path=None, **labels):
+        self.labels = labels
+        self.log_path = log_path
+        self.counters = {}
+        self.histograms = {}
+        self._rng = random.Random(0)
+        self._lock = threading.Lock()
+        self._log_lock = threading.Lock()
+        if log_path:
+            os.makedirs(os.path.dirname(log_path) or '.', exist_ok=True)
+
+    def _key(self, name, labels):
+        return name, tuple(sorted({**self.labels, **labels}.items()))
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = _Histogram()
+            histogram.observe(value, self._rng)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Time the block into histogram `name`; exceptions are also counted in errors_total."""
+        started = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            self.inc('errors_total', type=error_type(e), **labels)
+            raise
+        finally:
+            self.observe(name, time.monotonic() - started, **labels)
+
+    def event(self, event, **fields):
+        """Append one structured log line."""
+        if not self.log_path:
+            return
+        record = {'ts': datetime.now().isoformat(timespec='milliseconds'), 'event': event, **self.labels, **fields}
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._log_lock:
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+    def counter_totals(self, name, by):
+        """{label value: total} for counter `name`, grouped by one label."""
+        totals = {}
+        with self._lock:
+            for (counter, labels), value in self.counters.items():
+                if counter == name:
+                    group = dict(labels).get(by)
+                    totals[group] = totals.get(group, 0) + value
+        return totals
+
+    def breakdown(self, name, by='call'):
+        """Latency summary of histogram `name` per value of label `by`."""
+        with self._lock:
+            grouped = {}
+            for (histogram_name, labels), histogram in self.histograms.items():
+                if histogram_name == name:
+                    grouped.setdefault(dict(labels).get(by), []).append(histogram)
+            result = {}
+            for group, histograms in grouped.items():
+                if len(histograms) == 1:
+                    result[group] = histograms[0].summary()
+                    continue
+                merged = _Histogram()
+                for histogram in histograms:
+                    merged.count += histogram.count
+                    merged.sum += histogram.sum
+                    merged.max = max(merged.max, histogram.max)
+                    merged.samples.extend(histogram.samples)
+                result[group] = merged.summary()
+        return result
+
+    def prometheus_text(self):
+        """All series in the Prometheus text exposition format."""
+        def render(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ''
+            escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+            return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+        lines = []
+        with self._lock:
+            for name in sorted({name for name, _ in self.counters}):
+                metric = f"{NAMESPACE}_{name}"
+                lines.append(f"# TYPE {metric} counter")
+                for (counter, labels), value in sorted(self.counters.items()):
+                    if counter == name:
+                        lines.append(f"{metric}{render(labels)} {value}")
+            for name in sorted({name for name, _ in self.histograms}):
+                metric = f"{NAMESPACE}_{name}"
+                lines.append(f"# TYPE {metric} histogram")
+                for (histogram_name, labels), histogram in sorted(self.histograms.items(), key=lambda kv: kv[0]):
+                    if histogram_name != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(HISTOGRAM_BUCKETS, histogram.buckets):
+                        cumulative += count
+                        lines.append(f"{metric}_bucket{render(labels, [('le', bound)])} {cumulative}")
+                    lines.append(f"{metric}_bucket{render(labels, [('le', '+Inf')])} {histogram.count}")
+                    lines.append(f"{metric}_sum{render(labels)} {histogram.sum:.6f}")
+                    lines.append(f"{metric}_count{render(labels)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """Write the textfile atomically (the collector may read it at any time)."""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+        return path
@@ -146,13 +146,21 @@ export default function Home() {
                       {formatDuration(episode.duration_seconds)}
                     </span>
                   )}
+                  {episode.reading_minutes && (
+                    <span className="text-warm-gray text-xs">
+                      · {episode.reading_minutes} min read
+                    </span>
+                  )}
                 </div>
                 <h3 className="font-display text-xl mb-2 line-clamp-2">
                   {episode.title}
                 </h3>
                 <p className="text-warm-gray text-sm mb-3">{episode.podcast}</p>
+                {episode.headline && (
+                  <p className="font-medium text-sm mb-1 line-clamp-2">{episode.headline}</p>
+                )}
                 <p className="text-warm-gray text-sm line-clamp-3">
-                  {episode.summary?.slice(0, 150)}...
+                  {episode.hook}
                 </p>
                 <div className="mt-4 text-accent font-medium text-sm">
                   Read summary →
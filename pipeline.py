@@ -0,0 +1,302 @@
+"""
+Podicals - Pipeline
+Runs scrape -> summarize -> export as one streaming job. Each episode is
+handed to the summarizer as soon as its transcript is saved, and the
+website export is refreshed as summaries land, so the first summaries show
+up minutes into a run instead of after the whole scrape.
+
+Stages are connected by bounded queues: if summarization falls behind,
+scraper workers block on the hand-off instead of piling up transcripts.
+Episodes waiting for the summarizer are taken most-watched and most recent
+first, and each one goes through the summarizer's run budget (--budget-usd,
+--budget-tokens), like a `summarizer.py` run.
+
+    python pipeline.py --target 500 --summary-workers 8
+"""
+
+import os
+import time
+import queue
+import argparse
+import itertools
+import threading
+from datetime import datetime
+
+from budget import DOWNGRADE_MODEL, episode_priority
+from scraper import PodcastScraper
+from summarizer import PodicalsSummarizer, _model_note
+from exporter import IncrementalExporter
+
+
+# Tells a stage its input is finished
+_DONE = object()
+# Summary queue items sort by this first; the stop markers go after every episode
+_UPGRADE_RANK, _DONE_RANK = 1, 2
+
+
+class Pipeline:
+    """
+    Wires a PodcastScraper and a PodicalsSummarizer together.
+
+        pipeline = Pipeline(summary_workers=8)
+        stats = pipeline.run(target_total=500)
+    """
+
+    def __init__(self, transcripts_dir="./transcripts", summaries_dir="./summaries",
+                 export_file="./data/episodes.json", site_dir="./data/site", channel_workers=4, episode_workers=4,
+                 summary_workers=4, queue_size=16, export_interval=60.0,
+                 budget_usd=None, budget_tokens=None, downgrade_model=DOWNGRADE_MODEL,
+                 scraper=None, summarizer=None):
+        self.transcripts_dir = transcripts_dir
+        self.summaries_dir = summaries_dir
+        self.export_file = export_file
+        self.summary_workers = max(1, summary_workers)
+        self.export_interval = export_interval
+        # Scraped episodes waiting for the summarizer (holds full transcripts),
+        # as (rank, -priority, sequence, episode)
+        self.summary_queue = queue.PriorityQueue(maxsize=queue_size)
+        self._sequence = itertools.count()
+        # Paths of saved summaries waiting to be exported
+        self.export_queue = queue.Queue(maxsize=queue_size)
+        # Kept for the whole run so each export only merges new summaries
+        self.exporter = IncrementalExporter(summaries_dir, export_file, site_dir=site_dir,
+                                            related_transcripts_dir=transcripts_dir)
+
+        self.scraper = scraper or PodcastScraper(
+            transcripts_dir,
+            channel_workers=channel_workers,
+            episode_workers=episode_workers,
+            cache_mode=os.environ.get('PODICALS_CACHE_MODE', 'readwrite'),
+        )
+        self.scraper.on_episode = self._enqueue_episode
+        self.summarizer = summarizer or PodicalsSummarizer(
+            transcripts_dir, summaries_dir,
+            budget_usd=budget_usd, budget_tokens=budget_tokens, downgrade_model=downgrade_model,
+        )
+        # One duplicate index for both stages, so the backlog sync sees what the scraper registered
+        self.summarizer.duplicates = self.scraper.duplicates
+
+        self.counts = {'queued': 0, 'summarized': 0, 'failed': 0, 'unchanged': 0, 'duplicates': 0, 'deferred': 0, 'exports': 0}
+        self.queue_peak = 0
+        self.blocked_seconds = 0.0
+        self.first_summary_seconds = None
+        self._claimed = set()
+        self._lock = threading.Lock()
+        self._started = None
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self.counts[key] += n
+
+    def _enqueue_episode(self, episode, entry=None):
+        """
+        Scraper hook; blocks while the summary queue is full (backpressure).
+        entry is the store index entry when episode is only a video_id.
+        """
+        entry = entry or episode
+        with self._lock:
+            if episode['video_id'] in self._claimed:
+                return
+            self._claimed.add(episode['video_id'])
+        # Re-doing a summary that was downgraded to stay in budget waits behind new episodes
+        rank = 0
+        if self.summarizer._has_downgraded_summary(entry):
+            self.summarizer._upgrades.add(episode['video_id'])
+            rank = _UPGRADE_RANK
+        waited = time.monotonic()
+        self.summary_queue.put((rank, -episode_priority(entry), next(self._sequence), episode))
+        with self._lock:
+            self.blocked_seconds += time.monotonic() - waited
+            self.counts['queued'] += 1
+            self.queue_peak = max(self.queue_peak, self.summary_queue.qsize())
+
+    def _feed_backlog(self):
+        """Queue transcripts scraped on earlier runs that still need a summary."""
+        duplicates = self.summarizer.duplicates
+        duplicates.sync(self.summarizer.store)
+        backlog = [
+            entry for entry in self.summarizer.store.entries()
+            if not duplicates.is_duplicate(entry['video_id']) and self.summarizer._needs_summary(entry)
+        ]
+        # The queue only orders what it holds, so hand the backlog over best first
+        now = datetime.now()
+        backlog.sort(key=lambda entry: -episode_priority(entry, now))
+        for entry in backlog:
+            # By video_id: loaded from the store only when a worker gets to it
+            self._enqueue_episode({'video_id': entry['video_id']}, entry)
+
+    def _scrape(self, episodes_per_show, target_total, result):
+        try:
+            result['scrape'] = self.scraper.scrape_all(episodes_per_show, target_total)
+        except Exception as e:
+            result['scrape_error'] = str(e)
+            print(f"Scrape stage failed: {e}")
+
+    def _summarize_worker(self):
+        summarizer = self.summarizer
+        while True:
+            episode = self.summary_queue.get()[-1]
+            if episode is _DONE:
+                return
+            video_id = episode['video_id']
+            model, settled = None, False
+            try:
+                if 'transcript' not in episode:
+                    # Backlog episodes are loaded by the summarizer
+                    entry = summarizer.store.index.get(video_id) or episode
+                    episode = video_id
+                elif summarizer.duplicates.is_duplicate(video_id):
+                    self._count('duplicates')
+                    continue
+                elif not summarizer._needs_summary(episode):
+                    self._count('unchanged')
+                    continue
+                else:
+                    entry = episode
+
+                model = summarizer._admit(entry)
+                if model is None:
+                    self._count('deferred')
+                    continue
+
+                result = summarizer.summarize_episode(episode, model=model)
+                summarizer._account(result, video_id, model)
+                settled = True
+                if not result['success']:
+                    self._count('failed')
+                    print(f"  ✗ Summary error: {result.get('error')}")
+                    continue
+
+                summary_path = summarizer._save_summary(result)
+                with self._lock:
+                    self.counts['summarized'] += 1
+                    if self.first_summary_seconds is None:
+                        self.first_summary_seconds = round(time.monotonic() - self._started, 1)
+                print(f"  ✓ Summarized: {result['episode_title'][:50]} ({result['latency_seconds']:.1f}s)"
+                      f"{_model_note(model, summarizer.model)}")
+                self.export_queue.put(summary_path)
+            except Exception as e:
+                if model and not settled:
+                    # Release the reservation of a request that raised
+                    summarizer._account({'success': False}, video_id, model)
+                self._count('failed')
+                print(f"  ✗ Summary error: {e}")
+
+    def _export_worker(self):
+        """Re-export at most every export_interval seconds while summaries arrive, and once at the end."""
+        # One full scan picks up changes made outside this run
+        self._export(None)
+        changed = set()
+        last_export = time.monotonic()
+        while True:
+            timeout = max(0.1, self.export_interval - (time.monotonic() - last_export))
+            try:
+                item = self.export_queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is _DONE:
+                break
+            if item is not None:
+                changed.add(item)
+            if changed and time.monotonic() - last_export >= self.export_interval:
+                self._export(changed)
+                changed = set()
+                last_export = time.monotonic()
+
+        if changed:
+            self._export(changed)
+
+    def _export(self, changed):
+        stats = self.exporter.export(changed=sorted(changed) if changed is not None else None)
+        self._count('exports')
+        print(f"  Exported {stats['episodes']} episodes ({stats['added'] + stats['updated']} new) "
+              f"in {stats['seconds']:.2f}s")
+
+    def run(self, episodes_per_show=10, target_total=500, backlog=True):
+        """Run all three stages to completion. Returns run stats."""
+        self._started = time.monotonic()
+        result = {'started_at': datetime.now().isoformat()}
+
+        print(f"\n{'='*60}")
+        print(f"PODICALS PIPELINE")
+        print(f"{'='*60}")
+        print(f"Summary workers: {self.summary_workers}, queue size: {self.summary_queue.maxsize}")
+        print(f"Export every {self.export_interval:.0f}s while summaries arrive")
+        print(f"{'='*60}\n")
+
+        workers = [
+            threading.Thread(target=self._summarize_worker, name=f"summarize-{i}", daemon=True)
+            for i in range(self.summary_workers)
+        ]
+        exporter = threading.Thread(target=self._export_worker, name="export", daemon=True)
+        producers = [
+            threading.Thread(target=self._scrape, args=(episodes_per_show, target_total, result),
+                             name="scrape", daemon=True),
+        ]
+        if backlog:
+            producers.append(threading.Thread(target=self._feed_backlog, name="backlog", daemon=True))
+
+        for thread in workers + [exporter] + producers:
+            thread.start()
+
+        for thread in producers:
+            thread.join()
+        for _ in workers:
+            self.summary_queue.put((_DONE_RANK, 0, next(self._sequence), _DONE))
+        for thread in workers:
+            thread.join()
+        self.export_queue.put(_DONE)
+        exporter.join()
+        self.exporter.close()
+
+        result.update(self.counts)
+        result['first_summary_seconds'] = self.first_summary_seconds
+        result['summary_queue_peak'] = self.queue_peak
+        result['scrape_blocked_seconds'] = round(self.blocked_seconds, 1)
+        result['elapsed_seconds'] = round(time.monotonic() - self._started, 1)
+        result['completed_at'] = datetime.now().isoformat()
+
+        print(f"\n{'='*60}")
+        print(f"PIPELINE COMPLETE in {result['elapsed_seconds']:.0f}s")
+        print(f"Summarized: {result['summarized']} ({result['failed']} failed, {result['unchanged']} unchanged, "
+              f"{result['duplicates']} duplicates)")
+        for line in self.summarizer.budget.report_lines(result['elapsed_seconds'], result['summarized']):
+            print(line)
+        if self.first_summary_seconds is not None:
+            print(f"First summary after {self.first_summary_seconds:.0f}s")
+        print(f"Scrape workers waited {result['scrape_blocked_seconds']:.0f}s on a full queue (summed over workers)")
+        print(f"{'='*60}")
+
+        return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape, summarize and export in one streaming run")
+    parser.add_argument('--target', type=int, default=500, help="Total episodes to scrape")
+    parser.add_argument('--episodes-per-show', type=int, default=10)
+    parser.add_argument('--channel-workers', type=int, default=4)
+    parser.add_argument('--episode-workers', type=int, default=4)
+    parser.add_argument('--summary-workers', type=int, default=4)
+    parser.add_argument('--queue-size', type=int, default=16,
+                        help="Episodes buffered between scraping and summarizing")
+    parser.add_argument('--export-interval', type=float, default=60.0,
+                        help="Minimum seconds between website exports")
+    parser.add_argument('--no-backlog', action='store_true',
+                        help="Don't summarize transcripts left over from earlier runs")
+    parser.add_argument('--budget-usd', type=float, default=None, help="Stop spending after this many dollars")
+    parser.add_argument('--budget-tokens', type=int, default=None, help="Stop after this many input+output tokens")
+    parser.add_argument('--no-downgrade', action='store_true',
+                        help="When over budget, defer episodes instead of using a cheaper model")
+    args = parser.parse_args()
+
+    pipeline = Pipeline(
+        channel_workers=args.channel_workers,
+        episode_workers=args.episode_workers,
+        summary_workers=args.summary_workers,
+        queue_size=args.queue_size,
+        export_interval=args.export_interval,
+        budget_usd=args.budget_usd,
+        budget_tokens=args.budget_tokens,
+        downgrade_model=None if args.no_downgrade else DOWNGRADE_MODEL,
+    )
+    pipeline.run(args.episodes_per_show, args.target, backlog=not args.no_backlog)
@@ -0,0 +1,348 @@
+"""
+Podicals - Summary Prerendering
+Renders each summary's markdown once, at export time, so the website serves
+ready-made HTML instead of parsing markdown on every visit. Alongside the
+HTML it pulls out what the listing and page chrome need: the headline, the
+hook (first paragraph), section headings with anchors, word count and
+reading time.
+
+The renderer handles the markdown the summarizer writes (headings,
+paragraphs, lists, blockquotes, emphasis, links, code, rules) and nothing
+else. All text is escaped and only the renderer's own tags are emitted, so
+raw HTML in a summary shows up as text; links are kept only for http(s)
+and mailto URLs.
+
+Results are cached by a hash of the summary text (and PRERENDER_VERSION),
+so re-exports, touched files and --full rebuilds don't render again. Cache
+misses are rendered across a process pool when there are enough of them.
+
+    <root>/prerender.jsonl      <key>\t<rendered fields as JSON>, one per line
+
+    python prerender.py summaries/business/abc123.json    # print the rendered fields
+"""
+
+import os
+import re
+import html
+import json
+import math
+import hashlib
+import argparse
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+
+# Bump when the output changes, so cached renders are redone
+PRERENDER_VERSION = 1
+CACHE_FILENAME = 'prerender.jsonl'
+
+READING_WORDS_PER_MINUTE = 230
+# Fewer cache misses than this are rendered in-process (a pool costs more to start)
+POOL_MIN_SUMMARIES = 64
+POOL_CHUNKSIZE = 16
+
+HEADING_RE = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+RULE_RE = re.compile(r'^([-*_])(\s*\1){2,}\s*$')
+LIST_RE = re.compile(r'^\s*([-*+]|\d{1,9}[.)])\s+(.*)$')
+FENCE_RE = re.compile(r'^\s*(```|~~~)')
+CODE_RE = re.compile(r'(`+)(.+?)\1')
+LINK_RE = re.compile(r'!?\[([^\]]*)\]\(\s*([^)\s]+)(?:\s+"[^"]*")?\s*\)')
+STRONG_RE = re.compile(r'\*\*(?=\S)(.+?)(?<=\S)\*\*|__(?=\S)(.+?)(?<=\S)__')
+EM_RE = re.compile(r'(?<![\w*])\*(?=\S)(.+?)(?<=\S)\*(?![\w*])|(?<!\w)_(?=\S)(.+?)(?<=\S)_(?!\w)')
+SAFE_URL_SCHEMES = ('http://', 'https://', 'mailto:')
+# Placeholders for already-rendered spans while emphasis is applied
+SPAN_RE = re.compile('\x00(\\d+)\x00')
+
+
+def prerender_key(summary):
+    return hashlib.sha256(f"{PRERENDER_VERSION}\n{summary or ''}".encode('utf-8')).hexdigest()
+
+
+def _anchor(text, taken):
+    base = re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-') or 'section'
+    anchor, n = base, 2
+    while anchor in taken:
+        anchor, n = f"{base}-{n}", n + 1
+    taken.add(anchor)
+    return anchor
+
+
+def plain_text(text):
+    """Inline markdown reduced to its visible text."""
+    text = LINK_RE.sub(r'\1', text or '')
+    text = re.sub(r'[*_`]+', '', text)
+    return ' '.join(text.split())
+
+
+def render_inline(text):
+    """Escaped HTML for one run of inline markdown."""
+    text = (text or '').replace('\x00', '')
+    spans = []
+
+    def hold(rendered):
+        spans.append(rendered)
+        return f"\x00{len(spans) - 1}\x00"
+
+    def code(match):
+        return hold(f"<code>{html.escape(match.group(2).strip())}</code>")
+
+    def link(match):
+        label, url = match.group(1), match.group(2)
+        if not url.lower().startswith(SAFE_URL_SCHEMES):
+            return label
+        return hold(f'<a href="{html.escape(url)}" rel="nofollow noopener">') + label + hold('</a>')
+
+    # Code spans first (nothing inside them is markup), then links
+    parts = []
+    last = 0
+    for match in CODE_RE.finditer(text):
+        parts.append(LINK_RE.sub(link, text[last:match.start()]))
+        parts.append(code(match))
+        last = match.end()
+    parts.append(LINK_RE.sub(link, text[last:]))
+
+    rendered = html.escape(''.join(parts), quote=False)
+    rendered = STRONG_RE.sub(lambda m: f"<strong>{m.group(1) or m.group(2)}</strong>", rendered)
+    rendered = EM_RE.sub(lambda m: f"<em>{m.group(1) or m.group(2)}</em>", rendered)
+    return SPAN_RE.sub(lambda m: spans[int(m.group(1))], rendered)
+
+
+def _starts_block(line):
+    stripped = line.strip()
+    return bool(HEADING_RE.match(stripped) or RULE_RE.match(stripped) or stripped.startswith('>')
+                or LIST_RE.match(line) or FENCE_RE.match(line))
+
+
+def parse_blocks(markdown):
+    """
+    Split markdown into blocks: ('heading', level, text), ('paragraph', text),
+    ('list', ordered, [item text]), ('quote', inner markdown), ('code', text), ('rule',).
+    """
+    lines = (markdown or '').replace('\r\n', '\n').split('\n')
+    blocks = []
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        stripped = line.strip()
+        if not stripped:
+            i += 1
+            continue
+
+        fence = FENCE_RE.match(line)
+        if fence:
+            body = []
+            i += 1
+            while i < len(lines) and not lines[i].strip().startswith(fence.group(1)):
+                body.append(lines[i])
+                i += 1
+            blocks.append(('code', '\n'.join(body)))
+            i += 1
+            continue
+
+        heading = HEADING_RE.match(stripped)
+        if heading:
+            blocks.append(('heading', len(heading.group(1)), heading.group(2)))
+            i += 1
+            continue
+
+        if RULE_RE.match(stripped):
+            blocks.append(('rule',))
+            i += 1
+            continue
+
+        if stripped.startswith('>'):
+            inner = []
+            while i < len(lines) and lines[i].strip().startswith('>'):
+                inner.append(re.sub(r'^\s*>\s?', '', lines[i]))
+                i += 1
+            blocks.append(('quote', '\n'.join(inner)))
+            continue
+
+        item = LIST_RE.match(line)
+        if item:
+            ordered = item.group(1)[0].isdigit()
+            items = []
+            while i < len(lines):
+                item = LIST_RE.match(lines[i])
+                if item and item.group(1)[0].isdigit() == ordered:
+                    items.append(item.group(2))
+                elif lines[i].strip() and not _starts_block(lines[i]) and lines[i][:1].isspace():
+                    # Indented continuation of the previous item
+                    items[-1] += ' ' + lines[i].strip()
+                elif not lines[i].strip() and i + 1 < len(lines) and LIST_RE.match(lines[i + 1]):
+                    pass
+                else:
+                    break
+                i += 1
+            blocks.append(('list', ordered, items))
+            continue
+
+        paragraph = [stripped]
+        i += 1
+        while i < len(lines) and lines[i].strip() and not _starts_block(lines[i]):
+            paragraph.append(lines[i].strip())
+            i += 1
+        blocks.append(('paragraph', ' '.join(paragraph)))
+    return blocks
+
+
+def render_blocks(blocks):
+    out = []
+    for block in blocks:
+        kind = block[0]
+        if kind == 'heading':
+            level = min(6, max(2, block[1]))
+            out.append(f'<h{level} id="{block[3]}">{render_inline(block[2])}</h{level}>'
+                       if len(block) > 3 else f"<h{level}>{render_inline(block[2])}</h{level}>")
+        elif kind == 'paragraph':
+            out.append(f"<p>{render_inline(block[1])}</p>")
+        elif kind == 'list':
+            tag = 'ol' if block[1] else 'ul'
+            items = ''.join(f"<li>{render_inline(item)}</li>" for item in block[2])
+            out.append(f"<{tag}>{items}</{tag}>")
+        elif kind == 'quote':
+            out.append(f"<blockquote>{render_blocks(parse_blocks(block[1]))}</blockquote>")
+        elif kind == 'code':
+            out.append(f"<pre><code>{html.escape(block[1])}</code></pre>")
+        elif kind == 'rule':
+            out.append('<hr>')
+    return '\n'.join(out)
+
+
+def render_summary(markdown):
+    """
+    Rendered fields for one summary: html (body without the headline),
+    headline, hook, sections [{'id', 'title', 'level'}], word_count and
+    reading_minutes.
+    """
+    blocks = parse_blocks(markdown)
+
+    # The summarizer opens with a headline: a heading, or a line in bold
+    headline = None
+    if blocks and blocks[0][0] == 'heading':
+        headline = plain_text(blocks.pop(0)[2])
+    elif blocks and blocks[0][0] == 'paragraph' and re.fullmatch(r'\*\*[^*]+\*\*', blocks[0][1]):
+        headline = plain_text(blocks.pop(0)[1])
+
+    hook = next((plain_text(block[1]) for block in blocks if block[0] == 'paragraph'), '')
+
+    anchors = set()
+    sections = []
+    for n, block in enumerate(blocks):
+        if block[0] == 'heading':
+            title = plain_text(block[2])
+            anchor = _anchor(title, anchors)
+            blocks[n] = block + (anchor,)
+            sections.append({'id': anchor, 'title': title, 'level': min(6, max(2, block[1]))})
+
+    words = len(plain_text(markdown).split())
+    return {
+        'headline': headline,
+        'hook': hook,
+        'sections': sections,
+        'html': render_blocks(blocks),
+        'word_count': words,
+        'reading_minutes': max(1, math.ceil(words / READING_WORDS_PER_MINUTE)),
+    }
+
+
+class Prerenderer:
+    """
+    Cached, pooled render_summary().
+
+        prerenderer = Prerenderer('./data/.export/prerender')
+        fields = prerenderer.render_many(summaries)   # one dict per summary, in order
+        prerenderer.close()
+    """
+
+    def __init__(self, root, workers=None):
+        self.root = root
+        self.path = os.path.join(root, CACHE_FILENAME)
+        self.workers = workers or os.cpu_count() or 1
+        self.hits = 0
+        self.rendered = 0
+        # key -> (offset, length) in the cache log; read on first lookup
+        self._index = None
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _load_index(self):
+        self._index = {}
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as f:
+            offset = 0
+            for line in f:
+                key, sep, _ = line.partition(b'\t')
+                if sep and line.endswith(b'\n'):
+                    self._index[key.decode('ascii')] = (offset, len(line))
+                offset += len(line)
+
+    def _lookup(self, keys):
+        found = {}
+        wanted = [(self._index[key], key) for key in set(keys) if key in self._index]
+        if not wanted:
+            return found
+        with open(self.path, 'rb') as f:
+            for (offset, length), key in sorted(wanted):
+                f.seek(offset)
+                try:
+                    found[key] = json.loads(f.read(length).partition(b'\t')[2])
+                except ValueError:
+                    continue
+        return found
+
+    def _render(self, summaries):
+        if len(summaries) < POOL_MIN_SUMMARIES or self.workers < 2:
+            return [render_summary(summary) for summary in summaries]
+        if self._pool is None:
+            # Spawned, not forked: the exporter may be running in a threaded process
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+        return list(self._pool.map(render_summary, summaries, chunksize=POOL_CHUNKSIZE))
+
+    def render_many(self, summaries):
+        """Rendered fields for each summary, from the cache where possible."""
+        with self._lock:
+            if self._index is None:
+                self._load_index()
+            keys = [prerender_key(summary) for summary in summaries]
+            results = self._lookup(keys)
+            self.hits += sum(1 for key in keys if key in results)
+
+            missing = {}
+            for key, summary in zip(keys, summaries):
+                if key not in results:
+                    missing.setdefault(key, summary or '')
+            if missing:
+                os.makedirs(self.root, exist_ok=True)
+                rendered = self._render(list(missing.values()))
+                with open(self.path, 'ab') as f:
+                    for key, fields in zip(missing, rendered):
+                        line = key.encode('ascii') + b'\t' + json.dumps(fields, ensure_ascii=False).encode('utf-8') + b'\n'
+                        self._index[key] = (f.tell(), len(line))
+                        f.write(line)
+                        results[key] = fields
+                self.rendered += len(missing)
+            return [results[key] for key in keys]
+
+    def close(self):
+        """Shut down the worker pool, if one was started."""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prerender a summary file and print the result")
+    parser.add_argument('summary_file')
+    parser.add_argument('--html', action='store_true', help="Print only the HTML")
+    args = parser.parse_args()
+
+    with open(args.summary_file, 'r', encoding='utf-8') as f:
+        fields = render_summary(json.load(f).get('summary'))
+    if args.html:
+        print(fields['html'])
+    else:
+        print(json.dumps(fields, indent=2, ensure_ascii=False))
@@ -0,0 +1,245 @@
+"""
+Podicals - Rate Limiter
+Shared per-host token buckets that keep concurrent scraping polite, and an
+adaptive concurrency window for async API calls. Both slow themselves down
+when the other side starts throttling us and creep back up once requests
+succeed again.
+"""
+
+import asyncio
+import threading
+import time
+
+
+# Requests per second for each host we talk to. YouTube pages (channel
+# listings and video metadata via yt-dlp) and the transcript endpoint
+# are throttled independently.
+DEFAULT_HOST_RATES = {
+    'youtube': 2.0,
+    'transcripts': 2.0,
+}
+
+THROTTLE_MARKERS = (
+    '429',
+    'too many requests',
+    'rate limit',
+    'ratelimit',
+    'throttl',
+)
+
+# youtube_transcript_api raises these when YouTube blocks our IP
+THROTTLE_EXCEPTIONS = (
+    'RequestBlocked',
+    'IpBlocked',
+    'TooManyRequests',
+)
+
+
+def is_throttle_error(error):
+    """Return True if an exception (or error message) looks like throttling."""
+    if isinstance(error, BaseException):
+        if type(error).__name__ in THROTTLE_EXCEPTIONS:
+            return True
+    message = str(error).lower()
+    return any(marker in message for marker in THROTTLE_MARKERS)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket with AIMD rate control.
+    Each throttle halves the refill rate and pauses the bucket;
+    each success nudges the rate back towards its configured ceiling.
+    """
+
+    def __init__(self, rate, capacity=None, min_rate=0.1, backoff_seconds=5.0, max_backoff_seconds=120.0):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.consecutive_throttles = 0
+        self.paused_until = 0.0
+        self.throttle_count = 0
+        self.wait_seconds = 0.0
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+
+    def acquire(self):
+        """Block until a token is available. Returns seconds spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.paused_until:
+                    delay = self.paused_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    self.wait_seconds += waited
+                    return waited
+                else:
+                    delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def throttled(self, retry_after=None):
+        """Record a throttling response: back off and halve the rate."""
+        with self._lock:
+            self.throttle_count += 1
+            self.consecutive_throttles += 1
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = 0
+            backoff = min(
+                self.max_backoff_seconds,
+                self.backoff_seconds * (2 ** (self.consecutive_throttles - 1)),
+            )
+            if retry_after:
+                backoff = max(backoff, retry_after)
+            self.paused_until = max(self.paused_until, time.monotonic() + backoff)
+            return backoff
+
+    def succeeded(self):
+        """Record a successful request: grow the rate additively."""
+        with self._lock:
+            self.consecutive_throttles = 0
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
+
+
+class HostRateLimiter:
+    """Collection of token buckets keyed by host."""
+
+    def __init__(self, rates=None, max_retries=3, metrics=None):
+        self.rates = {**DEFAULT_HOST_RATES, **(rates or {})}
+        self.max_retries = max_retries
+        # Optional metrics.Metrics; records time spent waiting and retries
+        self.metrics = metrics
+        self.buckets = {host: TokenBucket(rate) for host, rate in self.rates.items()}
+        self._lock = threading.Lock()
+
+    def bucket(self, host):
+        with self._lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.rates.get(host, 1.0))
+            return self.buckets[host]
+
+    def call(self, host, fn, *args, **kwargs):
+        """
+        Call fn under the host's rate limit.
+        Throttling errors back the bucket off and the call is retried;
+        any other exception propagates unchanged.
+        """
+        bucket = self.bucket(host)
+        attempt = 0
+        while True:
+            waited = bucket.acquire()
+            if self.metrics:
+                self.metrics.inc('rate_limit_wait_seconds_total', waited, host=host)
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                if not is_throttle_error(e) or attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                if self.metrics:
+                    self.metrics.inc('retries_total', host=host)
+                backoff = bucket.throttled()
+                print(f"  Throttled by {host}, backing off {backoff:.0f}s (retry {attempt}/{self.max_retries})")
+                continue
+            bucket.succeeded()
+            return result
+
+    def stats(self):
+        """Per-host throttle counts, wait time and current rate."""
+        with self._lock:
+            buckets = dict(self.buckets)
+        return {
+            host: {
+                'rate': round(bucket.rate, 3),
+                'throttled': bucket.throttle_count,
+                'wait_seconds': round(bucket.wait_seconds, 2),
+            }
+            for host, bucket in buckets.items()
+        }
+
+
+def retry_after_seconds(error, default=None):
+    """Read a Retry-After header (seconds) off an API error's response, if any."""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    value = headers.get('retry-after')
+    try:
+        return float(value) if value is not None else default
+    except ValueError:
+        return default
+
+
+class AdaptiveConcurrency:
+    """
+    Async AIMD window for in-flight API requests.
+    The window grows by one after a full window of successes and halves on
+    rate-limit/overload responses, which also pause new requests until
+    the server's Retry-After has passed.
+    """
+
+    def __init__(self, initial=8, minimum=1, maximum=64):
+        self.limit = max(minimum, min(initial, maximum))
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight = 0
+        self.peak = 0
+        self.shrinks = 0
+        self.paused_until = 0.0
+        self._successes = 0
+        self._condition = None
+
+    def _cond(self):
+        # Created lazily so the window binds to the running event loop
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def acquire(self):
+        cond = self._cond()
+        while True:
+            delay = self.paused_until - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            async with cond:
+                if self.in_flight < self.limit:
+                    self.in_flight += 1
+                    self.peak = max(self.peak, self.in_flight)
+                    return
+                await cond.wait()
+
+    async def release(self):
+        cond = self._cond()
+        async with cond:
+            self.in_flight -= 1
+            cond.notify_all()
+
+    def succeeded(self):
+        self._successes += 1
+        if self._successes >= self.limit and self.limit < self.maximum:
+            self.limit += 1
+            self._successes = 0
+
+    def throttled(self, retry_after=None):
+        """Halve the window and pause. Returns the pause in seconds."""
+        # Requests already in flight when we backed off will often fail too;
+        # only shrink once per pause so one burst doesn't collapse the window
+        if time.monotonic() >= self.paused_until:
+            self.limit = max(self.minimum, self.limit // 2)
+            self.shrinks += 1
+        self._successes = 0
+        pause = retry_after if retry_after is not None else 1.0
+        self.paused_until = max(self.paused_until, time.monotonic() + pause)
+        return pause
@@ -0,0 +1,326 @@
+"""
+Podicals - Related Episodes
+"More like this" for every episode, precomputed at export time: cosine
+similarity between TF-IDF vectors of the summary (plus the transcript, when
+the transcript store is available), keeping the RELATED_K closest episodes.
+
+Vectors are sparse SciPy rows over hashed terms, so there is no vocabulary
+to keep in step. Similarities are computed for a block of rows at a time
+against the whole matrix, which holds memory to about BLOCK_CELLS scores
+however large the archive gets.
+
+Updates are incremental. IDF weights stay fixed between refits, so stored
+neighbour scores remain comparable: a new or changed episode gets its own
+list, an existing list is only touched if a new episode beats its weakest
+neighbour, and lists that pointed at a removed episode are recomputed.
+Everything is refit once the archive has grown by REFIT_GROWTH.
+
+    <root>/vectors.npz      term weights per episode (CSR) and the fitted IDF
+    <root>/neighbors.npz    neighbour rows and scores, RELATED_K per episode
+    <root>/state.json       episode ids and content hashes, in row order
+
+    python related.py <video_id>        # show an episode's neighbours
+"""
+
+import os
+import json
+import math
+import zlib
+import argparse
+import functools
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+
+from search_index import tokenize
+
+
+STATE_FILENAME = 'state.json'
+VECTORS_FILENAME = 'vectors.npz'
+NEIGHBORS_FILENAME = 'neighbors.npz'
+
+RELATED_K = 8
+# Terms are hashed into this many columns (a power of two)
+FEATURES = 1 << 20
+# Strongest terms kept per episode, so a matrix row never has more entries
+MAX_TERMS = 200
+# Transcript terms count for this much of a summary term
+TRANSCRIPT_WEIGHT = 0.25
+# Similarity scores held at once (block rows x episodes, or x terms in use)
+BLOCK_CELLS = 1 << 23
+# Refit IDF weights (and recompute every list) once the archive grows by this share
+REFIT_GROWTH = 0.25
+
+MIN_TERM_CHARS = 3
+STOPWORDS = frozenset("""
+about above after again against also among another any are around back because been before being below
+between both but can cannot could did does doing done down during each even ever every few for from
+further get gets getting going gone got had has have having her here hers herself him himself his how
+however into its itself just know like lot lots make made many may maybe more most much must myself
+not now off once one only other our ours ourselves out over own really right said same say says see
+she should since some still such take than that the their theirs them themselves then there these
+they thing things think this those though through thus too under until upon very want was way well
+were what when where whether which while who whom whose why will with within without would yeah yes
+yet you your yours yourself yourselves episode podcast show guest host talk talks discuss discusses
+discussed discussion conversation
+""".split())
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def _column(token):
+    return zlib.crc32(token.encode('utf-8')) & (FEATURES - 1)
+
+
+def term_weights(summary, transcript=None):
+    """
+    {column: weight} for one episode: log-scaled term counts, transcript
+    terms down-weighted, cut to the MAX_TERMS strongest.
+    """
+    weights = Counter()
+    for text, scale in ((summary, 1.0), (transcript, TRANSCRIPT_WEIGHT)):
+        for token, count in Counter(tokenize(text)).items():
+            if len(token) >= MIN_TERM_CHARS and token not in STOPWORDS and not token.isdigit():
+                weights[_column(token)] += scale * (1 + math.log(count))
+    return dict(weights.most_common(MAX_TERMS))
+
+
+def fit_idf(weights):
+    """Smoothed IDF per column from a CSR matrix of term weights."""
+    df = np.bincount(weights.indices, minlength=FEATURES)
+    return (np.log((1 + weights.shape[0]) / (1 + df)) + 1).astype(np.float32)
+
+
+def tfidf(weights, idf):
+    """Row-normalized TF-IDF matrix."""
+    matrix = weights.astype(np.float32, copy=True)
+    matrix.data *= idf[matrix.indices]
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.diags(1 / norms).astype(np.float32) @ matrix
+
+
+def top_k(scores, k):
+    """
+    (columns, scores) of the k highest positive scores in each row, best
+    first; -1 / 0 where a row has fewer.
+    """
+    rows, width = scores.shape
+    if width > k:
+        columns = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        columns = np.broadcast_to(np.arange(width), (rows, width))
+    best = np.take_along_axis(scores, columns, axis=1)
+    order = np.argsort(-best, axis=1, kind='stable')
+    columns = np.take_along_axis(columns, order, axis=1)
+    best = np.take_along_axis(best, order, axis=1)
+    if width < k:
+        columns = np.pad(columns, ((0, 0), (0, k - width)), constant_values=-1)
+        best = np.pad(best, ((0, 0), (0, k - width)))
+    empty = best <= 0
+    columns = np.where(empty, -1, columns)
+    best = np.where(empty, 0, best)
+    return columns.astype(np.int32), best.astype(np.float32)
+
+
+class RelatedIndex:
+    """
+    Neighbour lists for the exported episodes.
+
+        index = RelatedIndex('./data/.export/related')
+        index.update(docs, removed)     # docs: {'id', 'sha', 'summary', 'transcript'}
+        index.save()
+        index.related(video_id)         # -> [video_id, ...]
+    """
+
+    def __init__(self, root, k=RELATED_K):
+        self.root = root
+        self.k = k
+        self.ids = []
+        self.shas = []
+        self.fitted_docs = 0
+        self.weights = sparse.csr_matrix((0, FEATURES), dtype=np.float32)
+        self.idf = None
+        self.neighbors = np.zeros((0, k), dtype=np.int32)
+        self.scores = np.zeros((0, k), dtype=np.float32)
+        self._load()
+        self.rows = {video_id: row for row, video_id in enumerate(self.ids)}
+
+    def _load(self):
+        state_path = os.path.join(self.root, STATE_FILENAME)
+        if not os.path.exists(state_path):
+            return
+        with open(state_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        if state.get('k') != self.k or state.get('features') != FEATURES:
+            # Built with other settings; rebuilt from scratch on the next update
+            return
+        try:
+            with np.load(os.path.join(self.root, VECTORS_FILENAME)) as vectors:
+                weights = sparse.csr_matrix(
+                    (vectors['data'], vectors['indices'], vectors['indptr']), shape=(len(state['ids']), FEATURES),
+                )
+                idf = vectors['idf'] if len(vectors['idf']) else None
+            with np.load(os.path.join(self.root, NEIGHBORS_FILENAME)) as neighbors:
+                rows, scores = neighbors['rows'], neighbors['scores']
+        except (OSError, KeyError, ValueError):
+            return
+        if rows.shape != (len(state['ids']), self.k):
+            # Files from different saves (a crash between writes)
+            return
+        self.ids, self.shas, self.fitted_docs = state['ids'], state['shas'], state['fitted_docs']
+        self.weights, self.idf, self.neighbors, self.scores = weights, idf, rows, scores
+
+    def __len__(self):
+        return len(self.ids)
+
+    def update(self, docs, removed=()):
+        """
+        Add or replace `docs` and drop `removed` ids. Returns how many
+        neighbour lists were recomputed or changed.
+        """
+        docs = [doc for doc in docs if doc['id']]
+        drop = set(removed) | {doc['id'] for doc in docs}
+        drop &= set(self.rows)
+        if not docs and not drop:
+            return 0
+
+        keep = np.array([row for row, video_id in enumerate(self.ids) if video_id not in drop], dtype=np.int64)
+        remap = np.full(len(self.ids), -1, dtype=np.int32)
+        remap[keep] = np.arange(len(keep), dtype=np.int32)
+        old_neighbors = self.neighbors[keep]
+        neighbors = np.where(old_neighbors >= 0, remap[np.maximum(old_neighbors, 0)], -1)
+        # Lists that lost a neighbour are recomputed from scratch
+        dirty = np.flatnonzero(((old_neighbors >= 0) & (neighbors < 0)).any(axis=1))
+
+        new_rows = self._vectors(docs)
+        self.weights = sparse.vstack([self.weights[keep], new_rows], format='csr')
+        self.ids = [self.ids[row] for row in keep] + [doc['id'] for doc in docs]
+        self.shas = [self.shas[row] for row in keep] + [doc.get('sha') for doc in docs]
+        self.rows = {video_id: row for row, video_id in enumerate(self.ids)}
+        self.neighbors = np.vstack([neighbors.astype(np.int32), np.full((len(docs), self.k), -1, dtype=np.int32)])
+        self.scores = np.vstack([self.scores[keep], np.zeros((len(docs), self.k), dtype=np.float32)])
+
+        total = len(self.ids)
+        if self.idf is None or total > self.fitted_docs * (1 + REFIT_GROWTH):
+            self.idf = fit_idf(self.weights)
+            self.fitted_docs = total
+            self._compute(np.arange(total), fresh=np.zeros(total, dtype=bool))
+            return total
+
+        fresh = np.zeros(total, dtype=bool)
+        fresh[len(keep):] = True
+        rows = np.concatenate([dirty, np.arange(len(keep), total)])
+        return len(rows) + self._compute(rows, fresh)
+
+    def _vectors(self, docs):
+        data, indices, indptr = [], [], [0]
+        for doc in docs:
+            weights = term_weights(' '.join(filter(None, [doc.get('title'), doc.get('summary')])),
+                                   doc.get('transcript'))
+            columns = sorted(weights)
+            indices.extend(columns)
+            data.extend(weights[column] for column in columns)
+            indptr.append(len(indices))
+        return sparse.csr_matrix(
+            (np.array(data, dtype=np.float32), np.array(indices, dtype=np.int32), np.array(indptr, dtype=np.int64)),
+            shape=(len(docs), FEATURES),
+        )
+
+    def _compute(self, rows, fresh):
+        """
+        Recompute the lists of `rows` a block at a time. Scores from `fresh`
+        rows are also merged into every other list they now belong in.
+        Returns how many other lists changed.
+        """
+        total = len(self.ids)
+        if not total or not len(rows):
+            return 0
+        matrix = tfidf(self.weights, self.idf)
+        # Only the columns some episode uses, so a dense block of rows stays small
+        used, columns = np.unique(matrix.indices, return_inverse=True)
+        matrix = sparse.csr_matrix((matrix.data, columns.astype(np.int32), matrix.indptr), shape=(total, len(used)))
+        recomputed = np.zeros(total, dtype=bool)
+        recomputed[rows] = True
+        merged = np.zeros(total, dtype=bool)
+        block = max(1, BLOCK_CELLS // max(total, len(used)))
+
+        for start in range(0, len(rows), block):
+            chunk = rows[start:start + block]
+            # Sparse matrix times a dense block is much faster than sparse x sparse
+            sims = np.ascontiguousarray((matrix @ matrix[chunk].T.toarray()).T)
+            sims[np.arange(len(chunk)), chunk] = 0
+            self.neighbors[chunk], self.scores[chunk] = top_k(sims, self.k)
+
+            # Fresh episodes stronger than a list's weakest neighbour join it
+            sources = chunk[fresh[chunk]]
+            if not len(sources):
+                continue
+            incoming = sims[fresh[chunk]]
+            targets = np.flatnonzero(~recomputed & (incoming > self.scores[:, -1]).any(axis=0))
+            if not len(targets):
+                continue
+            candidates = np.hstack([self.neighbors[targets], np.broadcast_to(sources, (len(targets), len(sources)))])
+            candidate_scores = np.hstack([self.scores[targets], incoming[:, targets].T])
+            picked, self.scores[targets] = top_k(candidate_scores, self.k)
+            self.neighbors[targets] = np.where(
+                picked >= 0, np.take_along_axis(candidates, np.maximum(picked, 0), axis=1), -1,
+            )
+            merged[targets] = True
+        return int(merged.sum())
+
+    def related(self, video_id):
+        """Ids of an episode's neighbours, closest first."""
+        row = self.rows.get(video_id)
+        if row is None:
+            return []
+        return [self.ids[n] for n in self.neighbors[row] if n >= 0]
+
+    def table(self):
+        """{video_id: [related ids]} for every episode with any neighbours."""
+        table = {}
+        for row, video_id in enumerate(self.ids):
+            related = [self.ids[n] for n in self.neighbors[row] if n >= 0]
+            if related:
+                table[video_id] = related
+        return table
+
+    def save(self):
+        """Write the vectors, neighbour lists and state; the state file goes last."""
+        os.makedirs(self.root, exist_ok=True)
+        vectors_tmp = os.path.join(self.root, f"{VECTORS_FILENAME}.tmp")
+        with open(vectors_tmp, 'wb') as f:
+            np.savez(f, data=self.weights.data, indices=self.weights.indices, indptr=self.weights.indptr,
+                     idf=self.idf if self.idf is not None else np.zeros(0, dtype=np.float32))
+        neighbors_tmp = os.path.join(self.root, f"{NEIGHBORS_FILENAME}.tmp")
+        with open(neighbors_tmp, 'wb') as f:
+            np.savez(f, rows=self.neighbors, scores=self.scores)
+        os.replace(vectors_tmp, os.path.join(self.root, VECTORS_FILENAME))
+        os.replace(neighbors_tmp, os.path.join(self.root, NEIGHBORS_FILENAME))
+
+        state_tmp = os.path.join(self.root, f"{STATE_FILENAME}.tmp")
+        with open(state_tmp, 'w', encoding='utf-8') as f:
+            json.dump({
+                'k': self.k,
+                'features': FEATURES,
+                'fitted_docs': self.fitted_docs,
+                'ids': self.ids,
+                'shas': self.shas,
+            }, f)
+        os.replace(state_tmp, os.path.join(self.root, STATE_FILENAME))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show an episode's related episodes")
+    parser.add_argument('video_id')
+    parser.add_argument('--index-dir', default='./data/.export/related')
+    args = parser.parse_args()
+
+    index = RelatedIndex(args.index_dir)
+    row = index.rows.get(args.video_id)
+    if row is None:
+        print(f"{args.video_id} is not in the related index ({len(index)} episodes)")
+    else:
+        for n, score in zip(index.neighbors[row], index.scores[row]):
+            if n >= 0:
+                print(f"{score:6.3f}  {index.ids[n]}")
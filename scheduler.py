@@ -0,0 +1,292 @@
+"""
+Podicals - Crawl Scheduler
+Decides how many episodes to look for on each channel this run, and in what
+order, from what earlier runs learned about it: how often it uploads, and
+how many of its uploads turn out to be full episodes with a transcript.
+
+A daily show gets slots every run, a monthly show checked last week is left
+alone without even listing its channel, and a channel we have never visited
+gets a full backfill. Genres are interleaved, so whichever genre comes last
+in PODCASTS_BY_GENRE isn't the one cut off when the target is reached.
+
+State lives in <transcripts>/scheduler.json.
+
+    python scheduler.py --target 500      # show the plan for the next run
+"""
+
+import os
+import json
+import math
+import argparse
+import threading
+from datetime import date, datetime
+
+from dedup import normalize_handle
+from file_lock import locked
+
+
+SCHEDULER_FILENAME = 'scheduler.json'
+
+# Uploads per day assumed for a channel with no history at all
+DEFAULT_UPLOADS_PER_DAY = 0.3
+# Until a channel has been visited twice, its cadence is estimated from the
+# upload dates of its most recent saved episodes
+HISTORY_EPISODES = 10
+# Weight of the latest visit in the running upload-rate estimate
+RATE_SMOOTHING = 0.3
+# Yield prior: as if this many uploads had been looked at and half were kept
+YIELD_PRIOR = 2
+# Longer gaps than this don't add expected uploads (listings only go back so far)
+MAX_GAP_DAYS = 30
+# Every channel is listed at least this often, so its estimates stay fresh
+MAX_REVISIT_DAYS = 14
+# Channels expecting fewer new episodes than this are skipped for the run
+MIN_EXPECTED = 0.5
+# Shortest gap counted between visits, so two runs an hour apart don't
+# make a channel look like it uploads hundreds of times a day
+MIN_GAP_DAYS = 0.25
+
+
+def _new_state():
+    return {
+        'visits': 0,
+        'last_visit': None,
+        'uploads_per_day': None,
+        'examined': 0,
+        'saved': 0,
+    }
+
+
+class CrawlScheduler:
+    """
+    Per-channel upload and yield estimates, and the per-run plan built from
+    them. Thread-safe; record_visit() is called by scraper workers.
+    """
+
+    def __init__(self, root="./transcripts", store=None):
+        self.path = os.path.join(root, SCHEDULER_FILENAME)
+        self.channels = self._read()
+        # Channels this process visited; only these are written back on save
+        self._visited = set()
+        self._lock = threading.Lock()
+        self.history = self._store_history(store) if store is not None else {}
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('channels', {})
+
+    @staticmethod
+    def _store_history(store):
+        """
+        {podcast name: {'last_scraped', 'episodes_per_day'}} from saved
+        episodes, covering shows scraped before the scheduler existed.
+        """
+        scraped = {}
+        uploads = {}
+        for entry in store.entries():
+            name = entry.get('podcast_name')
+            if not name:
+                continue
+            if entry.get('scraped_at') and entry['scraped_at'] > scraped.get(name, ''):
+                scraped[name] = entry['scraped_at']
+            if entry.get('upload_date'):
+                uploads.setdefault(name, []).append(entry['upload_date'])
+
+        history = {}
+        for name, last_scraped in scraped.items():
+            dates = sorted(set(uploads.get(name, [])))[-HISTORY_EPISODES:]
+            rate = None
+            if len(dates) >= 2:
+                first, last = (datetime.strptime(d, '%Y%m%d') for d in (dates[0], dates[-1]))
+                rate = (len(dates) - 1) / max(1, (last - first).days)
+            history[name] = {'last_scraped': last_scraped, 'episodes_per_day': rate}
+        return history
+
+    def _state(self, podcast):
+        handle = normalize_handle(podcast['youtube_channel'])
+        state = self.channels.get(handle)
+        if state is None and podcast['name'] in self.history:
+            state = {**_new_state(), 'last_visit': self.history[podcast['name']]['last_scraped']}
+        return handle, state
+
+    def _has_rate(self, podcast):
+        _, state = self._state(podcast)
+        return ((state or {}).get('uploads_per_day') is not None
+                or self.history.get(podcast['name'], {}).get('episodes_per_day') is not None)
+
+    def yield_rate(self, state):
+        """Share of a channel's new uploads that end up saved."""
+        return (state['saved'] + YIELD_PRIOR / 2) / (state['examined'] + YIELD_PRIOR)
+
+    def estimate(self, podcast, now=None):
+        """
+        (expected new episodes, days since the last visit) for a channel;
+        expected is None for a channel never visited.
+        """
+        _, state = self._state(podcast)
+        if not state or not state['last_visit']:
+            return None, None
+        now = now or datetime.now()
+        days = max(0.0, (now - datetime.fromisoformat(state['last_visit'])).total_seconds() / 86400)
+        episodes_per_day = self.history.get(podcast['name'], {}).get('episodes_per_day')
+        if state['uploads_per_day'] is not None:
+            episodes_per_day = state['uploads_per_day'] * self.yield_rate(state)
+        elif episodes_per_day is None:
+            episodes_per_day = DEFAULT_UPLOADS_PER_DAY * self.yield_rate(state)
+        return episodes_per_day * min(days, MAX_GAP_DAYS), days
+
+    def plan(self, channels, target_total, max_per_show, request_budget=None, now=None):
+        """
+        Split the run's target between channels.
+
+        channels is [(genre, podcast)]. Returns (schedule, skipped): schedule
+        is [{'genre', 'podcast', 'episodes', 'expected'}] in visiting order,
+        genres interleaved; skipped lists podcasts not worth a visit yet.
+        With request_budget, slots also stop once the expected YouTube
+        requests (listing, metadata per upload looked at, transcript) run out.
+        """
+        now = now or datetime.now()
+        by_genre = {}
+        skipped = []
+        for genre, podcast in channels:
+            expected, days = self.estimate(podcast, now)
+            if expected is None:
+                want = max_per_show
+            else:
+                want = min(max_per_show, expected)
+                if want < MIN_EXPECTED:
+                    # Only skip a channel once its cadence has actually been measured
+                    if days < MAX_REVISIT_DAYS and self._has_rate(podcast):
+                        skipped.append({'name': podcast['name'], 'genre': genre, 'expected': round(expected, 2)})
+                        continue
+                    want = 1
+            _, state = self._state(podcast)
+            candidate = {
+                'genre': genre,
+                'podcast': podcast,
+                'episodes': 0,
+                'expected': None if expected is None else round(expected, 2),
+                '_want': max(1, math.ceil(want)),
+                '_cost': 1 + 1 / self.yield_rate(state or _new_state()),
+            }
+            by_genre.setdefault(genre, []).append(candidate)
+
+        # Round-robin over genres, most promising channel first within each;
+        # the starting genre rotates daily so ties don't always go the same way
+        genres = list(by_genre)
+        if genres:
+            start = now.toordinal() % len(genres)
+            genres = genres[start:] + genres[:start]
+        for genre in genres:
+            by_genre[genre].sort(key=lambda c: -(c['expected'] if c['expected'] is not None else max_per_show))
+        order = []
+        for i in range(max((len(v) for v in by_genre.values()), default=0)):
+            order.extend(by_genre[genre][i] for genre in genres if i < len(by_genre[genre]))
+
+        # Hand out one episode per channel per round: first up to what each
+        # channel is expected to have, then spare slots up to max_per_show
+        allocated = 0
+        requests = 0.0
+        for limit in ('_want', None):
+            progress = True
+            while progress and allocated < target_total:
+                progress = False
+                for candidate in order:
+                    cap = candidate[limit] if limit else max_per_show
+                    if candidate['episodes'] >= cap or allocated >= target_total:
+                        continue
+                    cost = candidate['_cost'] + (1 if candidate['episodes'] == 0 else 0)
+                    if request_budget is not None and requests + cost > request_budget:
+                        continue
+                    candidate['episodes'] += 1
+                    allocated += 1
+                    requests += cost
+                    progress = True
+
+        schedule = []
+        for candidate in order:
+            if candidate['episodes']:
+                schedule.append({k: v for k, v in candidate.items() if not k.startswith('_')})
+            else:
+                skipped.append({'name': candidate['podcast']['name'], 'genre': candidate['genre'],
+                                'expected': candidate['expected']})
+        return schedule, skipped
+
+    def record_visit(self, youtube_channel, listed, new, examined, saved, now=None):
+        """
+        Learn from one channel visit: `new` uploads we hadn't seen out of
+        `listed`, `examined` of them judged (clip filter, transcript), `saved` kept.
+        """
+        if not listed:
+            # Listing failed; nothing to learn
+            return
+        now = now or datetime.now()
+        handle = normalize_handle(youtube_channel)
+        with self._lock:
+            state = self.channels.setdefault(handle, _new_state())
+            if state['last_visit']:
+                days = max(MIN_GAP_DAYS, (now - datetime.fromisoformat(state['last_visit'])).total_seconds() / 86400)
+                observed = new / days
+                previous = state['uploads_per_day']
+                if previous is None:
+                    state['uploads_per_day'] = observed
+                elif new >= listed:
+                    # The listing window was all new, so this is only a lower bound
+                    state['uploads_per_day'] = max(previous, observed)
+                else:
+                    state['uploads_per_day'] = previous + RATE_SMOOTHING * (observed - previous)
+            state['visits'] += 1
+            state['last_visit'] = now.isoformat()
+            state['examined'] += examined
+            state['saved'] += saved
+            self._visited.add(handle)
+
+    def save(self):
+        """
+        Atomically write the scheduler state. Channels saved by other
+        processes in the meantime are kept; for a channel both visited, the
+        later visit wins.
+        """
+        with locked(self.path):
+            channels = self._read()
+            with self._lock:
+                for handle in self._visited:
+                    state = self.channels[handle]
+                    saved = channels.get(handle)
+                    if not saved or (saved.get('last_visit') or '') <= state['last_visit']:
+                        channels[handle] = state
+                self.channels = channels
+                data = {'channels': dict(channels), 'updated_at': datetime.now().isoformat()}
+
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+
+if __name__ == "__main__":
+    from scraper import PODCASTS_BY_GENRE
+    from dedup import plan_channels
+    from transcript_store import TranscriptStore
+
+    parser = argparse.ArgumentParser(description="Show the crawl plan for the next scrape")
+    parser.add_argument('--transcripts', default='./transcripts')
+    parser.add_argument('--target', type=int, default=500)
+    parser.add_argument('--max-per-show', type=int, default=None)
+    parser.add_argument('--request-budget', type=int, default=None)
+    args = parser.parse_args()
+
+    channels, _ = plan_channels(PODCASTS_BY_GENRE)
+    scheduler = CrawlScheduler(args.transcripts, store=TranscriptStore(args.transcripts))
+    max_per_show = args.max_per_show or max(10, args.target // len(channels))
+    schedule, skipped = scheduler.plan(channels, args.target, max_per_show, args.request_budget)
+
+    print(f"Plan for {sum(s['episodes'] for s in schedule)} episodes across {len(schedule)} channels "
+          f"({date.today().isoformat()}):")
+    for item in schedule:
+        expected = 'new channel' if item['expected'] is None else f"~{item['expected']} expected"
+        print(f"  {item['episodes']:3d}  {item['podcast']['name']} ({item['genre']}, {expected})")
+    if skipped:
+        print(f"Skipped {len(skipped)}: " + ', '.join(s['name'] for s in skipped))
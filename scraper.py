@@ -6,11 +6,37 @@ Target: 500 episodes for MVP
 
 import os
 import json
+import html
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 from datetime import datetime, timedelta
-from youtube_transcript_api import YouTubeTranscriptApi
-from yt_dlp import YoutubeDL
 import re
+from itertools import islice
+
+from client_pool import ClientPool
+from dedup import DuplicateIndex, minhash_signature, plan_channels
+from http_cache import ResponseCache
+from manifest import SeenManifest, TRANSIENT_REJECTIONS
+from metrics import Metrics
+from rate_limiter import HostRateLimiter
+from scheduler import CrawlScheduler
+from transcript_store import TranscriptStore, migrate_json_tree
+from work_queue import WorkQueue, default_worker_id
+
+
+# Stop paging a channel after this many consecutive already-seen uploads
+STOP_AFTER_SEEN = 3
+
+MANIFEST_FILENAME = 'manifest.json'
+
+# How often a show whose slots are all held by other shows' fetches checks again
+RESERVE_POLL_SECONDS = 0.05
+
+# Caption format fetched straight from a track URL: the timedtext XML the
+# transcript API itself downloads
+CAPTION_FORMAT = 'srv1'
+CAPTION_LANGUAGES = ['en']
 
 
 # Top 5 podcasts by genre from Apple Podcasts charts + Joe Rogan
@@ -89,44 +115,241 @@ PODCASTS_BY_GENRE = {
 }
 
 
+def caption_track(info, languages=CAPTION_LANGUAGES):
+    """
+    The caption track the transcript API would pick from yt-dlp's video info
+    (manual before auto-generated, first matching language), as
+    {'url', 'language', 'is_generated'}, or None if none is listed.
+    """
+    for field, is_generated in (('subtitles', False), ('automatic_captions', True)):
+        tracks = info.get(field) or {}
+        for language in languages:
+            # Auto captions also list machine translations; the original track is 'en' or 'en-orig'
+            for code in (language, f"{language}-orig"):
+                for fmt in tracks.get(code) or []:
+                    if fmt.get('ext') == CAPTION_FORMAT and fmt.get('url'):
+                        return {'url': fmt['url'], 'language': code, 'is_generated': is_generated}
+    return None
+
+
+def parse_timedtext(xml):
+    """Segments from a timedtext XML document, parsed as the transcript API parses it."""
+    from defusedxml import ElementTree
+
+    return [
+        {
+            'text': re.sub(r'<[^>]*>', '', html.unescape(element.text)),
+            'start': float(element.attrib['start']),
+            'duration': float(element.attrib.get('dur', '0.0')),
+        }
+        for element in ElementTree.fromstring(xml)
+        if element.text is not None
+    ]
+
+
+class EpisodeBudget:
+    """
+    Thread-safe episode counter with a hard cap.
+    Workers reserve a slot before fetching a transcript and release it if
+    the fetch fails, so the cap is never overshot by parallel workers.
+    A budget can be nested inside a parent (per-show inside the run total).
+    """
+
+    def __init__(self, limit, parent=None):
+        self.limit = limit
+        self.parent = parent
+        self.reserved = 0
+        self.saved = 0
+        self._lock = threading.Lock()
+
+    def exhausted(self):
+        with self._lock:
+            if self.reserved >= self.limit:
+                return True
+        return self.parent.exhausted() if self.parent else False
+
+    def full(self):
+        """True once the target is met by saved episodes; reservations may still be released."""
+        with self._lock:
+            if self.saved >= self.limit:
+                return True
+        return self.parent.full() if self.parent else False
+
+    def reserve(self):
+        with self._lock:
+            if self.reserved >= self.limit:
+                return False
+            if self.parent and not self.parent.reserve():
+                return False
+            self.reserved += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.reserved -= 1
+            if self.parent:
+                self.parent.release()
+
+    def commit(self):
+        with self._lock:
+            self.saved += 1
+            if self.parent:
+                self.parent.commit()
+            return self.saved
+
+
 class PodcastScraper:
-    def __init__(self, output_dir="./transcripts"):
+    def __init__(self, output_dir="./transcripts", channel_workers=4, episode_workers=4, host_rates=None,
+                 cache_dir="./.cache/http", cache_mode="readwrite", on_episode=None,
+                 ydl_class=None, transcript_api_class=None, metrics=None, work_queue=None):
         self.output_dir = output_dir
+        # Optional work_queue.WorkQueue: candidates become leased tasks, so a
+        # killed run resumes and several processes can share a scrape
+        self.work_queue = work_queue
+        # Request timings, errors and bytes written; events go to logs/scrape.jsonl
+        self.metrics = metrics or Metrics(log_path=os.path.join(output_dir, 'logs', 'scrape.jsonl'), stage='scrape')
+        # Swappable for the stand-ins in fake_youtube.py (benchmarks, offline runs).
+        # yt-dlp is only imported when it's actually used; it is slow to load
+        if ydl_class is None:
+            from yt_dlp import YoutubeDL as ydl_class
+        if transcript_api_class is None:
+            from youtube_transcript_api import YouTubeTranscriptApi as transcript_api_class
+        self.ydl_class = ydl_class
+        self.transcript_api_class = transcript_api_class
+        # Called with each saved episode dict, from the worker that saved it;
+        # a blocking callback slows scraping down (see pipeline.py)
+        self.on_episode = on_episode
         self.ydl_opts = {
             'quiet': True,
             'no_warnings': True,
             'extract_flat': False,
             'ignoreerrors': True,
         }
+        self.channel_workers = max(1, channel_workers)
+        self.episode_workers = max(1, episode_workers)
+        # Shared across all workers; replaces fixed sleeps between requests
+        self.rate_limiter = HostRateLimiter(host_rates, metrics=self.metrics)
+        # Long-lived clients, reused across videos instead of rebuilt per call
+        self.ydl_pool = ClientPool(
+            lambda key: self.ydl_class(dict(key)),
+            close=lambda ydl: ydl.__exit__(None, None, None),
+            metrics=self.metrics, name='youtube',
+        )
+        self.transcript_pool = ClientPool(
+            self._new_transcript_client,
+            close=lambda client: client[1].close(),
+            metrics=self.metrics, name='transcripts',
+        )
+        # Wraps every YouTube call; "replay" re-runs a recorded scrape offline
+        self.cache = ResponseCache(cache_dir, mode=cache_mode)
+        self.store = TranscriptStore(output_dir)
+        # Re-uploads of episodes we already have are linked, not stored
+        self.duplicates = DuplicateIndex(output_dir)
+        # Learns each channel's upload and yield rates to split the run's target
+        self.scheduler = CrawlScheduler(output_dir, store=self.store)
+        self.counters = {}
+        self._counters_lock = threading.Lock()
         os.makedirs(output_dir, exist_ok=True)
         
-    def get_channel_videos(self, channel_handle, max_videos=20, days_back=90):
+        # One-time import of transcripts saved as individual JSON files
+        if not len(self.store):
+            migrated = migrate_json_tree(output_dir, self.store)
+            if migrated:
+                print(f"Migrated {migrated} JSON transcripts into the shard store")
+        
+        manifest_path = os.path.join(output_dir, MANIFEST_FILENAME)
+        is_new_manifest = not os.path.exists(manifest_path)
+        self.manifest = SeenManifest(manifest_path)
+        if is_new_manifest:
+            seeded = self.manifest.bootstrap(self.store.entries())
+            if seeded:
+                print(f"Seeded manifest with {seeded} previously scraped videos")
+                self.manifest.save()
+    
+    def _extract_info(self, url, ydl_opts, consume=None, call='metadata'):
+        """
+        Run a yt-dlp extraction under the YouTube rate limit.
+        If `consume` is given, extraction is unprocessed (lazy playlist
+        entries) and consume(result) runs while the YoutubeDL is still open.
+        `call` labels the request in the metrics.
+        """
+        # Surface HTTP errors so the limiter can see 429s instead of yt-dlp
+        # swallowing them; callers already handle exceptions.
+        ydl_opts = {**ydl_opts, 'ignoreerrors': False}
+        
+        def extract():
+            with self.ydl_pool.client(tuple(sorted(ydl_opts.items()))) as ydl, \
+                    self.metrics.timer('request_seconds', call=call):
+                if consume is None:
+                    return ydl.extract_info(url, download=False)
+                return consume(ydl.extract_info(url, download=False, process=False))
+        
+        return self.rate_limiter.call('youtube', extract)
+    
+    def _new_transcript_client(self, _key):
+        """Transcript API client on its own keep-alive session. Returns (api, session)."""
+        import requests
+        
+        session = requests.Session()
+        return self.transcript_api_class(http_client=session), session
+    
+    def close(self):
+        """Close pooled clients and their connections."""
+        self.ydl_pool.close()
+        self.transcript_pool.close()
+    
+    def _count(self, key, n=1):
+        """Thread-safe increment of a run counter."""
+        with self._counters_lock:
+            self.counters[key] = self.counters.get(key, 0) + n
+        
+    def get_channel_videos(self, channel_handle, max_videos=20, days_back=90, stop_after_seen=None):
         """
         Get recent videos from a YouTube channel.
         Returns list of video IDs and metadata.
+        
+        Uploads are paged lazily, newest first. With `stop_after_seen`, paging
+        stops once that many consecutive uploads are already in the manifest.
         """
         channel_url = f"https://www.youtube.com/{channel_handle}/videos"
         
         ydl_opts = {
             **self.ydl_opts,
-            'playlistend': max_videos,
             'extract_flat': True,
         }
         
         videos = []
         
+        def collect(result):
+            # Start over if the rate limiter retries the listing
+            del videos[:]
+            if not result or 'entries' not in result:
+                return
+            seen_streak = 0
+            for entry in islice(result['entries'], max_videos):
+                if not entry:
+                    continue
+                videos.append({
+                    'id': entry.get('id'),
+                    'title': entry.get('title'),
+                    'url': entry.get('url'),
+                    'duration': entry.get('duration'),  # in seconds, may be missing
+                })
+                if stop_after_seen and entry.get('id'):
+                    if self.manifest.is_known(entry['id']):
+                        seen_streak += 1
+                        if seen_streak >= stop_after_seen:
+                            break
+                    else:
+                        seen_streak = 0
+        
+        def list_channel():
+            self._extract_info(channel_url, ydl_opts, consume=collect, call='channel_listing')
+            return videos
+        
         try:
-            with YoutubeDL(ydl_opts) as ydl:
-                result = ydl.extract_info(channel_url, download=False)
-                
-                if result and 'entries' in result:
-                    for entry in result['entries']:
-                        if entry:
-                            videos.append({
-                                'id': entry.get('id'),
-                                'title': entry.get('title'),
-                                'url': entry.get('url'),
-                            })
+            # Partial listings (errors part-way through paging) are not cached
+            videos = self.cache.get_or_fetch('channel', [channel_handle, max_videos], list_channel)
         except Exception as e:
             print(f"Error fetching channel {channel_handle}: {e}")
             
@@ -136,60 +359,74 @@ class PodcastScraper:
         """Get detailed metadata for a specific video."""
         url = f"https://www.youtube.com/watch?v={video_id}"
         
+        def fetch():
+            result = self._extract_info(url, self.ydl_opts)
+            return {
+                'id': video_id,
+                'title': result.get('title'),
+                'description': result.get('description'),
+                'duration': result.get('duration'),  # in seconds
+                'upload_date': result.get('upload_date'),
+                'view_count': result.get('view_count'),
+                'channel': result.get('channel'),
+                # Lets get_transcript download the captions in one request
+                'caption_track': caption_track(result),
+            }
+        
         try:
-            with YoutubeDL(self.ydl_opts) as ydl:
-                result = ydl.extract_info(url, download=False)
-                return {
-                    'id': video_id,
-                    'title': result.get('title'),
-                    'description': result.get('description'),
-                    'duration': result.get('duration'),  # in seconds
-                    'upload_date': result.get('upload_date'),
-                    'view_count': result.get('view_count'),
-                    'channel': result.get('channel'),
-                }
+            return self.cache.get_or_fetch('metadata', [video_id], fetch)
         except Exception as e:
             print(f"Error getting metadata for {video_id}: {e}")
             return None
     
-    def get_transcript(self, video_id):
+    def get_transcript(self, video_id, track=None):
         """
         Fetch transcript for a YouTube video.
         Tries manual captions first, falls back to auto-generated.
+        With the caption track from get_video_metadata this is a single
+        request; without one, or if the track URL has gone stale, the
+        tracks are listed first.
         """
-        try:
-            # New API requires instantiation
-            ytt_api = YouTubeTranscriptApi()
-            
-            # List available transcripts to check type
-            transcript_list = ytt_api.list(video_id)
-            
-            # Prefer manual transcripts
-            is_auto = True
-            try:
-                transcript = transcript_list.find_manually_created_transcript(['en'])
-                is_auto = False
-            except:
-                # Fall back to auto-generated
-                transcript = transcript_list.find_generated_transcript(['en'])
-            
-            # Fetch the actual transcript data
-            transcript_data = transcript.fetch()
-            
-            # Combine into full text (new API uses .text attribute)
-            full_text = ' '.join([entry.text for entry in transcript_data])
-            
-            # Convert to dict format for storage
-            segments = [{'text': entry.text, 'start': entry.start, 'duration': entry.duration} 
-                       for entry in transcript_data]
+        def fetch_track():
+            with self.transcript_pool.client() as (_, session), \
+                    self.metrics.timer('request_seconds', call='transcript_fetch'):
+                response = session.get(track['url'], timeout=30)
+                response.raise_for_status()
+            segments = parse_timedtext(response.text)
+            if not segments:
+                # Expired or token-gated URLs come back empty rather than failing
+                raise ValueError("Caption track returned no captions")
+            return segments, track['is_generated']
+        
+        def fetch_listed():
+            # fetch() lists the tracks and downloads the preferred English one
+            # (manual before auto-generated) over the client's open connection
+            with self.transcript_pool.client() as (ytt_api, _), \
+                    self.metrics.timer('request_seconds', call='transcript_list_fetch'):
+                transcript = ytt_api.fetch(video_id, languages=CAPTION_LANGUAGES)
+            segments = [{'text': entry.text, 'start': entry.start, 'duration': entry.duration}
+                        for entry in transcript]
+            return segments, transcript.is_generated
+        
+        def fetch_and_convert():
+            segments = None
+            if track:
+                try:
+                    segments, is_auto = self.rate_limiter.call('transcripts', fetch_track)
+                except Exception as e:
+                    self.metrics.inc('transcript_fallbacks_total', reason=type(e).__name__)
+            if segments is None:
+                segments, is_auto = self.rate_limiter.call('transcripts', fetch_listed)
             
             return {
                 'success': True,
-                'transcript': full_text,
+                'transcript': ' '.join(segment['text'] for segment in segments),
                 'segments': segments,
                 'is_auto_generated': is_auto,
             }
-            
+        
+        try:
+            return self.cache.get_or_fetch('transcript', [video_id], fetch_and_convert)
         except Exception as e:
             return {
                 'success': False,
@@ -222,87 +459,190 @@ class PodcastScraper:
                 
         return True
     
-    def scrape_podcast(self, podcast_name, youtube_channel, genre, episodes_per_show=10):
+    def prefilter_videos(self, videos):
+        """
+        Apply is_podcast_episode to flat playlist entries.
+        Entries without a title or duration can't be judged yet and are kept.
+        Rejections are transient, so they're judged again on a later run.
+        """
+        survivors = []
+        for video in videos:
+            if self.is_podcast_episode(video.get('title'), video.get('duration')):
+                survivors.append(video)
+            else:
+                self.manifest.mark_rejected(video['id'], 'not_episode_listing')
+        
+        self._count('metadata_fetches_saved', len(videos) - len(survivors))
+        return survivors
+    
+    def scrape_podcast(self, podcast_name, youtube_channel, genre, episodes_per_show=10, budget=None):
         """
         Scrape transcripts for a single podcast.
+        Candidate videos are processed by up to `episode_workers` threads.
+        `budget` is an optional run-wide EpisodeBudget shared across podcasts.
         """
+        started = time.monotonic()
         print(f"\n{'='*60}")
         print(f"Scraping: {podcast_name}")
         print(f"Channel: {youtube_channel}")
         print(f"{'='*60}")
         
-        # Create directory for this podcast
-        podcast_dir = os.path.join(self.output_dir, genre, self._sanitize_filename(podcast_name))
-        os.makedirs(podcast_dir, exist_ok=True)
-        
         # Get recent videos
-        videos = self.get_channel_videos(youtube_channel, max_videos=episodes_per_show * 3)
-        print(f"Found {len(videos)} videos")
+        videos = self.get_channel_videos(
+            youtube_channel,
+            max_videos=episodes_per_show * 3,
+            stop_after_seen=STOP_AFTER_SEEN,
+        )
+        listed = len(videos)
         
-        episodes_saved = 0
+        # Skip anything saved or rejected on a previous run before any network call
+        videos = self.manifest.filter_new(videos)
+        new = len(videos)
         
-        for video in videos:
-            if episodes_saved >= episodes_per_show:
-                break
+        # Drop clips and shorts using the title/duration already in the flat
+        # listing, so full metadata is only extracted for likely episodes
+        videos = self.prefilter_videos(videos)
+        print(f"Found {listed} videos ({new} new, {len(videos)} likely episodes)")
+        
+        show_budget = EpisodeBudget(episodes_per_show, parent=budget)
+        
+        with ThreadPoolExecutor(max_workers=self.episode_workers) as pool:
+            pending = set()
+            for video in videos:
+                if not video['id']:
+                    continue
                 
-            video_id = video['id']
-            if not video_id:
-                continue
-            
-            # Get detailed metadata
-            metadata = self.get_video_metadata(video_id)
-            if not metadata:
-                continue
-            
-            # Check if it's a real episode (not a clip)
-            if not self.is_podcast_episode(metadata['title'], metadata.get('duration')):
-                print(f"  Skipping (not full episode): {metadata['title'][:50]}...")
-                continue
-            
-            # Get transcript
-            print(f"  Fetching: {metadata['title'][:50]}...")
-            transcript_result = self.get_transcript(video_id)
-            
-            if not transcript_result['success']:
-                print(f"    No transcript available: {transcript_result.get('error', 'Unknown error')}")
-                continue
-            
-            # Save episode data
-            episode_data = {
-                'podcast_name': podcast_name,
-                'genre': genre,
-                'video_id': video_id,
-                'title': metadata['title'],
-                'description': metadata.get('description', ''),
-                'duration_seconds': metadata.get('duration'),
-                'upload_date': metadata.get('upload_date'),
-                'view_count': metadata.get('view_count'),
-                'transcript': transcript_result['transcript'],
-                'is_auto_generated': transcript_result['is_auto_generated'],
-                'youtube_url': f"https://youtube.com/watch?v={video_id}",
-                'scraped_at': datetime.now().isoformat(),
-            }
-            
-            # Save to file
-            filename = f"{metadata.get('upload_date', 'unknown')}_{self._sanitize_filename(metadata['title'][:50])}.json"
-            filepath = os.path.join(podcast_dir, filename)
-            
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(episode_data, f, indent=2, ensure_ascii=False)
-            
-            episodes_saved += 1
-            print(f"    Saved! ({episodes_saved}/{episodes_per_show})")
-            
-            # Be nice to YouTube
-            time.sleep(1)
+                # Keep at most `episode_workers` candidates in flight so we
+                # don't fetch metadata for videos we'll never need. While every
+                # slot is reserved, wait: a fetch that fails gives its slot back.
+                while not show_budget.full():
+                    if len(pending) < self.episode_workers and not show_budget.exhausted():
+                        break
+                    if pending:
+                        _, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    else:
+                        # The run-wide slots are held by other shows' fetches
+                        time.sleep(RESERVE_POLL_SECONDS)
+                if show_budget.full():
+                    break
+                
+                pending.add(pool.submit(
+                    self._scrape_episode, video['id'], podcast_name, genre, show_budget
+                ))
+            wait(pending)
+        
+        self.manifest.save()
+        rejected = self.counters.get(('rejected', podcast_name), 0)
+        self.scheduler.record_visit(youtube_channel, listed, new,
+                                    examined=(new - len(videos)) + rejected + show_budget.saved,
+                                    saved=show_budget.saved)
+        self.metrics.event('podcast_done', podcast=podcast_name, channel=youtube_channel, listed=listed,
+                           new=new, candidates=len(videos), saved=show_budget.saved,
+                           seconds=round(time.monotonic() - started, 2))
+        return show_budget.saved
+    
+    def _scrape_episode(self, video_id, podcast_name, genre, show_budget):
+        """Fetch and save one candidate video. Returns True if it was saved."""
+        # Get detailed metadata
+        metadata = self.get_video_metadata(video_id)
+        if not metadata:
+            return False
+        
+        # Check if it's a real episode (not a clip)
+        if not self.is_podcast_episode(metadata['title'], metadata.get('duration')):
+            print(f"  Skipping (not full episode): {metadata['title'][:50]}...")
+            self.manifest.mark_rejected(video_id, 'not_episode')
+            self._rejected(video_id, podcast_name, 'not_episode')
+            return False
+        
+        # Claim a slot before the transcript fetch so parallel workers
+        # can't overshoot the per-show or run-wide targets
+        if not show_budget.reserve():
+            return False
+        
+        # Get transcript
+        print(f"  Fetching: {metadata['title'][:50]}...")
+        transcript_result = self.get_transcript(video_id, metadata.get('caption_track'))
+        
+        if not transcript_result['success']:
+            print(f"    No transcript available: {transcript_result.get('error', 'Unknown error')}")
+            self.manifest.mark_rejected(video_id, 'no_transcript')
+            self._rejected(video_id, podcast_name, 'no_transcript', error=transcript_result.get('error'))
+            show_budget.release()
+            return False
+        
+        # Looked up only: the episode becomes canonical once it's actually stored
+        signature = minhash_signature(transcript_result['transcript'])
+        canonical = self.duplicates.find(video_id, transcript_result['transcript'], signature)
+        if canonical:
+            self.duplicates.add(video_id, transcript_result['transcript'], signature)
+            print(f"    Duplicate of {canonical}, not saving")
+            self.manifest.mark_rejected(video_id, 'duplicate')
+            self._rejected(video_id, podcast_name, 'duplicate', duplicate_of=canonical)
+            show_budget.release()
+            return False
         
-        return episodes_saved
+        # Save episode data
+        episode_data = {
+            'podcast_name': podcast_name,
+            'genre': genre,
+            'video_id': video_id,
+            'title': metadata['title'],
+            'description': metadata.get('description', ''),
+            'duration_seconds': metadata.get('duration'),
+            'upload_date': metadata.get('upload_date'),
+            'view_count': metadata.get('view_count'),
+            'transcript': transcript_result['transcript'],
+            'segments': transcript_result['segments'],
+            'is_auto_generated': transcript_result['is_auto_generated'],
+            'youtube_url': f"https://youtube.com/watch?v={video_id}",
+            'scraped_at': datetime.now().isoformat(),
+        }
+        
+        # Append to the shard store
+        try:
+            entry = self.store.put(episode_data)
+            canonical = self.duplicates.add(video_id, transcript_result['transcript'], signature)
+        except Exception:
+            show_budget.release()
+            raise
+        if canonical:
+            # Another worker stored a copy in the meantime; this one stays
+            # stored but is marked a duplicate, so it isn't summarized twice
+            # or counted towards the targets
+            print(f"    Duplicate of {canonical} (saved concurrently)")
+            self.manifest.mark_rejected(video_id, 'duplicate')
+            self._rejected(video_id, podcast_name, 'duplicate', duplicate_of=canonical)
+            show_budget.release()
+            return False
+        
+        saved = show_budget.commit()
+        self._count(('saved', podcast_name))
+        self.manifest.mark_scraped(video_id, podcast_name)
+        self.metrics.inc('episodes_total', outcome='saved')
+        self.metrics.inc('bytes_written_total', entry['length'], kind='transcript')
+        self.metrics.event('episode_saved', video_id=video_id, podcast=podcast_name,
+                           transcript_chars=entry['transcript_chars'], bytes=entry['length'])
+        print(f"    Saved! ({saved}/{show_budget.limit}) {podcast_name}")
+        if self.on_episode:
+            self.on_episode(episode_data)
+        return True
+    
+    def _rejected(self, video_id, podcast_name, reason, **fields):
+        self._count(('rejected', podcast_name))
+        self.metrics.inc('episodes_total', outcome=reason)
+        self.metrics.event('episode_rejected', video_id=video_id, podcast=podcast_name, reason=reason, **fields)
     
-    def scrape_all(self, episodes_per_show=10, target_total=500):
+    def scrape_all(self, episodes_per_show=10, target_total=500, request_budget=None):
         """
         Scrape all podcasts across all genres.
+        The scheduler splits `target_total` between channels by how many new
+        episodes each is likely to have (at most `episodes_per_show`, or an
+        even share if larger), optionally within `request_budget` YouTube
+        requests. Up to `channel_workers` podcasts are scraped at once; the
+        shared episode budget keeps the total at exactly `target_total` or fewer.
         """
-        total_episodes = 0
+        started = time.monotonic()
         stats = {
             'by_genre': {},
             'by_podcast': {},
@@ -310,71 +650,290 @@ class PodcastScraper:
             'started_at': datetime.now().isoformat(),
         }
         
-        # Calculate episodes per show to hit target
-        total_podcasts = sum(len(podcasts) for podcasts in PODCASTS_BY_GENRE.values())
-        episodes_per = max(5, target_total // total_podcasts)
+        # A channel listed under two genres is only scraped once
+        plan, duplicate_channels = plan_channels(PODCASTS_BY_GENRE)
+        stats['duplicate_channels'] = duplicate_channels
+        for duplicate in duplicate_channels:
+            print(f"Skipping {duplicate['name']} ({duplicate['genre']}): same channel as "
+                  f"{duplicate['duplicate_of']} ({duplicate['duplicate_of_genre']})")
+        
+        # Spend the target where new episodes are most likely
+        total_podcasts = len(plan)
+        max_per_show = max(episodes_per_show, target_total // total_podcasts)
+        schedule, not_due = self.scheduler.plan(plan, target_total, max_per_show, request_budget)
+        stats['schedule'] = {
+            'episodes': {item['podcast']['name']: item['episodes'] for item in schedule},
+            'skipped': not_due,
+        }
         
         print(f"\n{'='*60}")
         print(f"PODICALS SCRAPER")
         print(f"{'='*60}")
-        print(f"Podcasts: {total_podcasts}")
-        print(f"Target: {target_total} episodes ({episodes_per} per show)")
+        print(f"Podcasts: {len(schedule)} of {total_podcasts} scheduled ({len(not_due)} not due)")
+        print(f"Target: {target_total} episodes (up to {max_per_show} per show)")
+        print(f"Workers: {self.channel_workers} channels x {self.episode_workers} episodes")
         print(f"Output: {self.output_dir}")
         print(f"{'='*60}\n")
         
-        for genre, podcasts in PODCASTS_BY_GENRE.items():
-            stats['by_genre'][genre] = 0
-            print(f"\n>>> GENRE: {genre.upper()}")
-            
-            for podcast in podcasts:
-                if total_episodes >= target_total:
-                    break
-                    
-                try:
-                    count = self.scrape_podcast(
-                        podcast['name'],
-                        podcast['youtube_channel'],
-                        genre,
-                        episodes_per_show=episodes_per
-                    )
-                    
-                    stats['by_podcast'][podcast['name']] = count
-                    stats['by_genre'][genre] += count
-                    total_episodes += count
-                    
-                except Exception as e:
-                    print(f"Error scraping {podcast['name']}: {e}")
-                    stats['by_podcast'][podcast['name']] = 0
-                
-                # Pause between podcasts
-                time.sleep(2)
-            
-            if total_episodes >= target_total:
-                break
+        budget = EpisodeBudget(target_total)
+        self.counters = {}
+        
+        if self.work_queue:
+            self._scrape_from_queue(schedule, budget, stats)
+        else:
+            self._scrape_plan(schedule, budget, stats)
         
-        stats['total'] = total_episodes
+        self.manifest.save()
+        self.scheduler.save()
+        
+        stats['total'] = budget.saved
+        stats['skipped_known'] = self.manifest.skipped
+        stats['metadata_fetches_saved'] = self.counters.get('metadata_fetches_saved', 0)
+        stats['duplicate_episodes'] = list(self.duplicates.found)
+        stats['rate_limits'] = self.rate_limiter.stats()
+        stats['cache'] = self.cache.stats()
+        stats['clients'] = {'youtube': self.ydl_pool.stats(), 'transcripts': self.transcript_pool.stats()}
+        self.close()
         stats['completed_at'] = datetime.now().isoformat()
         
+        # Where the time went: request latency per call type (summed across
+        # workers, so it can exceed the wall time) and rate-limit sleeps
+        stats['latency_breakdown'] = {
+            'elapsed_seconds': round(time.monotonic() - started, 2),
+            'requests': self.metrics.breakdown('request_seconds'),
+            'rate_limit_wait_seconds': {
+                host: round(seconds, 2)
+                for host, seconds in self.metrics.counter_totals('rate_limit_wait_seconds_total', 'host').items()
+            },
+        }
+        stats['errors'] = self.metrics.counter_totals('errors_total', 'type')
+        stats['retries'] = self.metrics.counter_totals('retries_total', 'host')
+        stats['bytes_written'] = self.metrics.counter_totals('bytes_written_total', 'kind')
+        
         # Save stats
         stats_path = os.path.join(self.output_dir, 'scrape_stats.json')
         with open(stats_path, 'w') as f:
             json.dump(stats, f, indent=2)
+        metrics_path = self.metrics.write_prometheus(os.path.join(self.output_dir, 'scrape_metrics.prom'))
+        self.metrics.event('scrape_done', total=stats['total'], **stats['latency_breakdown'])
         
         print(f"\n{'='*60}")
         print(f"SCRAPING COMPLETE")
-        print(f"Total episodes: {total_episodes}")
-        print(f"Stats saved to: {stats_path}")
+        print(f"Total episodes: {stats['total']}")
+        print(f"Skipped (already seen): {stats['skipped_known']}")
+        print(f"Metadata fetches saved by pre-filter: {stats['metadata_fetches_saved']}")
+        print(f"Duplicates skipped: {len(duplicate_channels)} channels, {len(stats['duplicate_episodes'])} episodes")
+        for call, timing in sorted(stats['latency_breakdown']['requests'].items()):
+            print(f"  {call}: {timing['count']} requests, {timing['total_seconds']:.0f}s total, "
+                  f"p95 {timing['p95_seconds']}s")
+        for host, seconds in sorted(stats['latency_breakdown']['rate_limit_wait_seconds'].items()):
+            print(f"  waiting on {host} rate limit: {seconds:.0f}s")
+        for pool, client_stats in stats['clients'].items():
+            if client_stats['created']:
+                print(f"  {pool} clients: {client_stats['created']} created, "
+                      f"{100 * client_stats['reuse_rate']:.0f}% of calls reused one, "
+                      f"{client_stats['avg_setup_seconds']}s avg setup, "
+                      f"{client_stats['discarded']} discarded after errors")
+        if stats['errors']:
+            print(f"Errors: {', '.join(f'{k} {v}' for k, v in sorted(stats['errors'].items()))}")
+        print(f"Stats saved to: {stats_path} (metrics: {metrics_path})")
         print(f"{'='*60}")
         
         return stats
     
+    def _scrape_plan(self, schedule, budget, stats):
+        """Scrape each scheduled podcast, in order, in a pool of `channel_workers` threads."""
+        with ThreadPoolExecutor(max_workers=self.channel_workers) as pool:
+            futures = {}
+            for genre in PODCASTS_BY_GENRE:
+                stats['by_genre'][genre] = 0
+            for item in schedule:
+                genre, podcast = item['genre'], item['podcast']
+                future = pool.submit(self._scrape_podcast_task, podcast, genre, item['episodes'], budget)
+                futures[future] = (genre, podcast)
+            
+            # Stats are only touched from this thread, so counts stay exact
+            for future in as_completed(futures):
+                genre, podcast = futures[future]
+                count, error = future.result()
+                
+                if error:
+                    print(f"Error scraping {podcast['name']}: {error}")
+                if count is None:
+                    # Target was reached before this podcast started
+                    continue
+                
+                stats['by_podcast'][podcast['name']] = count
+                stats['by_genre'][genre] += count
+    
+    def _scrape_from_queue(self, schedule, budget, stats):
+        """
+        Queue-backed scrape: list every channel into 'scrape' tasks, then
+        drain the queue with leased workers. Tasks left over from a killed
+        run (or listed by another process) are picked up as well.
+        """
+        genres = {item['podcast']['name']: item['genre'] for item in schedule}
+        show_budgets = {
+            item['podcast']['name']: EpisodeBudget(item['episodes'], parent=budget) for item in schedule
+        }
+        budgets_lock = threading.Lock()
+        
+        def show_budget_for(podcast_name):
+            # Tasks left by an earlier run may be for a show not scheduled today
+            with budgets_lock:
+                if podcast_name not in show_budgets:
+                    show_budgets[podcast_name] = EpisodeBudget(0, parent=budget)
+                return show_budgets[podcast_name]
+        
+        listings = {}
+        with ThreadPoolExecutor(max_workers=self.channel_workers) as pool:
+            futures = {
+                pool.submit(self._queue_candidates, item['genre'], item['podcast'], item['episodes']): item['podcast']
+                for item in schedule
+            }
+            queued = 0
+            for future in as_completed(futures):
+                podcast = futures[future]
+                try:
+                    listings[podcast['name']] = future.result()
+                    queued += listings[podcast['name']]['queued']
+                except Exception as e:
+                    print(f"Error listing {podcast['name']}: {e}")
+        print(f"\nQueued {queued} new candidates; task counts: {self.work_queue.task_counts().get('scrape', {})}")
+        
+        workers = self.channel_workers * self.episode_workers
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for future in [pool.submit(self._scrape_worker, budget, show_budget_for) for _ in range(workers)]:
+                future.result()
+        
+        for item in schedule:
+            podcast = item['podcast']
+            listing = listings.get(podcast['name'])
+            if listing:
+                saved = show_budgets[podcast['name']].saved
+                rejected = self.counters.get(('rejected', podcast['name']), 0)
+                self.scheduler.record_visit(podcast['youtube_channel'], listing['listed'], listing['new'],
+                                            examined=(listing['new'] - listing['candidates']) + rejected + saved,
+                                            saved=saved)
+        
+        for genre in PODCASTS_BY_GENRE:
+            stats['by_genre'][genre] = 0
+        for podcast_name, show_budget in show_budgets.items():
+            if show_budget.saved:
+                stats['by_podcast'][podcast_name] = show_budget.saved
+                genre = genres.get(podcast_name)
+                if genre:
+                    stats['by_genre'][genre] += show_budget.saved
+    
+    def _queue_candidates(self, genre, podcast, episodes_per_show):
+        """List one channel and enqueue its likely episodes. Returns listing counts."""
+        videos = self.get_channel_videos(
+            podcast['youtube_channel'],
+            max_videos=episodes_per_show * 3,
+            stop_after_seen=STOP_AFTER_SEEN,
+        )
+        listed = len(videos)
+        videos = self.manifest.filter_new(videos)
+        new = len(videos)
+        videos = self.prefilter_videos(videos)
+        queued = 0
+        for video in videos:
+            payload = {'podcast_name': podcast['name'], 'genre': genre, 'title': video.get('title')}
+            if self.work_queue.enqueue('scrape', video['id'], payload):
+                self.work_queue.set_status(video['id'], 'listed', podcast['name'], genre, video.get('title'))
+                queued += 1
+        print(f"Listed {podcast['name']}: {len(videos)} likely episodes, {queued} newly queued")
+        return {'listed': listed, 'new': new, 'candidates': len(videos), 'queued': queued}
+    
+    def _scrape_worker(self, budget, show_budget_for):
+        """Claim and scrape 'scrape' tasks until the queue or the run target runs out."""
+        queue = self.work_queue
+        worker_id = default_worker_id()
+        try:
+            while not budget.exhausted():
+                tasks = queue.claim('scrape', worker_id)
+                if not tasks:
+                    return
+                task = tasks[0]
+                video_id = task['key']
+                payload = task['payload']
+                podcast_name = payload.get('podcast_name')
+                show_budget = show_budget_for(podcast_name)
+                
+                if video_id in self.manifest.scraped:
+                    # Saved by a run that died before completing the task
+                    queue.set_status(video_id, 'scraped')
+                    queue.complete(task)
+                    continue
+                if show_budget.exhausted():
+                    # Left for a later run; the next listing re-arms it
+                    queue.skip(task, 'show budget reached')
+                    continue
+                
+                try:
+                    with queue.lease(task):
+                        saved = self._scrape_episode(video_id, podcast_name, payload.get('genre'), show_budget)
+                except Exception as e:
+                    queue.fail(task, e)
+                    continue
+                
+                if saved:
+                    queue.set_status(video_id, 'scraped')
+                    queue.complete(task)
+                elif video_id in self.manifest.rejected:
+                    reason = self.manifest.rejected[video_id]['reason']
+                    queue.set_status(video_id, 'rejected', detail=reason)
+                    if reason in TRANSIENT_REJECTIONS:
+                        # Re-armed when the manifest lets the video be listed again
+                        queue.skip(task, reason)
+                    else:
+                        queue.complete(task)
+                elif show_budget.exhausted():
+                    queue.skip(task, 'show budget reached')
+                else:
+                    # Metadata fetch failed; try again after a backoff
+                    queue.fail(task, 'metadata unavailable')
+        finally:
+            self.manifest.save()
+            queue.close()
+    
+    def _scrape_podcast_task(self, podcast, genre, episodes_per_show, budget):
+        """
+        Worker entry point for scrape_all. Returns (episodes saved, error).
+        The count is None if the target was already hit before starting, and
+        still reflects episodes saved before an error part-way through.
+        """
+        if budget.full():
+            return None, None
+        # scrape_podcast nests its per-show budget in the run-wide one; the
+        # counter still has the episodes saved if it fails part-way through
+        key = ('saved', podcast['name'])
+        before = self.counters.get(key, 0)
+        try:
+            self.scrape_podcast(
+                podcast['name'],
+                podcast['youtube_channel'],
+                genre,
+                episodes_per_show=episodes_per_show,
+                budget=budget,
+            )
+        except Exception as e:
+            return self.counters.get(key, 0) - before, e
+        return self.counters.get(key, 0) - before, None
+    
     def _sanitize_filename(self, name):
         """Remove invalid characters from filename."""
         return re.sub(r'[<>:"/\\|?*]', '', name).strip()
 
 
 if __name__ == "__main__":
-    scraper = PodcastScraper(output_dir="./transcripts")
+    # PODICALS_CACHE_MODE=replay re-runs a recorded scrape without network
+    scraper = PodcastScraper(
+        output_dir="./transcripts",
+        cache_mode=os.environ.get('PODICALS_CACHE_MODE', 'readwrite'),
+        # PODICALS_QUEUE_DB=./data/work_queue.db makes the run resumable
+        work_queue=WorkQueue(os.environ['PODICALS_QUEUE_DB']) if os.environ.get('PODICALS_QUEUE_DB') else None,
+    )
     
     # Scrape target of 500 episodes
     stats = scraper.scrape_all(target_total=500)
@@ -0,0 +1,541 @@
+"""
+Podicals - Search Index
+Full-text search over summaries (and optionally transcripts): an inverted
+index with BM25 scoring and positional postings for "phrase queries".
+
+The index is a set of immutable segment files, Lucene style. New or changed
+episodes go into a new segment and replaced ones are marked deleted, so an
+update only costs the new documents. Segments are merged once there are
+too many. Postings are varint delta-encoded:
+
+    <root>/state.json              segments, live documents, tombstones
+    <root>/seg-NNNNN.idx           header | term dictionary | doc table | postings
+    <root>/seg-NNNNN.web.json      where the segment's website shards were written
+
+    python search_index.py query "market crash" --limit 5
+    python search_index.py query '"machine learning" startups' --transcripts
+"""
+
+import os
+import re
+import json
+import math
+import mmap
+import zlib
+import heapq
+import shutil
+import struct
+import hashlib
+import argparse
+import functools
+import threading
+from collections import defaultdict
+
+
+SEGMENT_MAGIC = b'PSIX'
+SEGMENT_VERSION = 1
+# magic, version, dictionary bytes, doc table bytes, postings bytes
+SEGMENT_HEADER = struct.Struct('<4sBIII')
+STATE_FILENAME = 'state.json'
+
+# New documents are written in segments of at most this many
+SEGMENT_BATCH_DOCS = 1000
+# Past this many segments, the smaller ones are merged
+MAX_SEGMENTS = 8
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+PHRASE_RE = re.compile(r'"([^"]+)"')
+
+# Website shards group terms by their first characters
+WEB_PREFIX_CHARS = 2
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or '').lower())
+
+
+def parse_query(query):
+    """Split a query into (phrases, loose terms); phrases are token lists."""
+    phrases = [tokenize(p) for p in PHRASE_RE.findall(query)]
+    phrases = [p for p in phrases if p]
+    terms = tokenize(PHRASE_RE.sub(' ', query))
+    return phrases, terms
+
+
+def encode_varints(values):
+    out = bytearray()
+    for value in values:
+        while value >= 0x80:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+    return bytes(out)
+
+
+def decode_varints(data):
+    values = []
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            values.append(value)
+            value = shift = 0
+    return values
+
+
+def invert(docs):
+    """(term, [(doc, positions)]) pairs in term order for a list of token lists."""
+    postings = defaultdict(list)
+    for doc, tokens in enumerate(docs):
+        positions = defaultdict(list)
+        for pos, token in enumerate(tokens):
+            positions[token].append(pos)
+        for term, where in positions.items():
+            postings[term].append((doc, where))
+    return sorted(postings.items())
+
+
+def write_segment(path, doc_table, term_postings):
+    """
+    Write a segment file. doc_table rows are [video_id, title, podcast,
+    length]; term_postings yields (term, [(doc, positions)]) in term order.
+    Postings are streamed to disk, so merges never hold the whole index.
+    """
+    dictionary = []
+    postings_path = f"{path}.postings"
+    offset = 0
+    with open(postings_path, 'wb') as blob:
+        for term, postings in term_postings:
+            doc_values, pos_values = [], []
+            last_doc = 0
+            for doc, where in postings:
+                doc_values += [doc - last_doc, len(where)]
+                last_doc = doc
+                last_pos = 0
+                for pos in where:
+                    pos_values.append(pos - last_pos)
+                    last_pos = pos
+            doc_block = encode_varints(doc_values)
+            pos_block = encode_varints(pos_values)
+            dictionary.append([term, len(postings), offset, len(doc_block), offset + len(doc_block), len(pos_block)])
+            blob.write(doc_block)
+            blob.write(pos_block)
+            offset += len(doc_block) + len(pos_block)
+
+    dict_bytes = zlib.compress(json.dumps(dictionary, ensure_ascii=False).encode('utf-8'), 6)
+    docs_bytes = zlib.compress(json.dumps(doc_table, ensure_ascii=False).encode('utf-8'), 6)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f, open(postings_path, 'rb') as blob:
+        f.write(SEGMENT_HEADER.pack(SEGMENT_MAGIC, SEGMENT_VERSION, len(dict_bytes), len(docs_bytes), offset))
+        f.write(dict_bytes)
+        f.write(docs_bytes)
+        shutil.copyfileobj(blob, f)
+    os.remove(postings_path)
+    os.replace(tmp_path, path)
+
+
+class Segment:
+    """Read-only view of one segment file. Postings are decoded on demand from an mmap."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, dict_len, docs_len, _ = SEGMENT_HEADER.unpack_from(self._map)
+        if magic != SEGMENT_MAGIC or version != SEGMENT_VERSION:
+            raise ValueError(f"Not a search segment: {path}")
+
+        pos = SEGMENT_HEADER.size
+        dictionary = json.loads(zlib.decompress(self._map[pos:pos + dict_len]))
+        pos += dict_len
+        self.docs = json.loads(zlib.decompress(self._map[pos:pos + docs_len]))
+        self._base = pos + docs_len
+        # term -> (doc freq, docs offset, docs length, positions offset, positions length)
+        self.terms = {row[0]: tuple(row[1:]) for row in dictionary}
+        # Segments are immutable, so decoded postings can be reused across queries
+        self.postings = functools.lru_cache(maxsize=4096)(self._postings)
+        self.positions = functools.lru_cache(maxsize=512)(self._positions)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def doc_freq(self, term):
+        entry = self.terms.get(term)
+        return entry[0] if entry else 0
+
+    def _postings(self, term):
+        """[(doc, tf)] for a term."""
+        entry = self.terms.get(term)
+        if not entry:
+            return []
+        start = self._base + entry[1]
+        values = decode_varints(self._map[start:start + entry[2]])
+        result = []
+        doc = 0
+        for i in range(0, len(values), 2):
+            doc += values[i]
+            result.append((doc, values[i + 1]))
+        return result
+
+    def _positions(self, term):
+        """{doc: [positions]} for a term."""
+        entry = self.terms.get(term)
+        if not entry:
+            return {}
+        start = self._base + entry[3]
+        deltas = decode_varints(self._map[start:start + entry[4]])
+        result = {}
+        i = 0
+        for doc, tf in self.postings(term):
+            pos = 0
+            where = []
+            for delta in deltas[i:i + tf]:
+                pos += delta
+                where.append(pos)
+            result[doc] = where
+            i += tf
+        return result
+
+
+class SearchIndex:
+    """
+    Incrementally updated BM25 index.
+
+        index = SearchIndex('./data/.export/search/summaries')
+        index.update([{'id': vid, 'sha': digest, 'title': ..., 'podcast': ..., 'text': ...}])
+        index.search('"index funds" fees', limit=10)
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.state_path = os.path.join(root, STATE_FILENAME)
+        self._lock = threading.Lock()
+        self.segments = {}
+        # video_id -> [segment name, local doc, sha]
+        self.live = {}
+        self.deleted = {}
+        self.next_segment = 1
+        # (live docs, average length), recomputed after changes
+        self._stats = None
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.state_path):
+            return
+        with open(self.state_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        self.live = state['live']
+        self.next_segment = state['next_segment']
+        self.deleted = {name: set(docs) for name, docs in state['deleted'].items()}
+        for name in state['segments']:
+            self.segments[name] = Segment(os.path.join(self.root, name))
+
+    def _save(self):
+        state = {
+            'segments': sorted(self.segments),
+            'next_segment': self.next_segment,
+            'live': self.live,
+            'deleted': {name: sorted(docs) for name, docs in self.deleted.items() if docs},
+        }
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp_path, self.state_path)
+
+    def __len__(self):
+        return len(self.live)
+
+    def close(self):
+        for segment in self.segments.values():
+            segment.close()
+
+    def _delete(self, video_id):
+        self._stats = None
+        location = self.live.pop(video_id, None)
+        if location:
+            self.deleted.setdefault(location[0], set()).add(location[1])
+
+    def update(self, docs=(), removed=()):
+        """
+        Index new or changed docs (an iterable of dicts with id, sha, title,
+        podcast, text) and drop removed video_ids. Docs whose sha matches the
+        indexed version are skipped. Returns the number of documents indexed.
+        """
+        with self._lock:
+            os.makedirs(self.root, exist_ok=True)
+            for video_id in removed:
+                self._delete(video_id)
+
+            indexed = 0
+            batch = {}
+            for doc in docs:
+                current = self.live.get(doc['id'])
+                if current and current[2] == doc['sha']:
+                    continue
+                batch[doc['id']] = doc
+                if len(batch) >= SEGMENT_BATCH_DOCS:
+                    indexed += self._flush(batch)
+                    batch = {}
+            if batch:
+                indexed += self._flush(batch)
+
+            while len(self.segments) > MAX_SEGMENTS:
+                # Smallest first, so big segments are rewritten rarely
+                by_size = sorted(self.segments, key=lambda name: len(self.segments[name].docs))
+                self._merge(by_size[:len(self.segments) - MAX_SEGMENTS // 2])
+            if removed and not indexed:
+                self._save()
+            return indexed
+
+    def _flush(self, batch):
+        """Write one batch of docs as a new segment."""
+        name = f"seg-{self.next_segment:05d}.idx"
+        self.next_segment += 1
+        tokens = [tokenize(f"{doc.get('title') or ''} {doc.get('text') or ''}") for doc in batch.values()]
+        doc_table = [[doc['id'], doc.get('title'), doc.get('podcast'), len(t)] for doc, t in zip(batch.values(), tokens)]
+        write_segment(os.path.join(self.root, name), doc_table, invert(tokens))
+
+        self.segments[name] = Segment(os.path.join(self.root, name))
+        self._stats = None
+        for local, doc in enumerate(batch.values()):
+            self._delete(doc['id'])
+            self.live[doc['id']] = [name, local, doc['sha']]
+        self._save()
+        return len(batch)
+
+    def _merge(self, names):
+        """Rewrite the live documents of some segments into one, term by term."""
+        name = f"seg-{self.next_segment:05d}.idx"
+        self.next_segment += 1
+
+        doc_table = []
+        remap = {}
+        for seg_name in names:
+            dead = self.deleted.get(seg_name, set())
+            remap[seg_name] = {}
+            for local, doc in enumerate(self.segments[seg_name].docs):
+                if local not in dead:
+                    remap[seg_name][local] = len(doc_table)
+                    doc_table.append(doc)
+
+        def merged_postings():
+            terms = sorted(set().union(*(self.segments[seg_name].terms for seg_name in names)))
+            for term in terms:
+                postings = [
+                    (remap[seg_name][doc], where)
+                    for seg_name in names
+                    for doc, where in self.segments[seg_name].positions(term).items()
+                    if doc in remap[seg_name]
+                ]
+                if postings:
+                    yield term, postings
+
+        write_segment(os.path.join(self.root, name), doc_table, merged_postings())
+        self.segments[name] = Segment(os.path.join(self.root, name))
+        for video_id, (seg_name, local, sha) in self.live.items():
+            if seg_name in remap:
+                self.live[video_id] = [name, remap[seg_name][local], sha]
+
+        old = [self.segments.pop(seg_name) for seg_name in names]
+        for seg_name in names:
+            self.deleted.pop(seg_name, None)
+        self._save()
+        for segment in old:
+            segment.close()
+            os.remove(segment.path)
+            descriptor_path = f"{os.path.splitext(segment.path)[0]}.web.json"
+            if os.path.exists(descriptor_path):
+                os.remove(descriptor_path)
+
+    def _collection_stats(self):
+        if self._stats is not None:
+            return self._stats
+        total_length = 0
+        for name, segment in self.segments.items():
+            dead = self.deleted.get(name, set())
+            total_length += sum(doc[-1] for local, doc in enumerate(segment.docs) if local not in dead)
+        self._stats = (len(self.live), (total_length / len(self.live)) if self.live else 0.0)
+        return self._stats
+
+    def search(self, query, limit=10):
+        """
+        BM25 search. Quoted phrases must match exactly (and count towards the
+        score); other terms are OR'ed. Returns dicts with video_id, title,
+        podcast and score, best first.
+        """
+        phrases, terms = parse_query(query)
+        query_terms = list(dict.fromkeys(terms + [t for phrase in phrases for t in phrase]))
+        if not query_terms:
+            return []
+
+        with self._lock:
+            n_docs, avgdl = self._collection_stats()
+            if not n_docs:
+                return []
+            df = {t: sum(seg.doc_freq(t) for seg in self.segments.values()) for t in query_terms}
+            idf = {t: math.log(1 + (n_docs - df[t] + 0.5) / (df[t] + 0.5)) for t in query_terms}
+
+            results = []
+            for name, segment in self.segments.items():
+                dead = self.deleted.get(name, set())
+                allowed = None
+                for phrase in phrases:
+                    matches = self._phrase_docs(segment, phrase)
+                    allowed = matches if allowed is None else allowed & matches
+
+                scores = defaultdict(float)
+                for term in query_terms:
+                    for doc, tf in segment.postings(term):
+                        if doc in dead or (allowed is not None and doc not in allowed):
+                            continue
+                        length = segment.docs[doc][-1]
+                        norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avgdl)
+                        scores[doc] += idf[term] * tf * (BM25_K1 + 1) / norm
+
+                for doc, score in scores.items():
+                    video_id, title, podcast, _ = segment.docs[doc]
+                    results.append((score, video_id, title, podcast))
+
+        return [
+            {'video_id': video_id, 'title': title, 'podcast': podcast, 'score': round(score, 4)}
+            for score, video_id, title, podcast in heapq.nlargest(limit, results)
+        ]
+
+    def _phrase_docs(self, segment, phrase):
+        """Local docs in a segment containing the phrase."""
+        positions = [segment.positions(term) for term in phrase]
+        if any(not p for p in positions):
+            return set()
+        candidates = set(positions[0])
+        for p in positions[1:]:
+            candidates &= set(p)
+
+        matches = set()
+        for doc in candidates:
+            later = [set(p[doc]) for p in positions[1:]]
+            if any(all(start + i + 1 in where for i, where in enumerate(later)) for start in positions[0][doc]):
+                matches.add(doc)
+        return matches
+
+    def write_web_shards(self, site_dir, prefix='search'):
+        """
+        Export the index for client-side search. Each segment gets a doc
+        table and term shards grouped by prefix, so a query only loads the
+        shards for its terms. Segments are immutable, so their shards are
+        written once and only new segments cost anything. Positions are left
+        out. Returns the manifest dict, also written to <prefix>/manifest.json.
+        """
+        out_dir = os.path.join(site_dir, prefix)
+        os.makedirs(out_dir, exist_ok=True)
+
+        with self._lock:
+            n_docs, avgdl = self._collection_stats()
+            segments = []
+            for name, segment in sorted(self.segments.items()):
+                files = self._web_segment(name, segment, out_dir, prefix)
+                segments.append(dict(files, name=name, deleted=sorted(self.deleted.get(name, ()))))
+
+        manifest = {
+            'version': 1,
+            'doc_count': n_docs,
+            'avg_doc_length': round(avgdl, 3),
+            'bm25': {'k1': BM25_K1, 'b': BM25_B},
+            'prefix_chars': WEB_PREFIX_CHARS,
+            'segments': segments,
+        }
+        with open(os.path.join(out_dir, 'manifest.json.tmp'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(os.path.join(out_dir, 'manifest.json.tmp'), os.path.join(out_dir, 'manifest.json'))
+
+        # Merged-away segments' shards go once nothing references them
+        live_dirs = {os.path.splitext(name)[0] for name in self.segments}
+        for entry in os.listdir(out_dir):
+            if entry != 'manifest.json' and entry not in live_dirs:
+                shutil.rmtree(os.path.join(out_dir, entry), ignore_errors=True)
+        return manifest
+
+    def _web_segment(self, name, segment, out_dir, prefix):
+        """Write (or reuse) one segment's web shards. Returns {'docs': path, 'shards': {prefix: path}}."""
+        descriptor_path = os.path.join(self.root, f"{os.path.splitext(name)[0]}.web.json")
+        if os.path.exists(descriptor_path):
+            with open(descriptor_path, 'r', encoding='utf-8') as f:
+                files = json.load(f)
+            paths = [files['docs']] + list(files['shards'].values())
+            if all(os.path.exists(os.path.join(os.path.dirname(out_dir), path)) for path in paths):
+                return files
+
+        seg_dir = os.path.splitext(name)[0]
+        os.makedirs(os.path.join(out_dir, seg_dir), exist_ok=True)
+
+        def write(rel_name, body):
+            payload = json.dumps(body, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8')
+            file_name = f"{rel_name}.{hashlib.sha256(payload).hexdigest()[:12]}.json"
+            with open(os.path.join(out_dir, seg_dir, file_name), 'wb') as f:
+                f.write(payload)
+            return f"{prefix}/{seg_dir}/{file_name}"
+
+        shards = defaultdict(dict)
+        for term in segment.terms:
+            shards[term[:WEB_PREFIX_CHARS]][term] = [[doc, tf] for doc, tf in segment.postings(term)]
+
+        files = {
+            'docs': write('docs', [[video_id, length] for video_id, _, _, length in segment.docs]),
+            'shards': {key: write(f"terms-{_shard_name(key)}", terms) for key, terms in sorted(shards.items())},
+        }
+        with open(descriptor_path, 'w', encoding='utf-8') as f:
+            json.dump(files, f)
+        return files
+
+
+def _shard_name(prefix):
+    # Non-ASCII prefixes get a stable ASCII file name
+    if re.fullmatch(r'[a-z0-9_]+', prefix):
+        return prefix
+    return 'x' + prefix.encode('utf-8').hex()
+
+
+def sync_transcripts(index, store):
+    """Bring a transcript index up to date with a TranscriptStore. Returns docs indexed."""
+    entries = {entry['video_id']: entry for entry in store.entries()}
+    removed = [video_id for video_id in index.live if video_id not in entries]
+    stale = [
+        entry for video_id, entry in entries.items()
+        if video_id not in index.live or index.live[video_id][2] != entry.get('transcript_sha256')
+    ]
+
+    def docs():
+        # Transcripts are decompressed one at a time
+        for entry in stale:
+            episode = store.get(entry['video_id'], with_segments=False)
+            yield {
+                'id': entry['video_id'],
+                'sha': entry.get('transcript_sha256'),
+                'title': entry.get('title'),
+                'podcast': entry.get('podcast_name'),
+                'text': episode.get('transcript'),
+            }
+
+    return index.update(docs(), removed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the Podicals search index")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    query = sub.add_parser('query')
+    query.add_argument('text')
+    query.add_argument('--limit', type=int, default=10)
+    query.add_argument('--transcripts', action='store_true', help="Search transcripts instead of summaries")
+    query.add_argument('--index-dir', default='./data/.export/search')
+
+    args = parser.parse_args()
+    index = SearchIndex(os.path.join(args.index_dir, 'transcripts' if args.transcripts else 'summaries'))
+    for i, hit in enumerate(index.search(args.text, args.limit), 1):
+        print(f"{i:2d}. {hit['score']:7.3f}  {hit['podcast']} - {hit['title']} ({hit['video_id']})")
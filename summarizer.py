@@ -4,26 +4,74 @@ Generates article-style summaries from podcast transcripts using Claude.
 """
 
 import os
+import re
 import json
 import glob
+import math
+import time
+import asyncio
+import argparse
+import statistics
+import threading
 from datetime import datetime
-from anthropic import Anthropic
+from concurrent.futures import ThreadPoolExecutor
 
-# Initialize Anthropic client (expects ANTHROPIC_API_KEY env var)
-client = Anthropic()
+from alignment import align_summary
+from budget import DOWNGRADE_MODEL, TokenBudget, episode_priority, usage_cost
+from compaction import COMPACTION_VERSION, compact_episode, estimate_tokens
+from dedup import DuplicateIndex
+# export_for_website used to live here; kept importable from this module
+from exporter import export_for_website
+from metrics import Metrics
+from rate_limiter import AdaptiveConcurrency, retry_after_seconds
+from summary_cache import SummaryCache, summary_cache_key, transcript_digest
+from transcript_store import TranscriptStore
+from work_queue import WorkQueue, default_worker_id
 
-SUMMARY_PROMPT = """You are a skilled writer for Podicals, a site that creates engaging article summaries of podcast episodes. Think of yourself as writing for The Ringer or Morning Brew - casual, smart, and fun to read.
+DEFAULT_MODEL = "claude-sonnet-4-20250514"
+DEFAULT_MAX_TOKENS = 2000
 
-Given the following podcast transcript, write an article-style summary that:
+# Rate limited, overloaded, or transient server errors
+RETRYABLE_STATUSES = {429, 500, 502, 503, 529}
+
+# Message Batches limits are 100k requests / 256 MB; stay well inside them
+BATCH_MAX_REQUESTS = 10000
+BATCH_MAX_BYTES = 200 * 1024 * 1024
+BATCH_STATE_FILENAME = 'batches.json'
+
+# Queue lease for one summary; a map-reduce run can take a few minutes
+SUMMARY_LEASE_SECONDS = 600
+
+# Preflight guess at an article's length in tokens (500-700 words), until
+# the summary cache has enough past summaries to go by
+SUMMARY_OUTPUT_TOKENS = 1000
+CALIBRATION_MIN_SUMMARIES = 10
 
-1. Has an engaging, clickable headline (not clickbait, but genuinely interesting)
+# Transcripts longer than this are summarized map-reduce style rather than
+# in one request (a 3-hour episode runs ~180k characters)
+LONG_TRANSCRIPT_CHARS = 150000
+CHUNK_CHARS = 60000
+CHUNK_MAX_TOKENS = 1500
+# Only used when long_mode is off
+TRUNCATE_CHARS = 300000
+
+WRITER_INTRO = """You are a skilled writer for Podicals, a site that creates engaging article summaries of podcast episodes. Think of yourself as writing for The Ringer or Morning Brew - casual, smart, and fun to read."""
+
+# Shared by the single-pass prompt and the reduce step for long episodes
+ARTICLE_GUIDELINES = """1. Has an engaging, clickable headline (not clickbait, but genuinely interesting)
 2. Opens with a 2-3 sentence hook that captures what made this episode worth listening to
 3. Covers 5-8 key topics or moments with 2-3 sentences each
 4. Uses a conversational, friendly tone - like you're telling a friend about a podcast you just listened to
 5. Includes any notable quotes or memorable moments (paraphrased or very briefly quoted)
 6. Ends with a quick "Bottom line" - who should listen and why
 
-Keep it around 500-700 words. Be accurate to what was discussed - don't make things up.
+Keep it around 500-700 words. Be accurate to what was discussed - don't make things up."""
+
+SUMMARY_PROMPT = WRITER_INTRO + """
+
+Given the following podcast transcript, write an article-style summary that:
+
+""" + ARTICLE_GUIDELINES + """
 
 PODCAST: {podcast_name}
 EPISODE TITLE: {episode_title}
@@ -33,35 +81,214 @@ TRANSCRIPT:
 
 Write the article summary now:"""
 
+# Long episodes are summarized map-reduce style: notes per chunk, in
+# parallel, then one article written from all the notes.
+CHUNK_PROMPT = """You are helping summarize a long podcast episode that has been split into parts.
+
+PODCAST: {podcast_name}
+EPISODE TITLE: {episode_title}
+
+Write detailed notes on part {part} of {total_parts} of the transcript:
+- The main topics and stories, in the order they come up
+- Specific claims, numbers, names and examples
+- Notable quotes, copied word for word from the transcript
+- Funny or memorable moments
+
+Use bullet points. Only include what is actually in this part - don't make things up.
+
+TRANSCRIPT (PART {part} OF {total_parts}):
+{transcript}
+
+Write the notes now:"""
+
+REDUCE_PROMPT = WRITER_INTRO + """
+
+This episode was too long to read in one go, so the transcript was split into {total_parts} consecutive parts and each part was turned into notes. Together the notes cover the whole episode from start to finish. Using them, write an article-style summary that:
+
+""" + ARTICLE_GUIDELINES + """
+
+PODCAST: {podcast_name}
+EPISODE TITLE: {episode_title}
+
+NOTES:
+{notes}
+
+Write the article summary now:"""
+
+
+def split_transcript(transcript, segments=None, chunk_chars=CHUNK_CHARS):
+    """
+    Split a transcript into consecutive chunks of at most ~chunk_chars.
+    Cuts fall on caption segment boundaries when segments are available,
+    otherwise on sentence ends, and only mid-sentence for run-on text.
+    Chunks are balanced so the last one isn't a tiny remainder.
+    """
+    if len(transcript) <= chunk_chars:
+        return [transcript]
+    
+    if segments:
+        pieces = [segment['text'] for segment in segments]
+    else:
+        pieces = re.split(r'(?<=[.!?])\s+', transcript)
+    
+    words = []
+    for piece in pieces:
+        if not piece:
+            continue
+        if len(piece) > chunk_chars:
+            words.extend(piece.split())
+        else:
+            words.append(piece)
+    
+    target = math.ceil(len(transcript) / math.ceil(len(transcript) / chunk_chars))
+    chunks, current, size = [], [], 0
+    for piece in words:
+        if current and size + len(piece) + 1 > target:
+            chunks.append(' '.join(current))
+            current, size = [], 0
+        current.append(piece)
+        size += len(piece) + 1
+    if current:
+        tail = ' '.join(current)
+        # Rounding can leave a sliver; fold it into the previous chunk
+        if chunks and len(chunks[-1]) + len(tail) + 1 <= chunk_chars:
+            chunks[-1] = f"{chunks[-1]} {tail}"
+        else:
+            chunks.append(tail)
+    return chunks
+
 
 class PodicalsSummarizer:
-    def __init__(self, transcripts_dir="./transcripts", output_dir="./summaries"):
+    def __init__(self, transcripts_dir="./transcripts", output_dir="./summaries",
+                 model=DEFAULT_MODEL, max_tokens=DEFAULT_MAX_TOKENS, base_url=None,
+                 long_mode=True, chunk_chars=CHUNK_CHARS, chunk_workers=4,
+                 compact=True, count_tokens=False, work_queue=None,
+                 budget_usd=None, budget_tokens=None, downgrade_model=DOWNGRADE_MODEL):
         self.transcripts_dir = transcripts_dir
         self.output_dir = output_dir
+        self.model = model
+        self.max_tokens = max_tokens
+        # long_mode=False falls back to truncating long transcripts
+        self.long_mode = long_mode
+        self.chunk_chars = chunk_chars
+        self.chunk_workers = chunk_workers
+        # compact=False sends transcripts verbatim, for A/B comparison;
+        # count_tokens=True measures with the token-counting API instead of an estimate
+        self.compact = compact
+        self.count_tokens = count_tokens
+        # base_url points both clients at e.g. fake_anthropic.py for testing
+        self.base_url = base_url
+        # Created on first use, so importing this module or only reading
+        # the store doesn't load the SDK or need ANTHROPIC_API_KEY
+        self._client = None
+        self._client_lock = threading.Lock()
+        self.store = TranscriptStore(transcripts_dir)
+        # API timings, errors, tokens and bytes written; events go to <output_dir>/logs/summarize.jsonl
+        self.metrics = Metrics(log_path=os.path.join(output_dir, 'logs', 'summarize.jsonl'), stage='summarize')
+        # Re-uploads of an episode are summarized once, as the canonical copy
+        self.duplicates = DuplicateIndex(transcripts_dir)
+        # Optional work_queue.WorkQueue shared by several summarizer processes
+        self.work_queue = work_queue
+        # Run-level spending limit (USD and/or tokens); with neither it only keeps the accounts
+        self.budget = TokenBudget(budget_usd, budget_tokens, model=model, downgrade_model=downgrade_model)
+        # video_id -> preflight usage estimate, filled in by _pending_entries
+        self.estimates = {}
+        # Episodes whose only summary came from the downgrade model; never downgraded again
+        self._upgrades = set()
+        # video_id -> model it was admitted on, for settling failures
+        self._admitted = {}
+        self._output_estimate = None
         os.makedirs(output_dir, exist_ok=True)
+        self.cache = SummaryCache(output_dir)
+        if self.cache.is_new:
+            self._adopt_existing_summaries()
     
-    def summarize_episode(self, transcript_path):
-        """Generate a summary for a single episode."""
-        
-        # Load transcript
-        with open(transcript_path, 'r', encoding='utf-8') as f:
-            episode_data = json.load(f)
+    @property
+    def client(self):
+        """Anthropic client (expects ANTHROPIC_API_KEY unless base_url points at a stand-in)."""
+        with self._client_lock:
+            if self._client is None:
+                from anthropic import Anthropic
+                self._client = Anthropic(base_url=self.base_url)
+            return self._client
+    
+    def _load_episode(self, episode):
+        """
+        Resolve an episode dict from the transcript store, a video_id in the
+        store, or the path to a legacy transcript JSON file.
+        Returns (episode_data, source).
+        """
+        if isinstance(episode, dict):
+            return self._compact(episode), f"store:{episode.get('video_id')}"
+        if episode in self.store:
+            # Compaction, chunking and quote alignment all work on caption segments
+            return self._compact(self.store.get(episode)), f"store:{episode}"
+        with open(episode, 'r', encoding='utf-8') as f:
+            return self._compact(json.load(f)), episode
+    
+    def _compact(self, episode_data):
+        """Apply transcript compaction (if enabled), recording tokens before and after."""
+        if not self.compact or 'compaction' in episode_data or not episode_data.get('transcript'):
+            return episode_data
         
+        original = episode_data['transcript']
+        compacted, stats = compact_episode(episode_data)
+        # Cache keys and long-episode routing follow the stored transcript
+        compacted['transcript_sha256'] = transcript_digest(original)
+        compacted['transcript_chars'] = len(original)
+        if episode_data.get('segments') is not None:
+            # Quotes are aligned against the captions as they were said
+            compacted['original_segments'] = episode_data['segments']
+        stats['tokens_before'] = self._count_tokens(original)
+        stats['tokens_after'] = self._count_tokens(compacted['transcript'])
+        stats['token_counter'] = 'api' if self.count_tokens else 'estimate'
+        compacted['compaction'] = stats
+        return compacted
+    
+    def _count_tokens(self, text):
+        if not self.count_tokens:
+            return estimate_tokens(text)
+        response = self._api('count_tokens', self.client.messages.count_tokens,
+            model=self.model,
+            messages=[{"role": "user", "content": text}],
+        )
+        return response.input_tokens
+    
+    def _api(self, call, fn, **params):
+        """Make one synchronous API call, timed under `call` in the metrics."""
+        with self.metrics.timer('request_seconds', call=call):
+            return fn(**params)
+    
+    def _is_long(self, episode):
+        """True if an episode (index entry or loaded) gets map-reduce summarization."""
+        if not self.long_mode:
+            return False
+        chars = episode.get('transcript_chars')
+        if chars is None:
+            chars = len(episode.get('transcript') or '')
+        return chars > LONG_TRANSCRIPT_CHARS
+    
+    def _message(self, prompt, max_tokens, model=None):
+        return {
+            'model': model or self.model,
+            'max_tokens': max_tokens,
+            'messages': [
+                {"role": "user", "content": prompt}
+            ],
+        }
+    
+    def _build_request(self, episode_data, model=None):
+        """Messages API parameters for an episode, or None if there's no transcript."""
         podcast_name = episode_data.get('podcast_name', 'Unknown Podcast')
         episode_title = episode_data.get('title', 'Unknown Episode')
         transcript = episode_data.get('transcript', '')
         
         if not transcript:
-            return {
-                'success': False,
-                'error': 'No transcript content',
-                'source_file': transcript_path,
-            }
+            return None
         
         # Truncate transcript if too long (Claude has context limits)
-        max_chars = 300000
-        if len(transcript) > max_chars:
-            transcript = transcript[:max_chars] + "\n\n[TRANSCRIPT TRUNCATED]"
+        if len(transcript) > TRUNCATE_CHARS:
+            transcript = transcript[:TRUNCATE_CHARS] + "\n\n[TRANSCRIPT TRUNCATED]"
         
         # Generate summary
         prompt = SUMMARY_PROMPT.format(
@@ -70,102 +297,817 @@ class PodicalsSummarizer:
             transcript=transcript
         )
         
-        try:
-            response = client.messages.create(
-                model="claude-sonnet-4-20250514",
-                max_tokens=2000,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
+        return self._message(prompt, self.max_tokens, model)
+    
+    def _build_chunk_requests(self, episode_data, model=None):
+        """Map step: one notes request per transcript chunk."""
+        # Caption boundaries make cleaner cuts than auto-caption "sentences"
+        segments = episode_data.get('segments')
+        if segments is None:
+            segments = self._original_segments(episode_data)
+        
+        chunks = split_transcript(episode_data['transcript'], segments, self.chunk_chars)
+        return [
+            self._message(CHUNK_PROMPT.format(
+                podcast_name=episode_data.get('podcast_name', 'Unknown Podcast'),
+                episode_title=episode_data.get('title', 'Unknown Episode'),
+                part=i + 1,
+                total_parts=len(chunks),
+                transcript=chunk,
+            ), CHUNK_MAX_TOKENS, model)
+            for i, chunk in enumerate(chunks)
+        ]
+    
+    def _build_reduce_request(self, episode_data, notes, model=None):
+        """Reduce step: write the article from the per-chunk notes, in order."""
+        prompt = REDUCE_PROMPT.format(
+            podcast_name=episode_data.get('podcast_name', 'Unknown Podcast'),
+            episode_title=episode_data.get('title', 'Unknown Episode'),
+            total_parts=len(notes),
+            notes='\n\n'.join(f"--- PART {i + 1} ---\n{text}" for i, text in enumerate(notes)),
+        )
+        return self._message(prompt, self.max_tokens, model)
+    
+    def cache_key(self, episode, model=None):
+        """
+        Summary cache key for a store index entry or a loaded episode.
+        Changes whenever the transcript, prompt, model or max_tokens change.
+        """
+        digest = episode.get('transcript_sha256')
+        if digest is None:
+            if 'transcript' not in episode:
+                episode, _ = self._load_episode(episode['video_id'])
+            digest = transcript_digest(episode.get('transcript'))
+        fields = (episode.get('video_id'), episode.get('podcast_name'), episode.get('title'))
+        if self._is_long(episode):
+            prompt = '\n'.join([CHUNK_PROMPT, REDUCE_PROMPT, f"chunk_chars={self.chunk_chars}"])
+        else:
+            prompt = SUMMARY_PROMPT
+        if self.compact:
+            prompt = f"{prompt}\ncompaction={COMPACTION_VERSION}"
+        return summary_cache_key(fields, digest, prompt, model or self.model, self.max_tokens)
+    
+    def _needs_summary(self, entry):
+        return self.cache.lookup(self.cache_key(entry)) is None
+    
+    def _has_downgraded_summary(self, entry):
+        downgrade_model = self.budget.downgrade_model
+        return bool(downgrade_model) and self.cache.entries.get(self.cache_key(entry, downgrade_model)) is not None
+    
+    def _expected_output_tokens(self):
+        """Median output tokens of past summaries, once there are enough of them."""
+        if self._output_estimate is None:
+            past = [entry['output_tokens'] for entry in self.cache.entries.values() if entry.get('output_tokens')]
+            if len(past) >= CALIBRATION_MIN_SUMMARIES:
+                self._output_estimate = int(statistics.median(past))
+            else:
+                self._output_estimate = SUMMARY_OUTPUT_TOKENS
+        return self._output_estimate
+    
+    def _estimate_usage(self, entry):
+        """
+        Preflight token estimate for a store index entry, from its stored
+        transcript length (no decompression). Compaction savings aren't
+        counted, so this errs high.
+        """
+        chars = entry.get('transcript_chars')
+        if chars is None:
+            chars = len(entry.get('transcript') or '')
+        output_tokens = self._expected_output_tokens()
+        if self._is_long(entry):
+            parts = math.ceil(chars / self.chunk_chars)
+            notes = parts * CHUNK_MAX_TOKENS
+            prompts = parts * estimate_tokens(CHUNK_PROMPT) + estimate_tokens(REDUCE_PROMPT)
+            # Transcript into the map step, the notes into the reduce step
+            return {'input_tokens': chars // 4 + prompts + notes, 'output_tokens': notes + output_tokens}
+        chars = min(chars, TRUNCATE_CHARS)
+        return {'input_tokens': chars // 4 + estimate_tokens(SUMMARY_PROMPT), 'output_tokens': output_tokens}
+    
+    def _admit(self, entry, final=True):
+        """
+        Model to summarize an entry with under the run budget, or None if it
+        doesn't fit. With final=False a miss isn't counted as deferred yet.
+        """
+        video_id = entry['video_id']
+        if video_id not in self.estimates:
+            self.estimates[video_id] = self._estimate_usage(entry)
+        model = self.budget.admit(self.estimates[video_id], allow_downgrade=video_id not in self._upgrades)
+        if model:
+            self._admitted[video_id] = model
+        elif final:
+            self.budget.defer(self.estimates[video_id])
+        return model
+    
+    def _account(self, result, video_id, model=None):
+        """Settle an admitted episode with the budget, recording its estimate and cost on the result."""
+        model = model or self._admitted.get(video_id, self.model)
+        estimate = self.estimates.get(video_id) or self._estimate_usage(self.store.index.get(video_id) or {})
+        usage = result.get('usage') if result['success'] else None
+        self.budget.settle(estimate, model, usage)
+        if usage:
+            cost = usage_cost(usage, model, self.budget.batch)
+            self.metrics.inc('cost_usd_total', cost, model=model)
+            result['estimated_usage'] = estimate
+            result['cost_usd'] = round(cost, 6)
+    
+    def _adopt_existing_summaries(self):
+        """
+        First run with the cache: treat summaries already on disk as current,
+        rather than paying to regenerate the whole archive.
+        """
+        adopted = 0
+        for entry in self.store.entries():
+            path = self._summary_path(
+                entry.get('genre'), entry.get('podcast_name'), entry.get('upload_date'), entry.get('title'),
             )
-            
-            summary = response.content[0].text
-            
+            if os.path.exists(path):
+                self.cache.record(self.cache_key(entry), entry['video_id'], path, model=self.model)
+                adopted += 1
+        if adopted:
+            print(f"Summary cache: adopted {adopted} existing summaries")
+    
+    def _build_result(self, episode_data, response, source, usage=None, model=None):
+        """
+        Result dict for a successful summary. usage overrides the response's
+        token counts (map-reduce summaries add up every call).
+        """
+        if usage is None:
+            usage = _response_usage(response)
+        for direction in ('input', 'output'):
+            self.metrics.inc('tokens_total', usage.get(f"{direction}_tokens") or 0, direction=direction)
+        summary = response.content[0].text
+        return {
+            'success': True,
+            'summary': summary,
+            'podcast_name': episode_data.get('podcast_name', 'Unknown Podcast'),
+            'episode_title': episode_data.get('title', 'Unknown Episode'),
+            'video_id': episode_data.get('video_id'),
+            'youtube_url': episode_data.get('youtube_url'),
+            'upload_date': episode_data.get('upload_date'),
+            'duration_seconds': episode_data.get('duration_seconds'),
+            'genre': episode_data.get('genre'),
+            'view_count': episode_data.get('view_count'),
+            'source_file': source,
+            'model': model or self.model,
+            'usage': usage,
+            'compaction': episode_data.get('compaction'),
+            'quote_timestamps': self._quote_timestamps(episode_data, summary),
+            'cache_key': self.cache_key(episode_data, model),
+            'summarized_at': datetime.now().isoformat(),
+        }
+    
+    def _original_segments(self, episode_data):
+        """
+        Uncompacted caption segments of a loaded episode. Only read from the
+        store again for an episode dict that came without them.
+        """
+        if 'original_segments' in episode_data:
+            return episode_data['original_segments']
+        segments = episode_data.get('segments')
+        if segments is None and episode_data.get('video_id') in self.store:
+            segments = self.store.get(episode_data['video_id']).get('segments')
+        return segments
+    
+    def _quote_timestamps(self, episode_data, summary):
+        """Where the summary's quotes were said, aligned against the uncompacted captions."""
+        video_id = episode_data.get('video_id')
+        try:
+            return align_summary(summary, self._original_segments(episode_data))
+        except Exception as e:
+            # Links are a nice-to-have; never lose a paid-for summary over them
+            print(f"  ⚠ Quote alignment failed for {video_id}: {e}")
+            return []
+    
+    def summarize_episode(self, episode, model=None):
+        """
+        Generate a summary for a single episode.
+        Accepts an episode dict from the transcript store, a video_id in the
+        store, or the path to a legacy transcript JSON file.
+        model overrides the summarizer's model (budget downgrades).
+        """
+        episode_data, source = self._load_episode(episode)
+        
+        request = self._build_request(episode_data, model)
+        if request is None:
             return {
-                'success': True,
-                'summary': summary,
-                'podcast_name': podcast_name,
-                'episode_title': episode_title,
-                'video_id': episode_data.get('video_id'),
-                'youtube_url': episode_data.get('youtube_url'),
-                'upload_date': episode_data.get('upload_date'),
-                'duration_seconds': episode_data.get('duration_seconds'),
-                'genre': episode_data.get('genre'),
-                'view_count': episode_data.get('view_count'),
-                'source_file': transcript_path,
-                'summarized_at': datetime.now().isoformat(),
+                'success': False,
+                'error': 'No transcript content',
+                'source_file': source,
             }
+        
+        try:
+            started = time.monotonic()
+            if self._is_long(episode_data):
+                result = self._summarize_long(episode_data, source, model)
+            else:
+                response = self._api('messages', self.client.messages.create, **request)
+                result = self._build_result(episode_data, response, source, model=model)
+            result['latency_seconds'] = round(time.monotonic() - started, 2)
+            return result
             
         except Exception as e:
             return {
                 'success': False,
                 'error': str(e),
-                'source_file': transcript_path,
+                'source_file': source,
             }
     
-    def summarize_all(self, limit=None):
-        """Summarize all transcripts."""
+    def _summarize_long(self, episode_data, source, model=None):
+        """Map-reduce summary: notes for each chunk in parallel, then one article."""
+        chunk_requests = self._build_chunk_requests(episode_data, model)
+        with ThreadPoolExecutor(max_workers=self.chunk_workers) as pool:
+            chunk_responses = list(pool.map(
+                lambda params: self._api('chunk', self.client.messages.create, **params), chunk_requests,
+            ))
         
-        # Find all transcript files
-        transcript_files = glob.glob(
-            os.path.join(self.transcripts_dir, '**', '*.json'),
-            recursive=True
+        notes = [response.content[0].text for response in chunk_responses]
+        response = self._api('reduce', self.client.messages.create,
+                             **self._build_reduce_request(episode_data, notes, model))
+        
+        result = self._build_result(
+            episode_data, response, source,
+            usage=_sum_usage(chunk_responses + [response]),
+            model=model,
         )
+        result['chunks'] = len(chunk_requests)
+        return result
+    
+    async def _create_async(self, params, window, async_client, label, max_retries, call='messages'):
+        """
+        One Messages call inside the shared window, retried on 429/overload.
+        Returns (response, retries, call_started); other errors propagate.
+        """
+        attempt = 0
+        while True:
+            await window.acquire()
+            call_started = time.monotonic()
+            try:
+                with self.metrics.timer('request_seconds', call=call):
+                    response = await async_client.messages.create(**params)
+            except Exception as e:
+                status = getattr(e, 'status_code', None)
+                if status in RETRYABLE_STATUSES and attempt < max_retries:
+                    attempt += 1
+                    self.metrics.inc('retries_total', call=call)
+                    # Exponential fallback when the server gives no Retry-After
+                    pause = window.throttled(retry_after_seconds(e, default=2 ** attempt))
+                    print(f"  ↻ {status} for {label}, "
+                          f"window {window.limit}, retrying in {pause:.1f}s")
+                    continue
+                raise
+            finally:
+                await window.release()
+            
+            window.succeeded()
+            return response, attempt, call_started
+    
+    async def summarize_episode_async(self, episode, window, async_client, max_retries=5, model=None):
+        """
+        Async counterpart of summarize_episode.
+        Requests run inside the shared AdaptiveConcurrency window; 429 and
+        overload responses shrink the window and are retried after Retry-After.
+        Chunks of long episodes share the same window. Loading, building
+        requests and quote alignment run in a thread so they don't stall
+        the requests in flight.
+        """
+        episode_data, source = await asyncio.to_thread(self._load_episode, episode)
+        
+        request = await asyncio.to_thread(self._build_request, episode_data, model)
+        if request is None:
+            return {
+                'success': False,
+                'error': 'No transcript content',
+                'source_file': source,
+            }
         
-        # Skip the stats file
-        transcript_files = [f for f in transcript_files if 'stats' not in f]
+        label = episode_data.get('video_id')
+        started = time.monotonic()
+        try:
+            if self._is_long(episode_data):
+                chunk_requests = await asyncio.to_thread(self._build_chunk_requests, episode_data, model)
+                calls = await asyncio.gather(*[
+                    self._create_async(params, window, async_client, f"{label} part {i + 1}", max_retries, call='chunk')
+                    for i, params in enumerate(chunk_requests)
+                ])
+                notes = [response.content[0].text for response, _, _ in calls]
+                reduce_call = await self._create_async(
+                    self._build_reduce_request(episode_data, notes, model), window, async_client, label, max_retries,
+                    call='reduce',
+                )
+                response = reduce_call[0]
+                usage = _sum_usage([call[0] for call in calls] + [response])
+                retries = sum(call[1] for call in calls) + reduce_call[1]
+                call_started = min(call[2] for call in calls)
+            else:
+                response, retries, call_started = await self._create_async(
+                    request, window, async_client, label, max_retries,
+                )
+                usage, calls = None, None
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'source_file': source,
+            }
+        
+        finished = time.monotonic()
+        result = await asyncio.to_thread(self._build_result, episode_data, response, source, usage=usage, model=model)
+        result['latency_seconds'] = round(finished - call_started, 2)
+        # Time spent queued for a window slot or backing off
+        result['wait_seconds'] = round(call_started - started, 2)
+        result['retries'] = retries
+        if calls:
+            result['chunks'] = len(calls)
+        return result
+    
+    def _pending_entries(self, limit=None):
+        """Store index entries to summarize this run."""
+        # Read the store index; transcripts are only decompressed one at a time
+        all_entries = self.store.entries()
         
+        # Transcripts stored before duplicate detection existed are checked once
+        checked = self.duplicates.sync(self.store)
+        duplicates = [entry for entry in all_entries if self.duplicates.is_duplicate(entry['video_id'])]
+        
+        # Skip duplicates and episodes whose summary inputs haven't changed since last time
+        entries = [
+            entry for entry in all_entries
+            if not self.duplicates.is_duplicate(entry['video_id']) and self._needs_summary(entry)
+        ]
+        
+        # Most-watched and most recent first, so --limit or the budget cuts the
+        # least wanted; re-doing downgraded summaries comes after new ones
+        now = datetime.now()
+        self._upgrades = {entry['video_id'] for entry in entries if self._has_downgraded_summary(entry)}
+        entries.sort(key=lambda entry: (entry['video_id'] in self._upgrades, -episode_priority(entry, now)))
         if limit:
-            transcript_files = transcript_files[:limit]
+            entries = entries[:limit]
+        self.estimates = {entry['video_id']: self._estimate_usage(entry) for entry in entries}
         
         print(f"\n{'='*60}")
         print(f"PODICALS SUMMARIZER")
         print(f"{'='*60}")
-        print(f"Found {len(transcript_files)} transcripts to summarize")
+        print(f"Found {len(all_entries)} transcripts, {len(entries)} to summarize")
+        print(f"Cache: {self.cache.hits} unchanged, ~{self.cache.tokens_saved:,} tokens saved")
+        self._print_preflight(entries)
+        if duplicates:
+            print(f"Duplicates: {len(duplicates)} skipped ({checked} newly checked)")
+            for entry in duplicates[:10]:
+                print(f"  {entry['video_id']} {(entry.get('title') or '')[:40]} "
+                      f"-> {self.duplicates.canonical(entry['video_id'])}")
+        if not entries and glob.glob(os.path.join(self.transcripts_dir, '*', '*', '*.json')):
+            print("Transcripts are still in the legacy JSON layout;")
+            print("run `python transcript_store.py migrate` first.")
         print(f"{'='*60}\n")
         
+        return entries
+    
+    def _print_preflight(self, entries):
+        """Estimated tokens and cost of the pending episodes, and how many the budget covers."""
+        if not entries:
+            return
+        estimates = [self.estimates[entry['video_id']] for entry in entries]
+        input_tokens = sum(e['input_tokens'] for e in estimates)
+        output_tokens = sum(e['output_tokens'] for e in estimates)
+        cost = usage_cost({'input_tokens': input_tokens, 'output_tokens': output_tokens}, self.model)
+        print(f"Preflight: ~{input_tokens:,} input + ~{output_tokens:,} output tokens, ~${cost:.2f} on {self.model}")
+        if self.budget.limited:
+            # Dry run of the admissions, in priority order
+            budget = TokenBudget(self.budget.max_cost_usd, self.budget.max_tokens, model=self.model,
+                                 downgrade_model=self.budget.downgrade_model, batch=self.budget.batch)
+            for entry, estimate in zip(entries, estimates):
+                if not budget.admit(estimate, allow_downgrade=entry['video_id'] not in self._upgrades):
+                    budget.defer(estimate)
+            print(f"Budget: covers ~{budget.admitted} of {len(entries)} episodes "
+                  f"({budget.downgraded} on {budget.downgrade_model or 'a cheaper model'})")
+    
+    def _report(self, results, elapsed):
+        """Print the end-of-run summary, including per-episode latency."""
+        successful = sum(1 for r in results if r['success'])
+        latencies = sorted(r['latency_seconds'] for r in results if r.get('latency_seconds') is not None)
+        
+        print(f"\n{'='*60}")
+        print(f"COMPLETE: {successful}/{len(results)} successful in {elapsed:.1f}s")
+        if latencies:
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            print(f"Latency: p50 {statistics.median(latencies):.1f}s, p95 {p95:.1f}s, max {latencies[-1]:.1f}s")
+        for line in self.budget.report_lines(elapsed, successful):
+            print(line)
+        compacted = [r['compaction'] for r in results if r.get('compaction')]
+        if compacted:
+            before = sum(c['tokens_before'] for c in compacted)
+            after = sum(c['tokens_after'] for c in compacted)
+            print(f"Compaction: {before:,} -> {after:,} transcript tokens "
+                  f"({100 * (before - after) / max(1, before):.1f}% smaller, {compacted[0]['token_counter']})")
+        for call, timing in sorted(self.metrics.breakdown('request_seconds').items()):
+            print(f"  {call}: {timing['count']} requests, p50 {timing['p50_seconds']}s, p95 {timing['p95_seconds']}s")
+        errors = self.metrics.counter_totals('errors_total', 'type')
+        if errors:
+            print(f"API errors: {', '.join(f'{k} {v}' for k, v in sorted(errors.items()))}")
+        print(f"Metrics saved to: {self._write_metrics(results, elapsed)}")
+        print(f"{'='*60}")
+    
+    def _write_metrics(self, results, elapsed=None):
+        """Count outcomes, log failures and dump the Prometheus textfile. Returns its path."""
+        for result in results:
+            self.metrics.inc('summaries_total', outcome='success' if result['success'] else 'failed')
+            if not result['success']:
+                self.metrics.event('summary_failed', video_id=result.get('video_id'),
+                                   source=result.get('source_file'), error=result.get('error'))
+        self.metrics.event('summarize_done', summaries=len(results),
+                           elapsed_seconds=round(elapsed, 2) if elapsed is not None else None,
+                           requests=self.metrics.breakdown('request_seconds'),
+                           tokens=self.metrics.counter_totals('tokens_total', 'direction'))
+        return self.metrics.write_prometheus(os.path.join(self.output_dir, 'summarize_metrics.prom'))
+    
+    def summarize_all(self, limit=None):
+        """Summarize all transcripts."""
+        
+        entries = self._pending_entries(limit)
+        if self.work_queue:
+            return self._summarize_from_queue(entries)
+        started = time.monotonic()
+        
         results = []
         
-        for i, filepath in enumerate(transcript_files):
-            print(f"[{i+1}/{len(transcript_files)}] {os.path.basename(filepath)[:50]}...")
+        for i, entry in enumerate(entries):
+            model = self._admit(entry)
+            if model is None:
+                # Over budget; left pending for a later run
+                continue
+            print(f"[{i+1}/{len(entries)}] {(entry.get('title') or entry['video_id'])[:50]}..."
+                  f"{_model_note(model, self.model)}")
             
-            result = self.summarize_episode(filepath)
+            result = self.summarize_episode(entry['video_id'], model=model)
+            self._account(result, entry['video_id'], model)
             
             if result['success']:
                 self._save_summary(result)
-                print(f"  ✓ Done")
+                print(f"  ✓ Done ({result['latency_seconds']:.1f}s{_compaction_note(result)})")
             else:
                 print(f"  ✗ Error: {result.get('error')}")
             
             results.append(result)
         
-        # Summary stats
+        self._report(results, time.monotonic() - started)
+        
+        return results
+    
+    def _summarize_from_queue(self, entries):
+        """
+        Enqueue pending episodes as 'summarize' tasks and work through the
+        queue under a lease. Other processes can drain the same queue, and
+        tasks from a run that was killed are picked up once their lease expires.
+        """
+        queue = self.work_queue
+        by_id = {entry['video_id']: entry for entry in entries}
+        for video_id, entry in by_id.items():
+            # Keyed on the cache key so a changed transcript or prompt is a new task
+            queue.enqueue('summarize', f"{video_id}:{self.cache_key(entry)[:16]}", {'video_id': video_id})
+        print(f"Summarize tasks: {queue.task_counts().get('summarize', {})}")
+        
+        started = time.monotonic()
+        worker_id = default_worker_id()
+        results = []
+        while True:
+            tasks = queue.claim('summarize', worker_id, lease_seconds=SUMMARY_LEASE_SECONDS)
+            if not tasks:
+                break
+            task = tasks[0]
+            video_id = task['payload']['video_id']
+            entry = by_id.get(video_id) or self.store.index.get(video_id)
+            if entry is None or not self._needs_summary(entry) or self.duplicates.is_duplicate(video_id):
+                # Summarized by another worker, or gone from the store
+                queue.complete(task)
+                continue
+            
+            model = self._admit(entry)
+            if model is None:
+                # Over this run's budget; re-armed when the next run enqueues it
+                queue.skip(task, 'over budget')
+                continue
+            
+            print(f"[{len(results)+1}] {(entry.get('title') or video_id)[:50]}...{_model_note(model, self.model)}")
+            with queue.lease(task, SUMMARY_LEASE_SECONDS):
+                result = self.summarize_episode(video_id, model=model)
+                self._account(result, video_id, model)
+                if result['success']:
+                    self._save_summary(result)
+            
+            if result['success']:
+                queue.complete(task)
+                queue.set_status(video_id, 'summarized', entry.get('podcast_name'), entry.get('genre'),
+                                 entry.get('title'))
+                print(f"  ✓ Done ({result['latency_seconds']:.1f}s{_compaction_note(result)})")
+            else:
+                queue.fail(task, result.get('error'))
+                print(f"  ✗ Error: {result.get('error')} (attempt {task['attempts'] + 1})")
+            results.append(result)
+        
+        self._report(results, time.monotonic() - started)
+        return results
+    
+    def summarize_all_async(self, limit=None, concurrency=8, max_concurrency=32):
+        """
+        Summarize all transcripts with many requests in flight.
+        `concurrency` is the starting window; it adapts between 1 and
+        `max_concurrency` based on rate-limit and overload responses.
+        Summaries are saved as each request completes.
+        """
+        return asyncio.run(self._summarize_all_async(limit, concurrency, max_concurrency))
+    
+    async def _summarize_all_async(self, limit, concurrency, max_concurrency):
+        entries = self._pending_entries(limit)
+        started = time.monotonic()
+        
+        window = AdaptiveConcurrency(initial=concurrency, maximum=max_concurrency)
+        # Retries are handled by the window so backoff is shared across requests
+        from anthropic import AsyncAnthropic
+        async_client = AsyncAnthropic(base_url=self.base_url, max_retries=0)
+        
+        async def summarize(video_id, model):
+            result = await self.summarize_episode_async(video_id, window, async_client, model=model)
+            self._account(result, video_id, model)
+            return result
+        
+        # Tasks start as soon as they're admitted; whatever doesn't fit the budget
+        # yet is retried each time a finished request settles for less than its estimate
+        waiting = list(entries)
+        running = set()
+        
+        def admit_waiting():
+            still_waiting = []
+            for entry in waiting:
+                model = self._admit(entry, final=False)
+                if model:
+                    running.add(asyncio.ensure_future(summarize(entry['video_id'], model)))
+                else:
+                    still_waiting.append(entry)
+            waiting[:] = still_waiting
+        
+        results = []
+        try:
+            admit_waiting()
+            while running:
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                running.difference_update(done)
+                for task in done:
+                    result = task.result()
+                    
+                    if result['success']:
+                        self._save_summary(result)
+                        print(f"[{len(results)+1}/{len(entries)}] ✓ {result['episode_title'][:50]} "
+                              f"({result['latency_seconds']:.1f}s, window {window.limit}{_compaction_note(result)})")
+                    else:
+                        print(f"[{len(results)+1}/{len(entries)}] ✗ Error: {result.get('error')}")
+                    
+                    results.append(result)
+                # Settled requests usually free part of their reservation
+                if waiting:
+                    admit_waiting()
+            for entry in waiting:
+                self.budget.defer(self.estimates[entry['video_id']])
+        finally:
+            await async_client.close()
+        
+        self._report(results, time.monotonic() - started)
+        print(f"Concurrency: peak {window.peak} in flight, final window {window.limit}, "
+              f"shrunk {window.shrinks} times")
+        
+        return results
+    
+    def summarize_all_batch(self, limit=None, wait=True, poll_interval=60):
+        """
+        Summarize pending transcripts through the Message Batches API.
+        Batch IDs are persisted, so calling this again after a restart first
+        collects any batches that finished in the meantime, then submits
+        whatever is still pending. With wait=False it returns after submitting.
+        """
+        print(f"\n{'='*60}")
+        print(f"PODICALS SUMMARIZER (BATCH MODE)")
+        print(f"{'='*60}")
+        
+        started = time.monotonic()
+        results = self.collect_batches()
+        self.submit_batches(limit)
+        if wait:
+            results += self.collect_batches(wait=True, poll_interval=poll_interval)
+        
         successful = sum(1 for r in results if r['success'])
         print(f"\n{'='*60}")
-        print(f"COMPLETE: {successful}/{len(results)} successful")
+        print(f"BATCH RESULTS: {successful}/{len(results)} successful")
+        for line in self.budget.report_lines(time.monotonic() - started, successful):
+            print(line)
+        print(f"Open batches: {len(self._open_batches())}")
+        print(f"Metrics saved to: {self._write_metrics(results)}")
         print(f"{'='*60}")
         
         return results
     
+    def submit_batches(self, limit=None):
+        """
+        Pack transcripts that have no summary and aren't already queued into
+        Message Batches requests. Returns the new batch IDs.
+        """
+        self.budget.batch = True
+        state = self._load_batch_state()
+        queued = {
+            video_id
+            for batch in state['batches'].values() if not batch['collected']
+            for video_id in batch['requests']
+        }
+        
+        self.duplicates.sync(self.store)
+        pending = [
+            entry for entry in self.store.entries()
+            if entry['video_id'] not in queued and not self.duplicates.is_duplicate(entry['video_id'])
+            and self._needs_summary(entry)
+        ]
+        # Map-reduce needs the chunk notes before the reduce request can be
+        # built, which doesn't fit a single batch round trip
+        long_entries = [entry for entry in pending if self._is_long(entry)]
+        pending = [entry for entry in pending if not self._is_long(entry)]
+        now = datetime.now()
+        self._upgrades = {entry['video_id'] for entry in pending if self._has_downgraded_summary(entry)}
+        pending.sort(key=lambda entry: (entry['video_id'] in self._upgrades, -episode_priority(entry, now)))
+        if limit:
+            pending = pending[:limit]
+        self.estimates.update({entry['video_id']: self._estimate_usage(entry) for entry in pending})
+        
+        print(f"Pending transcripts: {len(pending)} ({len(queued)} already in open batches)")
+        if long_entries:
+            print(f"Skipping {len(long_entries)} long transcripts; summarize them with a regular or --async run")
+        self._print_preflight(pending)
+        
+        batch_ids = []
+        requests, request_bytes = [], 0
+        
+        def flush():
+            if not requests:
+                return
+            batch = self._api('batch_create', self.client.messages.batches.create, requests=requests)
+            # Persist immediately so a crash can't orphan a paid-for batch
+            state['batches'][batch.id] = {
+                'submitted_at': datetime.now().isoformat(),
+                'requests': [r['custom_id'] for r in requests],
+                'collected': False,
+            }
+            self._save_batch_state(state)
+            batch_ids.append(batch.id)
+            print(f"  Submitted {batch.id} ({len(requests)} requests, {request_bytes / 1024 / 1024:.1f} MB)")
+        
+        for entry in pending:
+            model = self._admit(entry)
+            if model is None:
+                continue
+            episode_data, _ = self._load_episode(entry['video_id'])
+            params = self._build_request(episode_data, model)
+            if params is None:
+                self.budget.settle(self.estimates[entry['video_id']], model)
+                continue
+            
+            size = len(json.dumps(params))
+            if requests and (len(requests) >= BATCH_MAX_REQUESTS or request_bytes + size > BATCH_MAX_BYTES):
+                flush()
+                requests, request_bytes = [], 0
+            
+            # YouTube video IDs already satisfy the custom_id format
+            requests.append({'custom_id': entry['video_id'], 'params': params})
+            request_bytes += size
+        flush()
+        
+        return batch_ids
+    
+    def collect_batches(self, wait=False, poll_interval=60):
+        """
+        Fetch results for every finished batch and save its summaries.
+        With wait=True, keep polling until no batches are open.
+        """
+        self.budget.batch = True
+        results = []
+        while True:
+            state = self._load_batch_state()
+            open_batches = self._open_batches(state)
+            if not open_batches:
+                return results
+            
+            still_running = 0
+            for batch_id in open_batches:
+                batch = self._api('batch_retrieve', self.client.messages.batches.retrieve, message_batch_id=batch_id)
+                if batch.processing_status != 'ended':
+                    still_running += 1
+                    counts = batch.request_counts
+                    print(f"  {batch_id}: {counts.processing} processing, {counts.succeeded} succeeded")
+                    continue
+                
+                results += self._collect_batch(batch_id, state)
+            
+            if not wait or not still_running:
+                return results
+            time.sleep(poll_interval)
+    
+    def _collect_batch(self, batch_id, state):
+        """Save the summaries from one ended batch and mark it collected."""
+        results = []
+        errors = {}
+        
+        for item in self.client.messages.batches.results(batch_id):
+            video_id = item.custom_id
+            outcome = item.result
+            
+            # Budget downgrades are billed and cached under the model actually used
+            model = getattr(outcome.message, 'model', None) if outcome.type == 'succeeded' else None
+            if outcome.type == 'succeeded':
+                episode_data, source = self._load_episode(video_id)
+                result = self._build_result(episode_data, outcome.message, source, model=model)
+                result['batch_id'] = batch_id
+                self._account(result, video_id, result['model'])
+                self._save_summary(result)
+            else:
+                # errored, canceled or expired: left pending for the next submission
+                if outcome.type == 'errored':
+                    error = f"{outcome.error.error.type}: {outcome.error.error.message}"
+                else:
+                    error = outcome.type
+                errors[video_id] = error
+                result = {'success': False, 'error': error, 'video_id': video_id, 'batch_id': batch_id}
+                self._account(result, video_id)
+            results.append(result)
+        
+        state['batches'][batch_id].update({
+            'collected': True,
+            'collected_at': datetime.now().isoformat(),
+            'succeeded': sum(1 for r in results if r['success']),
+            'errors': errors,
+        })
+        self._save_batch_state(state)
+        print(f"  {batch_id}: saved {state['batches'][batch_id]['succeeded']} summaries, {len(errors)} errors")
+        
+        return results
+    
+    def _batch_state_path(self):
+        return os.path.join(self.output_dir, BATCH_STATE_FILENAME)
+    
+    def _load_batch_state(self):
+        path = self._batch_state_path()
+        if not os.path.exists(path):
+            return {'batches': {}}
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def _save_batch_state(self, state):
+        path = self._batch_state_path()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, path)
+    
+    def _open_batches(self, state=None):
+        state = state or self._load_batch_state()
+        return [batch_id for batch_id, batch in state['batches'].items() if not batch['collected']]
+    
+    def _summary_path(self, genre, podcast_name, upload_date, title):
+        podcast_dir = os.path.join(
+            self.output_dir,
+            genre or 'unknown',
+            self._sanitize_filename(podcast_name or 'unknown'),
+        )
+        title_slug = self._sanitize_filename((title or 'episode')[:50])
+        return os.path.join(podcast_dir, f"{upload_date or 'unknown'}_{title_slug}.json")
+    
     def _save_summary(self, result):
         """Save a summary to the output directory."""
         
-        genre = result.get('genre', 'unknown')
-        podcast_name = self._sanitize_filename(result.get('podcast_name', 'unknown'))
+        filepath = self._summary_path(
+            result.get('genre'),
+            result.get('podcast_name'),
+            result.get('upload_date'),
+            result.get('episode_title'),
+        )
         
         # Create directory structure
-        podcast_dir = os.path.join(self.output_dir, genre, podcast_name)
-        os.makedirs(podcast_dir, exist_ok=True)
-        
-        # Create filename
-        upload_date = result.get('upload_date', 'unknown')
-        title_slug = self._sanitize_filename(result.get('episode_title', 'episode')[:50])
-        filename = f"{upload_date}_{title_slug}.json"
-        
-        filepath = os.path.join(podcast_dir, filename)
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
         
         with open(filepath, 'w', encoding='utf-8') as f:
             json.dump(result, f, indent=2, ensure_ascii=False)
+        size = os.path.getsize(filepath)
+        self.metrics.inc('bytes_written_total', size, kind='summary')
+        self.metrics.event('summary_saved', video_id=result.get('video_id'), bytes=size,
+                           latency_seconds=result.get('latency_seconds'), usage=result.get('usage'),
+                           chunks=result.get('chunks'), batch_id=result.get('batch_id'))
+        
+        if result.get('cache_key'):
+            usage = result.get('usage') or {}
+            self.cache.record(
+                result['cache_key'],
+                result.get('video_id'),
+                filepath,
+                input_tokens=usage.get('input_tokens'),
+                output_tokens=usage.get('output_tokens'),
+                model=result.get('model'),
+            )
+        
+        return filepath
     
     def _sanitize_filename(self, name):
         """Remove invalid characters from filename."""
@@ -173,88 +1115,80 @@ class PodicalsSummarizer:
         return re.sub(r'[<>:"/\\|?*]', '', name).strip()
 
 
-def export_for_website(summaries_dir="./summaries", output_file="./data/episodes.json"):
-    """
-    Export all summaries into a single JSON file for website consumption.
-    """
-    os.makedirs(os.path.dirname(output_file), exist_ok=True)
-    
-    summary_files = glob.glob(
-        os.path.join(summaries_dir, '**', '*.json'),
-        recursive=True
-    )
-    
-    all_episodes = []
-    
-    for filepath in summary_files:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            
-            if data.get('success'):
-                # Parse upload date for sorting
-                upload_date = data.get('upload_date', '')
-                if upload_date:
-                    formatted_date = f"{upload_date[:4]}-{upload_date[4:6]}-{upload_date[6:8]}"
-                else:
-                    formatted_date = ''
-                
-                all_episodes.append({
-                    'id': data.get('video_id'),
-                    'podcast': data.get('podcast_name'),
-                    'title': data.get('episode_title'),
-                    'genre': data.get('genre'),
-                    'date': formatted_date,
-                    'duration_seconds': data.get('duration_seconds'),
-                    'view_count': data.get('view_count'),
-                    'summary': data.get('summary'),
-                    'youtube_url': data.get('youtube_url'),
-                })
-    
-    # Sort by date descending
-    all_episodes.sort(key=lambda x: x.get('date', ''), reverse=True)
-    
-    # Also create genre and podcast indexes
-    genres = {}
-    podcasts = {}
-    
-    for ep in all_episodes:
-        genre = ep.get('genre', 'unknown')
-        podcast = ep.get('podcast', 'unknown')
-        
-        if genre not in genres:
-            genres[genre] = []
-        genres[genre].append(ep['id'])
-        
-        if podcast not in podcasts:
-            podcasts[podcast] = {'genre': genre, 'episodes': []}
-        podcasts[podcast]['episodes'].append(ep['id'])
-    
-    # Save everything
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump({
-            'episodes': all_episodes,
-            'genres': genres,
-            'podcasts': podcasts,
-            'total_count': len(all_episodes),
-            'exported_at': datetime.now().isoformat(),
-        }, f, indent=2, ensure_ascii=False)
-    
-    print(f"\n{'='*60}")
-    print(f"EXPORT COMPLETE")
-    print(f"{'='*60}")
-    print(f"Episodes: {len(all_episodes)}")
-    print(f"Genres: {len(genres)}")
-    print(f"Podcasts: {len(podcasts)}")
-    print(f"Output: {output_file}")
-    print(f"{'='*60}")
-    
-    return all_episodes
+def _response_usage(response):
+    usage = getattr(response, 'usage', None)
+    return {
+        'input_tokens': getattr(usage, 'input_tokens', None),
+        'output_tokens': getattr(usage, 'output_tokens', None),
+    }
+
+
+def _model_note(model, default_model):
+    return '' if model == default_model else f" (on {model}, over budget)"
+
+
+def _compaction_note(result):
+    compaction = result.get('compaction')
+    if not compaction:
+        return ''
+    return f", {compaction['tokens_before']:,} -> {compaction['tokens_after']:,} tokens"
+
+
+def _sum_usage(responses):
+    totals = {'input_tokens': 0, 'output_tokens': 0}
+    for response in responses:
+        for key, value in _response_usage(response).items():
+            totals[key] += value or 0
+    totals['calls'] = len(responses)
+    return totals
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize scraped transcripts")
+    parser.add_argument('--limit', type=int, default=None)
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help="Run many requests concurrently with an adaptive window")
+    parser.add_argument('--concurrency', type=int, default=8, help="Starting async window")
+    parser.add_argument('--max-concurrency', type=int, default=32)
+    parser.add_argument('--batch', action='store_true',
+                        help="Submit pending transcripts as Message Batches (resumable)")
+    parser.add_argument('--no-wait', action='store_true',
+                        help="With --batch, submit and exit instead of polling until done")
+    parser.add_argument('--poll-interval', type=int, default=60)
+    parser.add_argument('--truncate-long', action='store_true',
+                        help="Truncate long transcripts instead of map-reduce chunking")
+    parser.add_argument('--chunk-chars', type=int, default=CHUNK_CHARS)
+    parser.add_argument('--no-compact', action='store_true',
+                        help="Send transcripts verbatim (skip caption/ad compaction)")
+    parser.add_argument('--count-tokens', action='store_true',
+                        help="Measure compaction with the token-counting API instead of an estimate")
+    parser.add_argument('--queue', metavar='DB', default=os.environ.get('PODICALS_QUEUE_DB'),
+                        help="Work through a shared SQLite work queue (resumable, multi-process)")
+    parser.add_argument('--budget-usd', type=float, default=None, help="Stop spending after this many dollars")
+    parser.add_argument('--budget-tokens', type=int, default=None, help="Stop after this many input+output tokens")
+    parser.add_argument('--no-downgrade', action='store_true',
+                        help="When over budget, defer episodes instead of using a cheaper model")
+    args = parser.parse_args()
+    
+    work_queue = WorkQueue(args.queue) if args.queue else None
+    
     # Summarize all transcripts
-    summarizer = PodicalsSummarizer()
-    summarizer.summarize_all()
+    summarizer = PodicalsSummarizer(
+        long_mode=not args.truncate_long,
+        chunk_chars=args.chunk_chars,
+        compact=not args.no_compact,
+        count_tokens=args.count_tokens,
+        work_queue=work_queue,
+        budget_usd=args.budget_usd,
+        budget_tokens=args.budget_tokens,
+        downgrade_model=None if args.no_downgrade else DOWNGRADE_MODEL,
+    )
+    if args.batch:
+        summarizer.summarize_all_batch(args.limit, wait=not args.no_wait, poll_interval=args.poll_interval)
+    elif args.use_async:
+        summarizer.summarize_all_async(args.limit, args.concurrency, args.max_concurrency)
+    else:
+        summarizer.summarize_all(args.limit)
     
     # Export for website
-    export_for_website()
+    export_for_website(work_queue=work_queue, transcripts_dir=summarizer.transcripts_dir)
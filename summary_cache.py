@@ -0,0 +1,182 @@
+"""
+Podicals - Summary Cache
+Remembers which summaries were generated from which inputs, keyed by a hash
+of (episode, transcript, prompt template, model, max_tokens). Unchanged episodes are
+never sent to the API twice, while editing the prompt or switching models
+invalidates exactly the entries built with the old settings.
+
+    python summary_cache.py stats
+    python summary_cache.py prune
+"""
+
+import os
+import json
+import hashlib
+import argparse
+import threading
+from datetime import datetime
+
+from file_lock import locked
+
+
+CACHE_FILENAME = 'summary_cache.jsonl'
+
+
+def transcript_digest(transcript):
+    return hashlib.sha256((transcript or '').encode('utf-8')).hexdigest()
+
+
+def summary_cache_key(episode_fields, transcript_sha256, prompt_template, model, max_tokens):
+    """
+    Hash of everything that determines a summary's content. episode_fields
+    are the per-episode values filled into the prompt besides the transcript
+    (video_id, podcast name, title).
+    """
+    raw = json.dumps([list(episode_fields), transcript_sha256, prompt_template, model, max_tokens])
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class SummaryCache:
+    """
+    Append-only JSONL log of cache entries (later lines win), so recording a
+    summary is a single small write even mid-run. Appends and prune's rewrite
+    take a file lock, so processes sharing a summaries directory don't lose
+    each other's entries.
+    """
+
+    def __init__(self, summaries_dir="./summaries"):
+        self.summaries_dir = summaries_dir
+        self.path = os.path.join(summaries_dir, CACHE_FILENAME)
+        self.entries = {}
+        self._by_file = {}
+        self.hits = 0
+        self.misses = 0
+        self.tokens_saved = 0
+        self._lock = threading.Lock()
+        self.is_new = not os.path.exists(self.path)
+
+        if not self.is_new:
+            self._load()
+
+    def _load(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                self._add(entry)
+
+    def _add(self, entry):
+        # A summary file holds one summary; a newer entry for the same file
+        # (e.g. re-summarized with another model) supersedes the old key
+        previous = self._by_file.get(entry['summary_file'])
+        if previous and previous != entry['key']:
+            self.entries.pop(previous, None)
+        self._by_file[entry['summary_file']] = entry['key']
+        self.entries[entry['key']] = entry
+
+    def __len__(self):
+        return len(self.entries)
+
+    def lookup(self, key):
+        """Return the entry for a key if its summary file still exists, counting hit/miss."""
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry and os.path.exists(entry['summary_file']):
+                self.hits += 1
+                self.tokens_saved += (entry.get('input_tokens') or 0) + (entry.get('output_tokens') or 0)
+                return entry
+            self.misses += 1
+            return None
+
+    def record(self, key, video_id, summary_file, input_tokens=None, output_tokens=None, model=None):
+        entry = {
+            'key': key,
+            'video_id': video_id,
+            'summary_file': summary_file,
+            'model': model,
+            'input_tokens': input_tokens,
+            'output_tokens': output_tokens,
+            'created_at': datetime.now().isoformat(),
+        }
+        with self._lock:
+            self._add(entry)
+            with locked(self.path):
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        return entry
+
+    def stats(self):
+        return {
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'tokens_saved': self.tokens_saved,
+        }
+
+    def prune(self, current_keys=None, known_video_ids=None):
+        """
+        Drop orphaned entries: summary file gone, episode no longer in the
+        transcript store, or (given current_keys) built with stale settings.
+        Rewrites the log compactly, after re-reading it so entries other
+        processes appended since this one loaded are kept. Returns the number
+        of entries removed.
+        """
+        with self._lock, locked(self.path):
+            if os.path.exists(self.path):
+                self._load()
+            keep = {}
+            for key, entry in self.entries.items():
+                if not os.path.exists(entry['summary_file']):
+                    continue
+                if known_video_ids is not None and entry['video_id'] not in known_video_ids:
+                    continue
+                if current_keys is not None and key not in current_keys:
+                    continue
+                keep[key] = entry
+
+            removed = len(self.entries) - len(keep)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for entry in keep.values():
+                    f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            os.replace(tmp_path, self.path)
+            self.entries = keep
+            self._by_file = {entry['summary_file']: key for key, entry in keep.items()}
+            return removed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Podicals summary cache")
+    parser.add_argument('command', choices=['stats', 'prune'])
+    parser.add_argument('--summaries', default='./summaries')
+    parser.add_argument('--transcripts', default='./transcripts')
+    args = parser.parse_args()
+
+    cache = SummaryCache(args.summaries)
+
+    if args.command == 'stats':
+        tokens = sum((e.get('input_tokens') or 0) + (e.get('output_tokens') or 0) for e in cache.entries.values())
+        models = {}
+        for entry in cache.entries.values():
+            models[entry.get('model')] = models.get(entry.get('model'), 0) + 1
+        print(f"Entries: {len(cache)}")
+        print(f"Tokens represented: {tokens:,}")
+        for model, count in sorted(models.items(), key=lambda item: -item[1]):
+            print(f"  {model}: {count}")
+    else:
+        # Imported here so stats doesn't need the API client
+        from summarizer import PodicalsSummarizer
+
+        summarizer = PodicalsSummarizer(args.transcripts, args.summaries)
+        # Summaries the run budget downgraded to a cheaper model are current
+        # too, until a later run redoes them on the configured model
+        models = [summarizer.model] + [m for m in [summarizer.budget.downgrade_model] if m]
+        current_keys = {
+            summarizer.cache_key(entry, model)
+            for entry in summarizer.store.entries()
+            for model in models
+        }
+        removed = cache.prune(current_keys, known_video_ids=set(summarizer.store.index))
+        print(f"Removed {removed} orphaned entries ({len(cache)} remain)")
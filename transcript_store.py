@@ -0,0 +1,324 @@
+"""
+Podicals - Transcript Store
+Append-only, compressed shard files for scraped episodes, with a byte-offset
+index for random access by video_id. Replaces one pretty-printed JSON file
+per episode and keeps the per-segment timing data.
+
+Layout:
+    <root>/index.jsonl          one line per stored episode (later lines win)
+    <root>/shards/shard-NNNNN-<writer>.bin   zlib-compressed records, back to back
+
+Each run appends to a fresh shard, so older shards never change and git
+only has to store new files. Shard names carry the writer (host, pid and a
+random suffix), so several processes can share a store: each appends only
+to its own shards, index lines are appended under an fcntl lock, and the
+index tail is re-read before lookups to pick up other writers' episodes.
+"""
+
+import os
+import re
+import sys
+import json
+import glob
+import uuid
+import zlib
+import fcntl
+import socket
+import struct
+import hashlib
+import argparse
+import threading
+from array import array
+
+
+INDEX_FILENAME = 'index.jsonl'
+SHARDS_DIRNAME = 'shards'
+DEFAULT_SHARD_MAX_BYTES = 32 * 1024 * 1024
+
+RECORD_VERSION = 1
+# version, metadata bytes, segment count, transcript bytes
+RECORD_HEADER = struct.Struct('<BIII')
+
+# Episode fields copied into the index so listings don't need decompression
+INDEX_FIELDS = (
+    'podcast_name',
+    'genre',
+    'title',
+    'upload_date',
+    'duration_seconds',
+    'view_count',
+    'scraped_at',
+)
+
+
+def encode_episode(episode):
+    """
+    Pack an episode into a compressed record.
+    Segments are stored as parallel arrays (start, duration, text length);
+    their text is recovered from the joined transcript, so it isn't stored twice.
+    """
+    transcript = episode.get('transcript') or ''
+    segments = episode.get('segments') or []
+    meta = {k: v for k, v in episode.items() if k not in ('transcript', 'segments')}
+
+    starts = array('d', (s['start'] for s in segments))
+    durations = array('f', (s['duration'] for s in segments))
+    lengths = array('I', (len(s['text']) for s in segments))
+    if segments and ' '.join(s['text'] for s in segments) != transcript:
+        raise ValueError(f"Segments don't match transcript for {episode.get('video_id')}")
+
+    meta_bytes = json.dumps(meta, ensure_ascii=False).encode('utf-8')
+    text_bytes = transcript.encode('utf-8')
+    for arr in (starts, durations, lengths):
+        if sys.byteorder != 'little':
+            arr.byteswap()
+
+    raw = b''.join([
+        RECORD_HEADER.pack(RECORD_VERSION, len(meta_bytes), len(segments), len(text_bytes)),
+        meta_bytes,
+        starts.tobytes(),
+        durations.tobytes(),
+        lengths.tobytes(),
+        text_bytes,
+    ])
+    return zlib.compress(raw, 6)
+
+
+def decode_episode(blob, with_segments=True):
+    """Inverse of encode_episode."""
+    raw = zlib.decompress(blob)
+    version, meta_len, n_segments, text_len = RECORD_HEADER.unpack_from(raw)
+    if version != RECORD_VERSION:
+        raise ValueError(f"Unsupported transcript record version {version}")
+
+    pos = RECORD_HEADER.size
+    episode = json.loads(raw[pos:pos + meta_len].decode('utf-8'))
+    pos += meta_len
+
+    starts, durations, lengths = array('d'), array('f'), array('I')
+    for arr in (starts, durations, lengths):
+        size = arr.itemsize * n_segments
+        arr.frombytes(raw[pos:pos + size])
+        if sys.byteorder != 'little':
+            arr.byteswap()
+        pos += size
+
+    transcript = raw[pos:pos + text_len].decode('utf-8')
+    episode['transcript'] = transcript
+
+    if with_segments:
+        segments = []
+        offset = 0
+        for start, duration, length in zip(starts, durations, lengths):
+            segments.append({
+                'text': transcript[offset:offset + length],
+                'start': start,
+                'duration': round(duration, 3),
+            })
+            offset += length + 1
+        episode['segments'] = segments
+
+    return episode
+
+
+class TranscriptStore:
+    """
+    Thread-safe sharded episode store.
+
+        store = TranscriptStore('./transcripts')
+        store.put(episode)
+        for entry in store.entries():       # index only, no decompression
+            episode = store.get(entry['video_id'])
+    """
+
+    def __init__(self, root="./transcripts", shard_max_bytes=DEFAULT_SHARD_MAX_BYTES):
+        self.root = root
+        self.shard_max_bytes = shard_max_bytes
+        self.index_path = os.path.join(root, INDEX_FILENAME)
+        self.shards_dir = os.path.join(root, SHARDS_DIRNAME)
+        self.index = {}
+        self._lock = threading.Lock()
+        self._writer = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._active_shard = None
+        self._active_size = 0
+        # Bytes of index.jsonl already read; other processes append past it
+        self._index_offset = 0
+        self._refresh_index()
+
+    def _refresh_index(self):
+        """Read index lines appended since the last call (by this or another process)."""
+        try:
+            if os.path.getsize(self.index_path) <= self._index_offset:
+                return
+        except OSError:
+            return
+        with self._lock:
+            with open(self.index_path, 'rb') as f:
+                f.seek(self._index_offset)
+                tail = f.read()
+            # A line still being written has no newline yet; leave it for next time
+            complete = tail[:tail.rfind(b'\n') + 1]
+            self._index_offset += len(complete)
+            for line in complete.decode('utf-8').splitlines():
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A crash mid-write can leave a torn line
+                    continue
+                self.index[entry['video_id']] = entry
+
+    def __contains__(self, video_id):
+        self._refresh_index()
+        return video_id in self.index
+
+    def __len__(self):
+        self._refresh_index()
+        return len(self.index)
+
+    def entries(self):
+        """Index entries (metadata + location), oldest shard first."""
+        self._refresh_index()
+        # Copied under the lock; other threads may be appending
+        with self._lock:
+            entries = list(self.index.values())
+        return sorted(entries, key=lambda e: (_shard_name(e['shard']), e['offset']))
+
+    def _shard_path(self, shard):
+        return os.path.join(self.shards_dir, f"shard-{_shard_name(shard)}.bin")
+
+    def _next_shard(self):
+        existing = [
+            int(m.group(1))
+            for name in (os.listdir(self.shards_dir) if os.path.isdir(self.shards_dir) else [])
+            for m in [re.match(r'shard-(\d+)(?:-.+)?\.bin$', name)] if m
+        ]
+        # The number only keeps shards roughly in write order; the writer suffix makes the name unique
+        return f"{max(existing, default=0) + 1:05d}-{self._writer}"
+
+    def put(self, episode):
+        """Append an episode. A video_id stored twice resolves to the newest copy."""
+        blob = encode_episode(episode)
+        with self._lock:
+            os.makedirs(self.shards_dir, exist_ok=True)
+            if self._active_shard is None or self._active_size + len(blob) > self.shard_max_bytes:
+                self._active_shard = self._next_shard()
+                self._active_size = 0
+
+            shard_path = self._shard_path(self._active_shard)
+            with open(shard_path, 'ab') as f:
+                offset = f.tell()
+                f.write(blob)
+            self._active_size = offset + len(blob)
+
+            entry = {
+                'video_id': episode['video_id'],
+                'shard': self._active_shard,
+                'offset': offset,
+                'length': len(blob),
+                'transcript_chars': len(episode.get('transcript') or ''),
+                # Lets the summarizer detect changed transcripts without decompressing
+                'transcript_sha256': hashlib.sha256((episode.get('transcript') or '').encode('utf-8')).hexdigest(),
+                'segments': len(episode.get('segments') or []),
+            }
+            entry.update({k: episode.get(k) for k in INDEX_FIELDS})
+
+            # Shard bytes are flushed before the index line that points at them.
+            # The lock keeps lines from concurrent processes from interleaving.
+            with open(self.index_path, 'a', encoding='utf-8') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+                    f.flush()
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+            self.index[entry['video_id']] = entry
+            return entry
+
+    def read_blob(self, entry):
+        with open(self._shard_path(entry['shard']), 'rb') as f:
+            f.seek(entry['offset'])
+            return f.read(entry['length'])
+
+    def get(self, video_id, with_segments=True):
+        """Load one episode (transcript, metadata and segments) or None."""
+        self._refresh_index()
+        entry = self.index.get(video_id)
+        if not entry:
+            return None
+        return decode_episode(self.read_blob(entry), with_segments=with_segments)
+
+    def iter_episodes(self, with_segments=True):
+        """Yield every episode, reading each shard sequentially."""
+        current_shard, handle = None, None
+        try:
+            for entry in self.entries():
+                if entry['shard'] != current_shard:
+                    if handle:
+                        handle.close()
+                    current_shard = entry['shard']
+                    handle = open(self._shard_path(current_shard), 'rb')
+                handle.seek(entry['offset'])
+                yield decode_episode(handle.read(entry['length']), with_segments=with_segments)
+        finally:
+            if handle:
+                handle.close()
+
+
+def _shard_name(shard):
+    """Shard ids are ints in stores written before shards were named per writer."""
+    return f"{shard:05d}" if isinstance(shard, int) else shard
+
+
+def iter_json_tree(transcripts_dir):
+    """Yield (path, episode) for legacy one-file-per-episode transcripts."""
+    for filepath in glob.glob(os.path.join(transcripts_dir, '**', '*.json'), recursive=True):
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if isinstance(data, dict) and data.get('video_id') and 'transcript' in data:
+            yield filepath, data
+
+
+def migrate_json_tree(transcripts_dir, store=None, delete=False):
+    """
+    One-time import of the legacy JSON tree into the shard store.
+    Episodes already in the store are skipped. Returns the number imported.
+    """
+    store = store or TranscriptStore(transcripts_dir)
+    imported = 0
+    for filepath, episode in iter_json_tree(transcripts_dir):
+        if episode['video_id'] not in store:
+            store.put(episode)
+            imported += 1
+        if delete:
+            os.remove(filepath)
+    return imported
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Podicals transcript store")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    migrate = sub.add_parser('migrate', help="Import the legacy JSON tree into shards")
+    migrate.add_argument('--transcripts', default='./transcripts')
+    migrate.add_argument('--delete', action='store_true', help="Remove JSON files after import")
+
+    info = sub.add_parser('info', help="Show store size")
+    info.add_argument('--transcripts', default='./transcripts')
+
+    args = parser.parse_args()
+    store = TranscriptStore(args.transcripts)
+
+    if args.command == 'migrate':
+        count = migrate_json_tree(args.transcripts, store, delete=args.delete)
+        print(f"Imported {count} episodes ({len(store)} in store)")
+    else:
+        shard_bytes = sum(e['length'] for e in store.index.values())
+        print(f"Episodes: {len(store)}")
+        print(f"Shards: {len({e['shard'] for e in store.index.values()})}")
+        print(f"Compressed size: {shard_bytes / 1024 / 1024:.1f} MB")
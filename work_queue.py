@@ -0,0 +1,338 @@
+"""
+Podicals - Work Queue
+Durable catalog and task queue in SQLite (WAL mode), so a killed run
+resumes where it stopped and several scraper or summarizer processes can
+share the work without redoing each other's episodes.
+
+Workers claim tasks with a lease. A task whose worker dies is picked up by
+someone else once the lease runs out; a failed task is retried with
+exponential backoff until it runs out of attempts.
+
+    queue = WorkQueue('./data/work_queue.db')
+    queue.enqueue('summarize', video_id)
+    for task in queue.claim('summarize', worker_id):
+        with queue.lease(task):            # keeps the lease alive
+            ...
+        queue.complete(task)
+
+    python work_queue.py status
+    python work_queue.py retry-failed summarize
+"""
+
+import os
+import json
+import time
+import random
+import socket
+import sqlite3
+import argparse
+import threading
+from contextlib import contextmanager
+
+
+DEFAULT_DB_PATH = './data/work_queue.db'
+
+# Episode stages in the catalog, in order; 'rejected' episodes (clips, no
+# transcript, duplicates) stop after listing
+STATUSES = ('listed', 'scraped', 'summarized', 'exported')
+
+DEFAULT_LEASE_SECONDS = 300
+MAX_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 6 * 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS episodes (
+    video_id     TEXT PRIMARY KEY,
+    podcast_name TEXT,
+    genre        TEXT,
+    title        TEXT,
+    status       TEXT NOT NULL,
+    detail       TEXT,
+    updated_at   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS episodes_status ON episodes (status);
+
+CREATE TABLE IF NOT EXISTS tasks (
+    id            INTEGER PRIMARY KEY,
+    stage         TEXT NOT NULL,
+    key           TEXT NOT NULL,
+    payload       TEXT,
+    state         TEXT NOT NULL DEFAULT 'pending',
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    available_at  REAL NOT NULL,
+    lease_owner   TEXT,
+    lease_expires REAL,
+    last_error    TEXT,
+    created_at    REAL NOT NULL,
+    updated_at    REAL NOT NULL,
+    UNIQUE (stage, key)
+);
+CREATE INDEX IF NOT EXISTS tasks_claim ON tasks (stage, state, available_at);
+"""
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def retry_delay(attempts):
+    """Backoff before retry number `attempts`, with jitter."""
+    delay = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+class WorkQueue:
+    """
+    Thread- and process-safe task queue plus episode catalog. Each thread
+    gets its own SQLite connection; claims run in IMMEDIATE transactions so
+    two workers can never lease the same task.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH, lease_seconds=DEFAULT_LEASE_SECONDS, max_attempts=MAX_ATTEMPTS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.row_factory = sqlite3.Row
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            db.execute('PRAGMA busy_timeout=30000')
+            self._local.db = db
+        return db
+
+    @contextmanager
+    def _transaction(self):
+        db = self._connection()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+
+    def close(self):
+        db = getattr(self._local, 'db', None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+    # Catalog
+
+    def set_status(self, video_id, status, podcast_name=None, genre=None, title=None, detail=None):
+        """Record an episode's stage; metadata fields only overwrite when given."""
+        with self._transaction() as db:
+            db.execute(
+                """
+                INSERT INTO episodes (video_id, podcast_name, genre, title, status, detail, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (video_id) DO UPDATE SET
+                    podcast_name = COALESCE(excluded.podcast_name, podcast_name),
+                    genre = COALESCE(excluded.genre, genre),
+                    title = COALESCE(excluded.title, title),
+                    status = excluded.status,
+                    detail = excluded.detail,
+                    updated_at = excluded.updated_at
+                """,
+                (video_id, podcast_name, genre, title, status, detail, time.time()),
+            )
+
+    def mark_exported(self, video_ids):
+        """Move summarized episodes to 'exported'. Returns how many changed."""
+        now = time.time()
+        with self._transaction() as db:
+            cursor = db.executemany(
+                "UPDATE episodes SET status = 'exported', updated_at = ? WHERE video_id = ? AND status = 'summarized'",
+                ((now, video_id) for video_id in video_ids),
+            )
+            return cursor.rowcount
+
+    def status_counts(self):
+        rows = self._connection().execute('SELECT status, COUNT(*) AS n FROM episodes GROUP BY status')
+        return {row['status']: row['n'] for row in rows}
+
+    # Tasks
+
+    def enqueue(self, stage, key, payload=None, available_at=None):
+        """
+        Add a task. Existing tasks are left alone, except skipped ones, which
+        are re-armed. Returns True if the task is (now) pending.
+        """
+        now = time.time()
+        with self._transaction() as db:
+            cursor = db.execute(
+                """
+                INSERT INTO tasks (stage, key, payload, available_at, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (stage, key) DO UPDATE SET
+                    state = 'pending', payload = excluded.payload, available_at = excluded.available_at,
+                    updated_at = excluded.updated_at
+                WHERE state = 'skipped'
+                """,
+                (stage, key, json.dumps(payload) if payload is not None else None,
+                 available_at or now, now, now),
+            )
+            return cursor.rowcount > 0
+
+    def claim(self, stage, worker_id=None, limit=1, lease_seconds=None):
+        """
+        Lease up to `limit` runnable tasks: pending and due, or leased by a
+        worker whose lease ran out. Returns task dicts.
+        """
+        worker_id = worker_id or default_worker_id()
+        lease_seconds = lease_seconds or self.lease_seconds
+        now = time.time()
+        with self._transaction() as db:
+            rows = db.execute(
+                """
+                SELECT * FROM tasks
+                WHERE stage = ? AND (
+                    (state = 'pending' AND available_at <= ?) OR (state = 'leased' AND lease_expires < ?)
+                )
+                ORDER BY available_at, id
+                LIMIT ?
+                """,
+                (stage, now, now, limit),
+            ).fetchall()
+            tasks = []
+            for row in rows:
+                task = dict(row)
+                if task['state'] == 'leased':
+                    # Its worker died or hung; that counts as an attempt, so a
+                    # task that keeps killing workers eventually stops
+                    task['attempts'] += 1
+                    if task['attempts'] >= self.max_attempts:
+                        db.execute(
+                            "UPDATE tasks SET state = 'failed', attempts = ?, last_error = ?, lease_owner = NULL, "
+                            "lease_expires = NULL, updated_at = ? WHERE id = ?",
+                            (task['attempts'], 'lease expired', now, task['id']),
+                        )
+                        continue
+                db.execute(
+                    "UPDATE tasks SET state = 'leased', attempts = ?, lease_owner = ?, lease_expires = ?, "
+                    "updated_at = ? WHERE id = ?",
+                    (task['attempts'], worker_id, now + lease_seconds, now, task['id']),
+                )
+                task['payload'] = json.loads(task['payload']) if task['payload'] else {}
+                task.update(state='leased', lease_owner=worker_id, lease_expires=now + lease_seconds)
+                tasks.append(task)
+            return tasks
+
+    def heartbeat(self, task, lease_seconds=None):
+        """Extend a lease. Returns False if the lease was lost to another worker."""
+        expires = time.time() + (lease_seconds or self.lease_seconds)
+        with self._transaction() as db:
+            cursor = db.execute(
+                "UPDATE tasks SET lease_expires = ? WHERE id = ? AND state = 'leased' AND lease_owner = ?",
+                (expires, task['id'], task['lease_owner']),
+            )
+        if cursor.rowcount:
+            task['lease_expires'] = expires
+        return cursor.rowcount > 0
+
+    @contextmanager
+    def lease(self, task, lease_seconds=None):
+        """Keep a task's lease alive (heartbeat every third of it) while the block runs."""
+        lease_seconds = lease_seconds or self.lease_seconds
+        stop = threading.Event()
+
+        def beat():
+            try:
+                while not stop.wait(lease_seconds / 3):
+                    if not self.heartbeat(task, lease_seconds):
+                        return
+            finally:
+                # Connections are per thread; this one dies with the thread
+                self.close()
+
+        thread = threading.Thread(target=beat, name=f"lease-{task['id']}", daemon=True)
+        thread.start()
+        try:
+            yield task
+        finally:
+            stop.set()
+            thread.join()
+
+    def _finish(self, task, state, error=None, available_at=None, attempts=None):
+        with self._transaction() as db:
+            cursor = db.execute(
+                """
+                UPDATE tasks SET state = ?, last_error = ?, available_at = COALESCE(?, available_at),
+                    attempts = COALESCE(?, attempts), lease_owner = NULL, lease_expires = NULL, updated_at = ?
+                WHERE id = ? AND state = 'leased' AND lease_owner = ?
+                """,
+                (state, error, available_at, attempts, time.time(), task['id'], task['lease_owner']),
+            )
+            return cursor.rowcount > 0
+
+    def complete(self, task):
+        """Mark a leased task done. False if the lease had been lost."""
+        return self._finish(task, 'done')
+
+    def skip(self, task, reason=None):
+        """Give a task back without counting an attempt; it's re-armed by the next enqueue."""
+        return self._finish(task, 'skipped', error=reason)
+
+    def fail(self, task, error, retry=True):
+        """
+        Record a failed attempt. The task is retried after an exponential
+        backoff until max_attempts, then left 'failed'.
+        """
+        attempts = task['attempts'] + 1
+        if retry and attempts < self.max_attempts:
+            return self._finish(task, 'pending', error=str(error)[:1000],
+                                available_at=time.time() + retry_delay(attempts), attempts=attempts)
+        return self._finish(task, 'failed', error=str(error)[:1000], attempts=attempts)
+
+    def retry_failed(self, stage):
+        """Put a stage's failed tasks back in the queue with a fresh attempt count."""
+        now = time.time()
+        with self._transaction() as db:
+            cursor = db.execute(
+                "UPDATE tasks SET state = 'pending', attempts = 0, available_at = ?, updated_at = ? "
+                "WHERE stage = ? AND state = 'failed'",
+                (now, now, stage),
+            )
+            return cursor.rowcount
+
+    def task_counts(self):
+        """{stage: {state: count}}, with leases past their expiry counted as 'expired'."""
+        now = time.time()
+        counts = {}
+        rows = self._connection().execute(
+            """
+            SELECT stage, CASE WHEN state = 'leased' AND lease_expires < ? THEN 'expired' ELSE state END AS state,
+                   COUNT(*) AS n
+            FROM tasks GROUP BY 1, 2
+            """,
+            (now,),
+        )
+        for row in rows:
+            counts.setdefault(row['stage'], {})[row['state']] = row['n']
+        return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or repair the work queue")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH)
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('status', help="Task and episode counts")
+    retry = sub.add_parser('retry-failed', help="Re-queue tasks that ran out of attempts")
+    retry.add_argument('stage')
+    args = parser.parse_args()
+
+    queue = WorkQueue(args.db)
+    if args.command == 'retry-failed':
+        print(f"Re-queued {queue.retry_failed(args.stage)} failed {args.stage} tasks")
+    else:
+        print(f"Episodes: {json.dumps(queue.status_counts())}")
+        for stage, counts in sorted(queue.task_counts().items()):
+            print(f"Tasks ({stage}): {json.dumps(counts)}")